@@ -0,0 +1,256 @@
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from tabla_q import TablaQ, ACCIONES, NIVELES_CARGA, NIVELES_COMBUSTIBLE, DTYPE
+
+# Puntos de control versionados de las Q-tables: cada guardado es una versión nueva con
+# todas las tablas de la corrida (una por tractor o la compartida) y sus metadatos
+# (episodios, epsilon, alpha, gamma...), en vez de pisar los archivos anteriores.
+# La versión N es el directorio directorio/q_versiones/v00000N/ con un .npy por tabla y
+# metadatos.json. El número se toma creando el directorio (os.mkdir falla si ya existe,
+# también si lo creó otro proceso); cada archivo se escribe en un temporal propio, se
+# baja a disco y se renombra, y el renombre se baja a disco con el directorio.
+# metadatos.json va último: una versión sin él quedó a medias y no cuenta. Restaurar
+# toma la última versión completa que tenga todas las tablas pedidas con la forma del
+# campo y discretización; mapeadas (np.memmap copia al escribir) no se leen, si no se
+# comprueba su crc32. Sin versiones se usan los directorio/nombre.npy de antes.
+# guardar() escribe cada TablaQ directo de sus valores (TablaQ.volcar), así que una
+# tabla mapeada no pasa entera por memoria.
+#
+#   almacen = AlmacenQ(directorio)
+#   almacen.guardar({"q_table_tractor_0": tabla0, "q_table_tractor_1": tabla1}, {'episodios': 120})
+#   tablas, metadatos = almacen.cargar(["q_table_tractor_0", "q_table_tractor_1"], filas, columnas, 50, 1000)
+#
+# EscritorQ hace los guardados en un hilo: el paso solo copia los valores y sigue (la
+# copia sí es entera: para tablas que no entran en memoria, guardar sin escritor).
+# Si se pide otro punto de control antes de que el hilo escriba el anterior, se
+# escribe solo el último (entero: las tablas de una versión son siempre del mismo momento).
+
+CONSERVAR = 5  # Versiones completas que se mantienen; las más viejas se borran
+PATRON_VERSION = re.compile(r"^v(\d+)$")
+METADATOS = "metadatos.json"
+SUBDIRECTORIO = "q_versiones"
+
+
+def _sincronizar_directorio(directorio):
+    # Baja a disco las entradas del directorio (creaciones y renombres). En Windows no
+    # se puede abrir un directorio y el renombre ya queda escrito
+    if os.name == 'nt':
+        return
+    descriptor = os.open(directorio, os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+def _volcar(valores, archivo):
+    # TablaQ.volcar para un arreglo (p.ej. la copia que tomó EscritorQ)
+    np.save(archivo, valores)
+    return zlib.crc32(np.ascontiguousarray(valores))
+
+
+def _escribir_atomico(ruta, escribir):
+    # escribir(archivo) en un temporal único que se renombra cuando ya está en disco;
+    # devuelve lo que devuelva escribir
+    directorio = os.path.dirname(ruta)
+    descriptor, temporal = tempfile.mkstemp(dir=directorio, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as archivo:
+            resultado = escribir(archivo)
+            archivo.flush()
+            os.fsync(archivo.fileno())
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    _sincronizar_directorio(directorio)
+    return resultado
+
+
+class AlmacenQ:
+    def __init__(self, directorio, conservar=CONSERVAR):
+        self.directorio = os.path.abspath(directorio)
+        self.raiz = os.path.join(self.directorio, SUBDIRECTORIO)  # Donde van las versiones
+        self.conservar = conservar
+
+    def carpeta(self, version):
+        return os.path.join(self.raiz, f"v{version:06d}")
+
+    def ruta(self, version, nombre):
+        return os.path.join(self.carpeta(version), f"{nombre}.npy")
+
+    def _numeros(self):
+        # Todas las versiones, completas o no, de la más nueva a la más vieja
+        if not os.path.isdir(self.raiz):
+            return []
+        return sorted((int(m.group(1)) for m in map(PATRON_VERSION.match, os.listdir(self.raiz)) if m),
+                      reverse=True)
+
+    def versiones(self):
+        # Números de las versiones completas (con metadatos.json), de la más nueva a la más vieja
+        return [version for version in self._numeros()
+                if os.path.exists(os.path.join(self.carpeta(version), METADATOS))]
+
+    def metadatos(self, version):
+        with open(os.path.join(self.carpeta(version), METADATOS), encoding="utf-8") as archivo:
+            return json.load(archivo)
+
+    def existe(self, nombres):
+        # Si hay algo guardado de esas tablas (aunque no sirva para el campo que se pide)
+        for version in self.versiones():
+            try:
+                if any(nombre in self.metadatos(version)['tablas'] for nombre in nombres):
+                    return True
+            except (OSError, ValueError, KeyError):
+                continue
+        return any(os.path.exists(os.path.join(self.directorio, f"{nombre}.npy")) for nombre in nombres)
+
+    def _reclamar(self):
+        # Crea el directorio de la próxima versión libre; si otro proceso lo crea antes, prueba la siguiente
+        os.makedirs(self.raiz, exist_ok=True)
+        numeros = self._numeros()
+        version = numeros[0] + 1 if numeros else 1
+        while True:
+            try:
+                os.mkdir(self.carpeta(version))
+            except FileExistsError:
+                version += 1
+                continue
+            _sincronizar_directorio(self.raiz)
+            return version
+
+    def guardar(self, tablas, metadatos=None):
+        # tablas: {nombre: TablaQ o arreglo (p.ej. la copia que tomó EscritorQ)}. Devuelve el número de versión
+        version = self._reclamar()
+        datos = dict(metadatos or {}, version=version, fecha=time.time(), tablas={})
+        for nombre, tabla in tablas.items():
+            if isinstance(tabla, TablaQ):
+                valores, volcar = tabla.valores, tabla.volcar
+            else:
+                valores, volcar = tabla, lambda archivo: _volcar(tabla, archivo)
+            crc = _escribir_atomico(self.ruta(version, nombre), volcar)
+            datos['tablas'][nombre] = {'forma': list(valores.shape), 'dtype': valores.dtype.str, 'crc32': crc}
+        _escribir_atomico(os.path.join(self.carpeta(version), METADATOS),
+                          lambda archivo: archivo.write(json.dumps(datos, indent=1, default=float).encode("utf-8")))
+        self._podar()
+        return version
+
+    def _podar(self):
+        completas = self.versiones()
+        if len(completas) <= self.conservar:
+            return
+        limite = completas[self.conservar - 1]
+        for version in self._numeros():
+            # Las incompletas más nuevas que la última conservada pueden estar escribiéndose
+            if version >= limite:
+                continue
+            try:
+                os.remove(os.path.join(self.carpeta(version), METADATOS))  # Primero deja de contar
+            except OSError:
+                pass
+            # Lo que no se pueda borrar (p.ej. mapeado en Windows) se intenta en el próximo guardado
+            shutil.rmtree(self.carpeta(version), ignore_errors=True)
+
+    def _leer(self, version, nombre, forma, descripcion, mapear):
+        valores = np.load(self.ruta(version, nombre), mmap_mode='c' if mapear else None)
+        if list(valores.shape) != forma or valores.dtype.str != descripcion['dtype']:
+            return None
+        if not mapear and zlib.crc32(np.ascontiguousarray(valores)) != descripcion['crc32']:
+            return None
+        return valores
+
+    def cargar(self, nombres, filas, columnas, carga_max, combustible_max, niveles_carga=NIVELES_CARGA,
+               niveles_combustible=NIVELES_COMBUSTIBLE, dtype=DTYPE, mapear=False):
+        # ({nombre: TablaQ}, metadatos) de la última versión buena con todas las tablas y esta
+        # forma. Las versiones ilegibles, sin alguna tabla, de otra forma o con crc distinto
+        # se saltean. Sin ninguna, las tablas de antes que haya (metadatos {}); si no, ({}, None)
+        argumentos = (filas, columnas, carga_max, combustible_max, niveles_carga, niveles_combustible, dtype)
+        forma = [filas, columnas, niveles_carga, niveles_combustible, ACCIONES]
+        for version in self.versiones():
+            try:
+                metadatos = self.metadatos(version)
+                descripciones = [metadatos['tablas'][nombre] for nombre in nombres]
+                if any(descripcion['forma'] != forma for descripcion in descripciones):
+                    continue
+                leidas = [self._leer(version, nombre, forma, descripcion, mapear)
+                          for nombre, descripcion in zip(nombres, descripciones)]
+            except (OSError, ValueError, KeyError):
+                continue
+            if any(valores is None for valores in leidas):
+                continue
+            tablas = {}
+            for nombre, valores in zip(nombres, leidas):
+                if valores.dtype != np.dtype(dtype):
+                    valores = np.array(valores, dtype=dtype)
+                tablas[nombre] = TablaQ(*argumentos, valores)
+            return tablas, metadatos
+        legado = {}
+        for nombre in nombres:
+            tabla = TablaQ.abrir(os.path.join(self.directorio, f"{nombre}.npy"), *argumentos, mapear=mapear)
+            if tabla is not None:
+                legado[nombre] = tabla
+        return legado, ({} if legado else None)
+
+
+# Hilo que escribe en un AlmacenQ los puntos de control que le pasa pedir(); cerrar() espera lo pendiente
+class EscritorQ:
+    def __init__(self, almacen):
+        self.almacen = almacen
+        self.pendiente = None  # (tablas copiadas, metadatos): solo el último punto de control pedido
+        self.condicion = threading.Condition()
+        self.escribiendo = False
+        self.cerrado = False
+        self.error = None
+        self.hilo = threading.Thread(target=self._correr, name="EscritorQ", daemon=True)
+        self.hilo.start()
+
+    def _revisar(self):
+        if self.error is not None:
+            raise RuntimeError("Falló el guardado de las Q-tables en segundo plano") from self.error
+
+    def pedir(self, tablas, metadatos=None):
+        # Copia los valores de todas las tablas (lo único que pasa en el hilo que llama) y encola la escritura
+        copias = {nombre: tabla.instantanea() for nombre, tabla in tablas.items()}
+        with self.condicion:
+            self._revisar()
+            self.pendiente = (copias, metadatos)
+            self.condicion.notify()
+
+    def esperar(self):
+        # Bloquea hasta que no quede nada por escribir
+        with self.condicion:
+            self.condicion.wait_for(lambda: self.pendiente is None and not self.escribiendo)
+            self._revisar()
+
+    def cerrar(self):
+        with self.condicion:
+            self.cerrado = True
+            self.condicion.notify()
+        self.hilo.join()
+        self._revisar()
+
+    def _correr(self):
+        while True:
+            with self.condicion:
+                self.condicion.wait_for(lambda: self.pendiente is not None or self.cerrado)
+                if self.pendiente is None:
+                    return
+                (tablas, metadatos), self.pendiente = self.pendiente, None
+                self.escribiendo = True
+            try:
+                self.almacen.guardar(tablas, metadatos)
+            except Exception as error:
+                self.error = error
+            with self.condicion:
+                self.escribiendo = False
+                self.condicion.notify_all()
@@ -0,0 +1,63 @@
+import numpy as np
+
+
+# Asignación en lote de parcelas a los tractores libres (algoritmo húngaro).
+# En vez de que cada tractor tome en orden la mejor parcela para sí, se minimiza el
+# costo total de todos a la vez. Como candidatas bastan las n parcelas más baratas de
+# cada tractor (n = tractores libres): si el óptimo le diera a un tractor una parcela
+# fuera de esas n, alguna de ellas quedaría sin asignar y cambiarla no empeora nada.
+# Así la matriz de costos es de n x (n * n) como mucho y sale del índice espacial.
+# El óptimo lo da scipy (linear_sum_assignment); sin scipy instalado se asigna de a
+# un par por vez, el de menor costo entre los que quedan (no siempre el óptimo).
+def asignar_parcelas(indice, posiciones, costo=None, factor_minimo=1.0):
+    # posiciones: (row, col) de cada tractor libre. costo(i, rows, cols) es el costo
+    # vectorizado del tractor i (por defecto, distancia euclidiana) y debe cumplir lo
+    # mismo que en IndiceParcelas.k_mas_cercanas; un costo infinito excluye la parcela para
+    # ese tractor. Devuelve (row, col) o None por tractor.
+    n = len(posiciones)
+    if costo is None:
+        costo = lambda i, rows, cols: np.sqrt((rows - posiciones[i][0]) ** 2 + (cols - posiciones[i][1]) ** 2)
+
+    candidatas = {}
+    for i, (row, col) in enumerate(posiciones):
+        cercanas = indice.k_mas_cercanas(row, col, k=n, costo=lambda rows, cols, i=i: costo(i, rows, cols),
+                                         factor_minimo=factor_minimo)
+        for r, c, valor in cercanas:
+            if np.isfinite(valor):
+                candidatas[(r, c)] = None
+    if not candidatas:
+        return [None] * n
+
+    rows, cols = np.array(list(candidatas)).T
+    matriz = np.stack([costo(i, rows, cols) for i in range(n)])
+    # Los pares excluidos van con un costo mayor que cualquier asignación sin ellos
+    # (linear_sum_assignment no acepta infinitos en todas las asignaciones) y se descartan
+    finitas = np.isfinite(matriz)
+    excluido = (matriz[finitas].max(initial=0) + 1) * (n + 1)
+    asignadas = [None] * n
+    for i, j in _emparejar(np.where(finitas, matriz, excluido)):
+        if finitas[i, j]:
+            asignadas[i] = (int(rows[j]), int(cols[j]))
+    return asignadas
+
+
+def _emparejar(matriz):
+    # Pares (tractor, candidata) que cubren a todos los tractores posibles
+    try:
+        from scipy.optimize import linear_sum_assignment
+    except ImportError:
+        return _emparejar_voraz(matriz)
+    return zip(*linear_sum_assignment(matriz))
+
+
+def _emparejar_voraz(matriz):
+    usadas_filas, usadas_columnas, pares = set(), set(), []
+    for indice in np.argsort(matriz, axis=None, kind='stable'):
+        i, j = np.unravel_index(indice, matriz.shape)
+        if i not in usadas_filas and j not in usadas_columnas:
+            usadas_filas.add(i)
+            usadas_columnas.add(j)
+            pares.append((int(i), int(j)))
+            if len(usadas_filas) == min(matriz.shape):
+                break
+    return pares
@@ -0,0 +1,136 @@
+# Compara el A* original de simulacion_astar.Tractor.encontrar_camino con
+# planificador.PlanificadorAEstrella en rejillas de distintos tamaños.
+#
+#   python benchmarks/bench_astar.py --tamanos 30 100 300 --consultas 20
+import argparse
+import os
+import random
+import sys
+import time
+from heapq import heappush, heappop
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from planificador import PlanificadorAEstrella, celdas_bloqueadas
+
+GRID_SIZE = 20
+# Mismo orden que simulacion_astar.Direction: UP, RIGHT, DOWN, LEFT
+MOVIMIENTOS = [(0, -1), (1, 0), (0, 1), (-1, 0)]
+
+
+def costo_giro(actual, nuevo):
+    if actual == nuevo:
+        return 0
+    return 10 if (actual + 2) % 4 == nuevo else 5
+
+
+COSTO_GIRO = [[costo_giro(a, b) for b in range(4)] for a in range(4)]
+
+
+# Copia del algoritmo original (nodos por posición, sin tabla de g, colisión por vecino)
+class PathNode:
+    def __init__(self, position, g_cost, h_cost, parent=None, direction=None):
+        self.position = position
+        self.g_cost = g_cost
+        self.f_cost = g_cost + h_cost
+        self.parent = parent
+        self.direction = direction
+
+    def __lt__(self, other):
+        return self.f_cost < other.f_cost
+
+
+def encontrar_camino_original(start, goal, rumbo, otros, cols, rows):
+    def hay_colision(pos):
+        grid_pos = np.array(pos) * GRID_SIZE + GRID_SIZE // 2
+        for otro in otros:
+            if np.linalg.norm(otro - grid_pos) < GRID_SIZE * 2:
+                return True
+        return False
+
+    manhattan = lambda a, b: abs(a[0] - b[0]) + abs(a[1] - b[1])
+    open_set = [PathNode(start, 0, manhattan(start, goal), None, rumbo)]
+    closed_set = set()
+    while open_set:
+        current = heappop(open_set)
+        if current.position == goal:
+            path = []
+            while current is not None:
+                path.append(current.position)
+                current = current.parent
+            return path[::-1]
+        if current.position in closed_set:
+            continue
+        closed_set.add(current.position)
+        direcciones = list(range(4))
+        direcciones.remove(rumbo)
+        direcciones.insert(0, rumbo)
+        for d in direcciones:
+            dx, dy = MOVIMIENTOS[d]
+            new_pos = (current.position[0] + dx, current.position[1] + dy)
+            if not (0 <= new_pos[0] < cols and 0 <= new_pos[1] < rows):
+                continue
+            if hay_colision(new_pos):
+                continue
+            g_cost = current.g_cost + 1 + COSTO_GIRO[current.direction][d]
+            h_cost = manhattan(new_pos, goal)
+            if d == rumbo:
+                h_cost *= 0.8
+            heappush(open_set, PathNode(new_pos, g_cost, h_cost, current, d))
+    return None
+
+
+def costo_camino(path, rumbo):
+    costo = 0
+    for a, b in zip(path, path[1:]):
+        d = MOVIMIENTOS.index((b[0] - a[0], b[1] - a[1]))
+        costo += 1 + COSTO_GIRO[rumbo][d]
+        rumbo = d
+    return costo
+
+
+def escenarios(tam, consultas, n_tractores, rng):
+    for _ in range(consultas):
+        start = (rng.randrange(tam), rng.randrange(tam))
+        goal = (rng.randrange(tam), rng.randrange(tam))
+        otros = [np.array([rng.uniform(0, tam * GRID_SIZE), rng.uniform(0, tam * GRID_SIZE)])
+                 for _ in range(n_tractores)]
+        yield start, goal, rng.randrange(4), otros
+
+
+def main():
+    parser = argparse.ArgumentParser(description="A* original frente a PlanificadorAEstrella en rejillas de distintos tamaños")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[30, 100, 300])
+    parser.add_argument("--consultas", type=int, default=20)
+    parser.add_argument("--tractores", type=int, default=3)
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'tamaño':>7} {'original ms':>12} {'nuevo ms':>10} {'speedup':>8} {'iguales':>8} {'costo <=':>9}")
+    for tam in args.tamanos:
+        rng = random.Random(args.semilla)
+        planificador = PlanificadorAEstrella(tam, tam, MOVIMIENTOS, COSTO_GIRO)
+        t_original = t_nuevo = 0.0
+        iguales = no_peor = total = 0
+        for start, goal, rumbo, otros in escenarios(tam, args.consultas, args.tractores, rng):
+            t0 = time.perf_counter()
+            esperado = encontrar_camino_original(start, goal, rumbo, otros, tam, tam)
+            t1 = time.perf_counter()
+            bloqueadas = celdas_bloqueadas(otros, tam, tam, GRID_SIZE, GRID_SIZE * 2)
+            obtenido = planificador.buscar(start, goal, rumbo, bloqueadas, rumbo_preferido=rumbo)
+            t2 = time.perf_counter()
+            t_original += t1 - t0
+            t_nuevo += t2 - t1
+            total += 1
+            iguales += esperado == obtenido
+            if esperado is None:
+                no_peor += obtenido is None
+            else:
+                no_peor += obtenido is not None and costo_camino(obtenido, rumbo) <= costo_camino(esperado, rumbo)
+        print(f"{tam:>7} {1000 * t_original / total:>12.2f} {1000 * t_nuevo / total:>10.2f} "
+              f"{t_original / max(t_nuevo, 1e-9):>7.1f}x {iguales:>4}/{total:<3} {no_peor:>5}/{total:<3}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# Entrenamiento de Q-learning (simulacionqlearning/entrenamiento.py): transiciones por
+# segundo y memoria de las Q-tables con una tabla por tractor, una tabla compartida por
+# todos, la compartida en memoria compartida (con su cerrojo) y la compartida entre
+# varios procesos que aprenden a la vez.
+#
+#   python benchmarks/bench_qlearning.py --episodios 512 --procesos 2 4
+#
+# Con varios procesos cada uno avanza --entornos campos propios; las transiciones por
+# segundo solo crecen con los procesos si la máquina tiene núcleos libres.
+import argparse
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(RAIZ)
+sys.path.append(os.path.join(RAIZ, "simulacionqlearning"))
+from entrenamiento import EntornosCosecha, Entrenador
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transiciones por segundo y memoria del entrenamiento de Q-learning")
+    parser.add_argument("--episodios", type=int, default=512)
+    parser.add_argument("--entornos", type=int, default=256)
+    parser.add_argument("--filas", type=int, default=30)
+    parser.add_argument("--columnas", type=int, default=30)
+    parser.add_argument("--tractores", type=int, default=3)
+    parser.add_argument("--procesos", type=int, nargs="+", default=[2])
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    casos = [("por tractor", {}, 1), ("compartida", {'compartida': True}, 1),
+             ("compartida shm", {'compartida': True, 'memoria_compartida': True}, 1)]
+    casos += [(f"{p} procesos", {'compartida': True, 'memoria_compartida': True}, p) for p in args.procesos]
+
+    print(f"{'caso':>15} {'trans/s':>10} {'segundos':>9} {'tabla KB':>9} {'retorno':>9}")
+    for nombre, opciones, procesos in casos:
+        entornos = EntornosCosecha(args.entornos, args.filas, args.columnas, args.tractores, 50, 5000)
+        entrenador = Entrenador(entornos, semilla=args.semilla, **opciones)
+        try:
+            if procesos > 1:
+                resumen = entrenador.correr_en_procesos(procesos, args.episodios)
+            else:
+                resumen = entrenador.correr(args.episodios)
+            print(f"{nombre:>15} {resumen['transiciones_por_segundo']:>10} {resumen['segundos']:>9.2f} "
+                  f"{entrenador.nbytes() / 1024:>9.1f} {resumen['retorno_medio']:>9.1f}")
+        finally:
+            entrenador.liberar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# Costo de replanificar cuando otros tractores se mueven: A* desde cero en cada
+# cambio (PlanificadorAEstrella) frente a D* Lite (PlanificadorIncremental).
+#
+#   python benchmarks/bench_replanificacion.py --tamanos 50 100 200 --pasos 40 [--muro]
+#
+# Con --muro se agrega una pared fija con un hueco entre el tractor y la meta:
+# la heurística Manhattan deja de ser buena y A* explora mucho en cada llamada,
+# mientras que D* Lite reutiliza esa búsqueda y solo repara lo que cambió.
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from planificador import PlanificadorAEstrella, PlanificadorIncremental, celdas_bloqueadas
+from bench_astar import GRID_SIZE, MOVIMIENTOS, COSTO_GIRO
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Costo de replanificar: A* desde cero frente a D* Lite")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[50, 100, 200])
+    parser.add_argument("--pasos", type=int, default=40)
+    parser.add_argument("--tractores", type=int, default=3)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--muro", action="store_true", help="Pared fija con un hueco en el camino")
+    args = parser.parse_args()
+
+    print(f"{'tamaño':>7} {'A* ms':>8} {'D* ms':>8} {'A* exp':>8} {'D* exp':>8}")
+    for tam in args.tamanos:
+        rng = random.Random(args.semilla)
+        completo = PlanificadorAEstrella(tam, tam, MOVIMIENTOS, COSTO_GIRO)
+        incremental = PlanificadorIncremental(tam, tam, MOVIMIENTOS, COSTO_GIRO)
+        inicio, meta, rumbo = (0, tam // 2), (tam - 1, tam // 2), 1
+        incremental.reiniciar(meta)
+
+        # Otros tractores que cruzan el campo en vertical, cerca del camino
+        otros = [np.array([rng.uniform(0.2, 0.8) * tam * GRID_SIZE, rng.uniform(0, tam * GRID_SIZE)])
+                 for _ in range(args.tractores)]
+        velocidades = [rng.choice([-1, 1]) * GRID_SIZE for _ in otros]
+        muro = []
+        if args.muro:
+            muro = [y * tam + tam * 3 // 4 for y in range(tam) if y != tam - 2]
+        bloqueadas = celdas_bloqueadas(otros, tam, tam, GRID_SIZE, GRID_SIZE * 2) + muro
+        incremental.replanificar(inicio, rumbo, bloqueadas)  # Búsqueda inicial, no se mide
+
+        t_completo = t_incremental = 0.0
+        exp_completo = exp_incremental = 0
+        for _ in range(args.pasos):
+            for otro, v in zip(otros, velocidades):
+                otro[1] = (otro[1] + v) % (tam * GRID_SIZE)
+            bloqueadas = celdas_bloqueadas(otros, tam, tam, GRID_SIZE, GRID_SIZE * 2) + muro
+
+            t0 = time.perf_counter()
+            esperado = completo.buscar(inicio, meta, rumbo, bloqueadas)
+            t1 = time.perf_counter()
+            camino = incremental.replanificar(inicio, rumbo, bloqueadas)
+            t2 = time.perf_counter()
+            t_completo += t1 - t0
+            t_incremental += t2 - t1
+            exp_completo += completo.expansiones
+            exp_incremental += incremental.expansiones
+
+            # El tractor avanza una celda por su camino
+            if camino and len(camino) > 1:
+                dx, dy = camino[1][0] - camino[0][0], camino[1][1] - camino[0][1]
+                rumbo = MOVIMIENTOS.index((dx, dy))
+                inicio = camino[1]
+            if esperado is None or inicio == meta:
+                break
+
+        print(f"{tam:>7} {1000 * t_completo / args.pasos:>8.2f} {1000 * t_incremental / args.pasos:>8.2f} "
+              f"{exp_completo // args.pasos:>8} {exp_incremental // args.pasos:>8}")
+
+
+if __name__ == "__main__":
+    main()
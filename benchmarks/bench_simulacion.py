@@ -0,0 +1,225 @@
+# Banco de pruebas de los simuladores completos en escenarios fijos: pasos por
+# segundo, latencia (percentiles) de las llamadas de planificación y de dibujo,
+# memoria pico y pasos hasta cosechar todo el campo.
+#
+#   python benchmarks/bench_simulacion.py --salida bench.json
+#   python benchmarks/bench_simulacion.py --escenarios chico mediano --variantes astar --comparar bench.json
+#
+# Cada (variante, escenario) corre en un proceso nuevo para que la memoria pico
+# (ru_maxrss) sea solo suya. La salida JSON lleva el commit, así que dos corridas
+# sobre commits distintos se comparan con --comparar.
+import argparse
+import concurrent.futures
+import importlib
+import json
+import multiprocessing as mp
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(RAIZ)
+
+# Escenarios: (filas, columnas, tractores, pasos máximos). None en tractores usa el
+# TRACTOR_COUNT del simulador; el chico es el campo de 30x30 de las constantes
+ESCENARIOS = {
+    'chico': (30, 30, None, 5000),
+    'mediano': (100, 100, 10, 500),
+    'grande': (300, 300, 50, 200),
+    'enorme': (1000, 1000, 200, 50),
+}
+# Variantes: módulo y parámetros del modelo
+VARIANTES = {
+    'etapa1': ('etapa1', {'asignacion': 'lote'}),
+    'etapa1-voraz': ('etapa1', {'asignacion': 'voraz'}),
+    'etapa1-eventos': ('etapa1', {'asignacion': 'lote', 'eventos': True}),
+    'astar': ('simulacion_astar', {'telemetria': False, 'planificacion': 'astar'}),
+    'astar-incremental': ('simulacion_astar', {'telemetria': False, 'planificacion': 'incremental'}),
+    'astar-cooperativa': ('simulacion_astar', {'telemetria': False, 'planificacion': 'cooperativa'}),
+    'astar-voraz': ('simulacion_astar', {'telemetria': False, 'asignacion': 'voraz'}),
+    'astar-eventos': ('simulacion_astar', {'telemetria': False, 'eventos': True}),
+    'qlearning': ('simulacionqlearning.etapa2', {'telemetria': False, 'guardar_q': False}),
+}
+# Métodos cronometrados en cada llamada (del modelo o de cada tractor), si existen
+LLAMADAS_MODELO = ['asignar_objetivos', 'obtener_parcela_prioritaria', 'obtener_parcelas_disponibles']
+LLAMADAS_TRACTOR = ['encontrar_camino']
+PERCENTILES = [50, 90, 99]
+
+
+def cronometrar(funcion, muestras):
+    def envuelta(*args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            muestras.append(time.perf_counter() - t0)
+    return envuelta
+
+
+def latencias(muestras):
+    # Percentiles en milisegundos
+    if not muestras:
+        return None
+    ms = np.array(muestras) * 1000
+    resumen = {f"p{p}": round(float(np.percentile(ms, p)), 4) for p in PERCENTILES}
+    resumen['max'] = round(float(ms.max()), 4)
+    resumen['llamadas'] = len(ms)
+    return resumen
+
+
+def memoria_mb():
+    # Memoria residente pico del proceso (ru_maxrss está en KB en Linux y en bytes en macOS)
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(pico / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def medir(variante, escenario, render, limite_segundos, fases=False):
+    # Corre un escenario en este proceso y devuelve sus métricas
+    nombre_modulo, parametros = VARIANTES[variante]
+    filas, columnas, tractores, max_pasos = ESCENARIOS[escenario]
+    modulo = importlib.import_module(nombre_modulo)
+    parametros = dict(parametros, filas=filas, columnas=columnas, seed=0, perfil=fases)
+    if tractores is not None:
+        parametros['tractores'] = tractores
+    memoria_base = memoria_mb()
+
+    t0 = time.perf_counter()
+    modelo = modulo.HarvestSimulation(parametros)
+    modelo.setup()
+    setup_s = time.perf_counter() - t0
+
+    muestras = {nombre: [] for nombre in LLAMADAS_MODELO + LLAMADAS_TRACTOR}
+    for nombre in LLAMADAS_MODELO:
+        if hasattr(modelo, nombre):
+            setattr(modelo, nombre, cronometrar(getattr(modelo, nombre), muestras[nombre]))
+    for tractor in modelo.tractores:
+        for nombre in LLAMADAS_TRACTOR:
+            if hasattr(tractor, nombre):
+                setattr(tractor, nombre, cronometrar(getattr(tractor, nombre), muestras[nombre]))
+
+    # El dibujo se mide con la cámara encuadrando todo el campo en la ventana del simulador
+    renderizador = None
+    if render:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        from renderizado import RenderizadorPygame
+        renderizador = RenderizadorPygame(variante, modulo.WIDTH, modulo.HEIGHT, modulo.GRID_SIZE)
+        muestras['render'] = []
+        modelo.agregar_observador(renderizador)
+        renderizador.actualizar = cronometrar(renderizador.actualizar, muestras['render'])
+
+    pasos = llamadas = 0
+    pasos_cosecha = None
+    t0 = time.perf_counter()
+    while pasos < max_pasos and time.perf_counter() - t0 < limite_segundos:
+        modelo.step()
+        llamadas += 1
+        # Con avance por eventos un step() puede cubrir varios pasos simulados
+        pasos = getattr(modelo, 'pasos', llamadas)
+        if modelo.campo.todo_cosechado():
+            pasos_cosecha = pasos
+            break
+    duracion = time.perf_counter() - t0
+    if renderizador:
+        renderizador.cerrar()
+
+    return {
+        'variante': variante,
+        'escenario': escenario,
+        'filas': filas,
+        'columnas': columnas,
+        'tractores': len(modelo.tractores),
+        'pasos': pasos,
+        'llamadas_step': llamadas,
+        'segundos': round(duracion, 3),
+        'pasos_por_segundo': round(pasos / duracion, 2) if duracion > 0 else None,
+        'setup_s': round(setup_s, 3),
+        'pasos_cosecha': pasos_cosecha,
+        'segundos_cosecha': round(duracion, 3) if pasos_cosecha else None,
+        'cosechadas': modelo.campo.total_cosechadas,
+        'memoria_base_mb': memoria_base,
+        'memoria_pico_mb': memoria_mb(),
+        'latencias_ms': {nombre: latencias(m) for nombre, m in muestras.items() if m},
+        'fases': modelo.perfil.resumen() if fases else None,
+    }
+
+
+def medir_aislado(variante, escenario, render, limite_segundos, fases=False):
+    # Un proceso nuevo por medición (memoria pico propia y sin cachés de la anterior)
+    with concurrent.futures.ProcessPoolExecutor(1, mp_context=mp.get_context("spawn")) as ejecutor:
+        return ejecutor.submit(medir, variante, escenario, render, limite_segundos, fases).result()
+
+
+def entorno():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'fecha': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'maquina': platform.machine(),
+        'procesador': platform.processor(),
+    }
+
+
+def imprimir(resultados, anteriores=None):
+    # Tabla legible; con anteriores agrega la razón de pasos/s contra esa corrida
+    previos = {(r['variante'], r['escenario']): r for r in anteriores or []}
+    print(f"{'variante':<18} {'escenario':<8} {'pasos':>6} {'pasos/s':>9} {'cosecha':>8} {'pico MB':>8} "
+          f"{'camino p50/p99 ms':>18} {'asignar p50 ms':>15} {'dibujo p50 ms':>14}"
+          + (f" {'vs ant.':>8}" if anteriores else ""))
+    for r in resultados:
+        camino = r['latencias_ms'].get('encontrar_camino')
+        asignar = (r['latencias_ms'].get('asignar_objetivos') or r['latencias_ms'].get('obtener_parcela_prioritaria')
+                   or r['latencias_ms'].get('obtener_parcelas_disponibles'))
+        camino = f"{camino['p50']}/{camino['p99']}" if camino else '-'
+        asignar = asignar['p50'] if asignar else '-'
+        dibujo = r['latencias_ms']['render']['p50'] if 'render' in r['latencias_ms'] else '-'
+        linea = (f"{r['variante']:<18} {r['escenario']:<8} {r['pasos']:>6} {r['pasos_por_segundo']:>9} "
+                 f"{r['pasos_cosecha'] or '-':>8} {r['memoria_pico_mb']:>8} {camino:>18} {asignar:>15} {dibujo:>14}")
+        previo = previos.get((r['variante'], r['escenario']))
+        if anteriores:
+            razon = f"{r['pasos_por_segundo'] / previo['pasos_por_segundo']:.2f}x" if previo else '-'
+            linea += f" {razon:>8}"
+        print(linea)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banco de pruebas de los simuladores de cosecha")
+    parser.add_argument("--escenarios", nargs="+", choices=list(ESCENARIOS), default=list(ESCENARIOS))
+    parser.add_argument("--variantes", nargs="+", choices=list(VARIANTES), default=list(VARIANTES))
+    parser.add_argument("--render", action="store_true", help="Medir también el dibujo (SDL dummy si no hay pantalla)")
+    parser.add_argument("--limite-segundos", type=float, default=60, help="Tiempo máximo de simulación por medición")
+    parser.add_argument("--fases", action="store_true",
+                        help="Guardar también los tiempos por fase de step() (perfil.Perfilador)")
+    parser.add_argument("--salida", help="Archivo JSON con los resultados")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior para comparar pasos/s")
+    args = parser.parse_args()
+
+    resultados = []
+    for escenario in args.escenarios:
+        for variante in args.variantes:
+            print(f"midiendo {variante} en {escenario}...", file=sys.stderr)
+            resultados.append(medir_aislado(variante, escenario, args.render, args.limite_segundos, args.fases))
+
+    anteriores = None
+    if args.comparar:
+        with open(args.comparar) as archivo:
+            anteriores = json.load(archivo)['resultados']
+    imprimir(resultados, anteriores)
+
+    if args.salida:
+        with open(args.salida, "w") as archivo:
+            json.dump({'entorno': entorno(), 'resultados': resultados}, archivo, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import time
+
+
+# Bucle principal con paso de simulación fijo.
+# El modelo siempre avanza de a un step(), así que la dinámica de los tractores no
+# depende del reloj. El reloj de pared solo decide cuántos pasos tocan en cada
+# cuadro (pasos_por_segundo * velocidad) y el renderizador dibuja como mucho fps_max
+# cuadros por segundo: a velocidad alta se ejecutan muchos pasos por cuadro.
+# Con velocidad=None los pasos corren sin límite y solo se dibuja a fps_max.
+# Sin renderizador los pasos corren sin pausa.
+# Al quedar todo el campo cosechado (Campo.todo_cosechado, O(1)) no se dan más pasos:
+# sin renderizador el bucle termina y con renderizador la ventana sigue mostrando el final
+# hasta cerrarla (o termina, si se pidió un número de pasos).
+# pasos cuenta pasos simulados (modelo.pasos, que con avance por eventos sube varios en un
+# step()) desde los que ya tenía el modelo; si el modelo no los cuenta, llamadas a step().
+def ejecutar(modelo, renderizador=None, pasos=None, pasos_por_segundo=20, velocidad=1.0, fps_max=30,
+             max_pasos_por_cuadro=1000):
+    # Devuelve el número de pasos ejecutados
+    paso = 0  # Llamadas a step()
+    inicial = getattr(modelo, 'pasos', 0)
+    hechos = lambda: getattr(modelo, 'pasos', inicial + paso) - inicial
+    terminado = modelo.campo.todo_cosechado
+    queda = lambda: not terminado() and (pasos is None or hechos() < pasos)
+    if renderizador is None:
+        while queda():
+            modelo.step()
+            paso += 1
+        return hechos()
+
+    dt = None if not velocidad or not pasos_por_segundo else 1.0 / (pasos_por_segundo * velocidad)
+    intervalo_cuadro = 1.0 / fps_max
+    acumulado = 0.0
+    anterior = time.perf_counter()
+    renderizador.actualizar(modelo)
+    while pasos is None or queda():
+        if not renderizador.procesar_eventos():
+            break
+
+        ahora = time.perf_counter()
+        acumulado += ahora - anterior
+        anterior = ahora
+        restantes = max_pasos_por_cuadro if pasos is None else min(max_pasos_por_cuadro, pasos - hechos())
+        n = 0
+        if dt is None:
+            # Sin límite: pasos hasta agotar el tiempo del cuadro
+            limite = ahora + intervalo_cuadro
+            while n < restantes and (n == 0 or time.perf_counter() < limite) and queda():
+                modelo.step()
+                n += 1
+                paso += 1
+        else:
+            pedidos = min(int(acumulado / dt), restantes)
+            while n < pedidos and queda():
+                modelo.step()
+                n += 1
+                paso += 1
+            # Si la simulación no da abasto se descarta el atraso en vez de acumularlo
+            acumulado = min(acumulado - pedidos * dt, dt)
+
+        if n:
+            renderizador.actualizar(modelo)
+
+        # Dormir hasta el próximo cuadro o el próximo paso, lo que llegue antes
+        espera = intervalo_cuadro if dt is None else max(intervalo_cuadro, dt - acumulado)
+        espera -= time.perf_counter() - ahora
+        if espera > 0:
+            time.sleep(espera)
+    return hechos()
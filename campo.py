@@ -0,0 +1,93 @@
+import numpy as np
+
+
+# Estado del campo guardado en arreglos de NumPy (uno por atributo de parcela)
+# en lugar de ROWS x COLS agentes. Un campo de 1000x1000 ocupa ~4 MB.
+class Campo:
+    def __init__(self, rows, cols, liberar_al_cosechar=True):
+        self.rows = rows
+        self.cols = cols
+        # etapa2 mantiene la reserva tras cosechar hasta que expira
+        self.liberar_al_cosechar = liberar_al_cosechar
+        self.ready_to_harvest = np.ones((rows, cols), dtype=bool)
+        self.harvested = np.zeros((rows, cols), dtype=bool)
+        self.reservada = np.zeros((rows, cols), dtype=bool)
+        # Conteos que mantienen harvest/reservar/liberar: el avance se consulta en O(1)
+        self.total_listas = rows * cols
+        self.total_reservadas = 0
+        self.total_cosechadas = 0
+        # IndiceParcelas, ReservasParcelas y Progreso se registran aquí para enterarse de los cambios
+        self.indice = None
+        self.reservas = None
+        self.progreso = None
+        self.cambios = None  # render_proceso.CeldasCambiadas: celdas a reenviar al dibujo
+
+    @property
+    def shape(self):
+        return (self.rows, self.cols)
+
+    def harvest(self, row, col):
+        if self.ready_to_harvest[row, col]:
+            reservada = self.reservada[row, col]
+            if self.indice is not None and not reservada:
+                self.indice.actualizar(row, col, -1)
+            soltar = reservada and self.liberar_al_cosechar
+            if self.progreso is not None:
+                self.progreso.cosechar(row, col, soltar)
+            if self.cambios is not None:
+                self.cambios.marcar(row, col)
+            self.ready_to_harvest[row, col] = False
+            self.harvested[row, col] = True
+            self.total_listas -= 1
+            self.total_cosechadas += 1
+            if soltar:
+                self.total_reservadas -= 1
+            if self.liberar_al_cosechar:
+                self.reservada[row, col] = False
+                if self.reservas is not None:
+                    self.reservas.olvidar(row, col)
+
+    def reservar(self, row, col):
+        if not self.reservada[row, col]:
+            if self.indice is not None and self.ready_to_harvest[row, col]:
+                self.indice.actualizar(row, col, -1)
+            if self.progreso is not None:
+                self.progreso.reservar(row, col, 1)
+            if self.cambios is not None:
+                self.cambios.marcar(row, col)
+            self.total_reservadas += 1
+            self.reservada[row, col] = True
+
+    def liberar(self, row, col):
+        if self.reservada[row, col]:
+            if self.indice is not None and self.ready_to_harvest[row, col]:
+                self.indice.actualizar(row, col, 1)
+            if self.progreso is not None:
+                self.progreso.reservar(row, col, -1)
+            if self.cambios is not None:
+                self.cambios.marcar(row, col)
+            self.total_reservadas -= 1
+            self.reservada[row, col] = False
+
+    def recontar(self):
+        # Recalcula los conteos desde los arreglos (tras restaurarlos de un punto de control)
+        self.total_listas = int(np.count_nonzero(self.ready_to_harvest))
+        self.total_reservadas = int(np.count_nonzero(self.reservada))
+        self.total_cosechadas = int(np.count_nonzero(self.harvested))
+        if self.progreso is not None:
+            self.progreso.reconstruir()
+        if self.cambios is not None:
+            self.cambios.marcar_todas()
+
+    def disponible(self, row, col):
+        return self.ready_to_harvest[row, col] and not self.reservada[row, col]
+
+    def disponibles(self, r0=0, r1=None, c0=0, c1=None):
+        # Máscara de parcelas listas para cosechar y sin reservar (opcionalmente de un bloque)
+        return self.ready_to_harvest[r0:r1, c0:c1] & ~self.reservada[r0:r1, c0:c1]
+
+    def todo_cosechado(self):
+        return self.total_listas == 0
+
+    def nbytes(self):
+        return self.ready_to_harvest.nbytes + self.harvested.nbytes + self.reservada.nbytes
@@ -0,0 +1,59 @@
+import numpy as np
+
+
+# Plan de cobertura precalculado (boustrophedon).
+# El campo se divide en franjas de columnas, una por tractor, y cada franja se
+# recorre en serpentina: una columna hacia arriba, la siguiente hacia abajo. El
+# objetivo de un tractor es siempre la siguiente celda de su ruta (O(1) por paso) y
+# la celda donde llenará la tolva se conoce de antemano, así que el contenedor puede
+# esperarlo allí en vez de seguirlo.
+class PlanCobertura:
+    def __init__(self, rows, cols, columnas_iniciales, carga_max):
+        # columnas_iniciales: columna de partida de cada tractor; las franjas se reparten
+        # de izquierda a derecha en el mismo orden que los tractores
+        self.rows = rows
+        self.cols = cols
+        self.carga_max = carga_max
+        n = len(columnas_iniciales)
+        limites = np.linspace(0, cols, n + 1).round().astype(int)
+        orden = np.argsort(columnas_iniciales, kind='stable')
+        self.rutas = [None] * n
+        for i, c0, c1 in zip(orden, limites[:-1], limites[1:]):
+            # Se empieza por el borde de la franja más cercano al tractor
+            desde_derecha = columnas_iniciales[i] >= (c0 + c1) / 2
+            self.rutas[i] = self._serpentina(c0, c1, desde_derecha)
+        self.avance = [0] * n  # Posición en la ruta de la celda objetivo actual
+
+    def _serpentina(self, c0, c1, desde_derecha):
+        # Celdas (row, col) de la franja [c0, c1); los tractores parten desde abajo
+        columnas = range(c1 - 1, c0 - 1, -1) if desde_derecha else range(c0, c1)
+        subida = np.arange(self.rows - 1, -1, -1)
+        ruta = [np.stack([subida if k % 2 == 0 else subida[::-1], np.full(self.rows, col)], axis=1)
+                for k, col in enumerate(columnas)]
+        return np.concatenate(ruta) if ruta else np.empty((0, 2), dtype=int)
+
+    def siguiente(self, i, campo):
+        # Siguiente celda (row, col) de la ruta del tractor i sin cosechar, o None al terminar
+        ruta = self.rutas[i]
+        k = self.avance[i]
+        while k < len(ruta) and campo.harvested[ruta[k, 0], ruta[k, 1]]:
+            k += 1
+        self.avance[i] = k
+        return (int(ruta[k, 0]), int(ruta[k, 1])) if k < len(ruta) else None
+
+    def punto_encuentro(self, i, carga_actual):
+        # Celda donde el tractor i llenará la tolva (o el final de su ruta), o None
+        ruta = self.rutas[i]
+        k = min(self.avance[i] + self.carga_max - carga_actual - 1, len(ruta) - 1)
+        if k < self.avance[i]:
+            return None
+        return (int(ruta[k, 0]), int(ruta[k, 1]))
+
+    def estimar_pasos(self, cargas, pasos_por_celda, pasos_descarga):
+        # Pasos hasta cosechar todo el campo: manda la ruta más larga
+        estimado = 0
+        for i, ruta in enumerate(self.rutas):
+            restantes = len(ruta) - self.avance[i]
+            descargas = (cargas[i] + restantes) // self.carga_max
+            estimado = max(estimado, restantes * pasos_por_celda + descargas * pasos_descarga)
+        return estimado
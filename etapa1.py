@@ -1,7 +1,19 @@
-import pygame
+import argparse
 import numpy as np
 import random
 import agentpy as ap
+from campo import Campo
+from reservas import ReservasParcelas
+from progreso import Progreso
+from indice_parcelas import IndiceParcelas
+from flota import Flota
+from asignacion import asignar_parcelas
+from cobertura import PlanCobertura
+from bucle import ejecutar
+from perfil import Perfilador
+from eventos import Agenda
+from punto_control import cargar, leer, guardar, GuardadoPeriodico
+from registro import Registrador
 
 # Configuración inicial
 WIDTH, HEIGHT = 800, 600  # Ampliamos el ancho para dejar espacio a las gráficas
@@ -9,58 +21,62 @@ GRID_SIZE = 20
 ROWS, COLS = HEIGHT // GRID_SIZE, (WIDTH - 200) // GRID_SIZE  # Ajustamos las columnas para el campo
 TRACTOR_COUNT = 2
 TRACTOR_SPEED = 5
+DESCARGA_DURACION = 30  # Pasos que tarda una descarga en el contenedor
+PASOS_POR_SEGUNDO = 20  # Ritmo de la simulación en pantalla a velocidad 1
 
-# Colores
-COLOR_EMPTY = (255, 255, 255)
-COLOR_HARVESTED = (200, 200, 200)
-COLOR_READY = (100, 255, 100)
-COLOR_TRACTOR = (255, 100, 100)
+# Colores del contenedor (el resto de colores vive en renderizado.py)
 COLOR_CONTAINER = (150, 150, 255)
 COLOR_UNLOADING = (255, 255, 0)
-COLOR_FUEL = (100, 100, 255)
-COLOR_CARGO = (255, 165, 0)
-
-# Inicialización de pygame
-pygame.init()
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Simulación de Cosecha con Gráficas en Tiempo Real")
-
-# Clase para representar una parcela
-class Parcel(ap.Agent):
-    def setup(self):
-        self.ready_to_harvest = True
-        self.harvested = False
-        self.reservada = False
-    
-    def harvest(self):
-        if self.ready_to_harvest:
-            self.ready_to_harvest = False
-            self.harvested = True
-            self.reservada = False
 
 # Clase para el tractor/agente
+# Posición, velocidad, combustible y carga viven en los arreglos de model.flota
 class Tractor(ap.Agent):
+    # Atributos que guarda un punto de control (punto_control.py)
+    ESTADO = ['objetivo_actual', 'descargando', 'descarga_duracion', 'contador_descarga', 'contenedor.color']
+
     def setup(self, initial_position):
-        self.speed = TRACTOR_SPEED
-        self.carga_max = 50
-        self.carga_actual = 0
+        self.flota = self.model.flota
+        self.id_flota = self.flota.agregar(initial_position)
+        self.position = self.flota.posiciones[self.id_flota]  # Vista sobre el arreglo de la flota
         self.combustible_max = 1000
-        self.combustible = self.combustible_max
-        self.position = np.array(initial_position, dtype=float)
         self.objetivo_actual = None
         self.descargando = False
         self.descarga_duracion = 0
         self.contador_descarga = 0
-        self.contenedor = Container(self.position.copy())
+        self.contenedor = Container(self.flota, self.id_flota)
+
+    @property
+    def speed(self):
+        return self.flota.velocidades[self.id_flota]
+
+    @speed.setter
+    def speed(self, valor):
+        self.flota.velocidades[self.id_flota] = valor
+
+    @property
+    def combustible(self):
+        return self.flota.combustible[self.id_flota]
+
+    @combustible.setter
+    def combustible(self, valor):
+        self.flota.combustible[self.id_flota] = valor
+
+    @property
+    def carga_actual(self):
+        return self.flota.carga[self.id_flota]
+
+    @carga_actual.setter
+    def carga_actual(self, valor):
+        self.flota.carga[self.id_flota] = valor
+
+    @property
+    def carga_max(self):
+        return self.flota.carga_max[self.id_flota]
     
     def mover(self, destino):
+        # El movimiento se aplica junto con el del resto de la flota en Flota.avanzar()
         if self.combustible > 0 and not self.descargando:
-            direccion = destino - self.position
-            distancia = np.linalg.norm(direccion)
-            if distancia > 0:
-                direccion = (direccion / distancia) * self.speed
-                self.position += direccion
-                self.combustible -= 0.05 * np.linalg.norm(direccion)
+            self.flota.solicitar_movimiento(self.id_flota, destino)
 
     def cargar(self):
         if self.carga_actual < self.carga_max:
@@ -71,9 +87,10 @@ class Tractor(ap.Agent):
     def descargar(self):
         self.descargando = True
         self.carga_actual = 0
-        self.descarga_duracion = 30  # Duración de descarga
+        self.descarga_duracion = DESCARGA_DURACION
         self.contador_descarga = self.descarga_duracion
         self.contenedor.ir_al_silo_flag = True  # Enviar mensaje al contenedor para ir al silo
+        self.speed = self.model.velocidad  # Por si esperó al contenedor con velocidad 0
 
     def esperar(self):
         self.speed = 0
@@ -86,88 +103,246 @@ class Tractor(ap.Agent):
             self.esperar()
 
 # Clase para el contenedor
+# Sigue al tractor o va al silo en Flota.mover_contenedores()
 class Container:
-    def __init__(self, initial_position):
-        self.position = np.array(initial_position, dtype=float)
+    def __init__(self, flota, id_flota):
+        self.flota = flota
+        self.id_flota = id_flota
+        self.position = flota.contenedores[id_flota]  # Vista sobre el arreglo de la flota
         self.color = COLOR_CONTAINER
-        self.velocidad = TRACTOR_SPEED * 1.2
-        self.ir_al_silo_flag = False  # Bandera para ir al silo
-
-    def seguir_tractor(self, tractor_pos):
-        # Mueve el contenedor para seguir al tractor con retraso
-        if not self.ir_al_silo_flag:
-            direccion = tractor_pos - self.position
-            distancia = np.linalg.norm(direccion)
-            if distancia > GRID_SIZE * 2:  # Mantenerse a una distancia
-                direccion = (direccion / distancia) * self.velocidad
-                self.position += direccion
-
-    def ir_al_silo(self, silo_pos):
-        # Mueve el contenedor hacia el silo
-        if self.ir_al_silo_flag:
-            direccion = silo_pos - self.position
-            distancia = np.linalg.norm(direccion)
-            if distancia > 10:
-                print("Moviendo contenedor al silo")
-                direccion = (direccion / distancia) * self.velocidad
-                self.position += direccion
-            if distancia < 10:
-                self.ir_al_silo_flag = False
+
+    @property
+    def ir_al_silo_flag(self):  # Bandera para ir al silo
+        return self.flota.al_silo[self.id_flota]
+
+    @ir_al_silo_flag.setter
+    def ir_al_silo_flag(self, valor):
+        self.flota.al_silo[self.id_flota] = valor
 
 
 # Clase para el modelo de simulación
 class HarvestSimulation(ap.Model):
+    # Estado que guarda un punto de control (punto_control.py)
+    ESTADO_ARREGLOS = ['campo', 'flota', 'reservas_parcelas']
+    ESTADO = ['pasos', 'pasos_saltados', 'agenda', 'dormidos', 'cobertura', 'progreso.historial',
+              'reservas_parcelas.cola', 'reservas_parcelas.por_dueno']
+
     def setup(self):
-        self.campo = [[Parcel(self) for _ in range(COLS)] for _ in range(ROWS)]
+        # 'lote': asignación conjunta de parcelas (húngaro); 'voraz': cada tractor en orden;
+        # 'cobertura': rutas en serpentina precalculadas por franjas (PlanCobertura)
+        self.asignacion = self.p.get('asignacion', 'lote')
+        # Campo y flota parametrizables (experimentos.py); por defecto, las constantes del módulo
+        self.filas = self.p.get('filas', ROWS)
+        self.columnas = self.p.get('columnas', COLS)
+        self.velocidad = self.p.get('velocidad', TRACTOR_SPEED)
+        n_tractores = self.p.get('tractores', TRACTOR_COUNT)
+        # Las decisiones usan random y np.random globales: se siembran si hay semilla
+        if 'seed' in self.p:
+            random.seed(self.p['seed'])
+            np.random.seed(self.p['seed'] % 2**32)
+
+        self.campo = Campo(self.filas, self.columnas)
+        self.indice = IndiceParcelas(self.campo)
+        self.progreso = Progreso(self.campo)
+        # Cada reserva lleva al tractor dueño; con reserva_duracion (pasos) además vence,
+        # así la parcela de un tractor que no llega (p.ej. sin combustible) vuelve a quedar libre
+        self.reservas_parcelas = ReservasParcelas(self.campo, self.p.get('reserva_duracion'))
+        self.flota = Flota(
+            n_tractores, velocidad=self.velocidad, combustible_max=1000, carga_max=self.p.get('carga_max', 50),
+            velocidad_contenedor=self.velocidad * 1.2, distancia_seguimiento=GRID_SIZE * 2,
+            factor_combustible=0.05
+        )
         
-        espaciado_x = (WIDTH - 180) // (TRACTOR_COUNT)
+        ancho_campo = self.columnas * GRID_SIZE
+        espaciado_x = (ancho_campo + 20) // n_tractores
         posiciones_iniciales = [
-            (WIDTH - 200 - i * espaciado_x, HEIGHT - GRID_SIZE // 2) for i in range(TRACTOR_COUNT)
+            (ancho_campo - i * espaciado_x, self.filas * GRID_SIZE - GRID_SIZE // 2) for i in range(n_tractores)
         ]
         
         self.tractores = [Tractor(self, initial_position=pos) for pos in posiciones_iniciales]
+
+        self.cobertura = None
+        if self.asignacion == 'cobertura':
+            self.cobertura = PlanCobertura(self.filas, self.columnas, [int(pos[0] // GRID_SIZE) for pos in posiciones_iniciales],
+                                           self.flota.carga_max[0])
         
+        # El silo va a la derecha del campo, bajo las gráficas si entra y si no en la esquina
         margin_top = 20
-        self.silo_position = (WIDTH - 180, margin_top + len(self.tractores) * 70 + 30)
+        self.silo_position = (ancho_campo + 20,
+                              max(min(margin_top + len(self.tractores) * 70 + 30, self.filas * GRID_SIZE - 150), 0))
+
+        # Observadores (p.ej. el renderizador) notificados al final de cada paso
+        self.observadores = []
+        # Tiempos por fase de step(); se puede activar y desactivar durante la corrida
+        self.perfil = Perfilador(self.p.get('perfil', False))
+        # Avance por eventos: un tractor que descarga duerme en la agenda hasta el paso
+        # en que termina, y los pasos en que solo se moverían los contenedores se saltan
+        # de una vez. Los resultados son los mismos que paso a paso
+        self.eventos = self.p.get('eventos', False)
+        self.agenda = Agenda()
+        self.dormidos = set()  # id_flota de los tractores que duermen en la agenda
+        self.pasos = 0
+        self.pasos_saltados = 0
+
+        # Retomar una corrida guardada: ruta del punto de control o el estado ya leído
+        if self.p.get('punto_control') is not None:
+            cargar(self, self.p['punto_control'])
+
+    def agregar_observador(self, observador):
+        self.observadores.append(observador)
     
     def obtener_parcela_prioritaria(self, tractor):
-        min_dist = float('inf')
         objetivo = None
         tractor_pos_grid = (int(tractor.position[1] // GRID_SIZE), int(tractor.position[0] // GRID_SIZE))
         
-        for row in range(ROWS):
-            for col in range(COLS):
-                parcela = self.campo[row][col]
-                if parcela.ready_to_harvest and not parcela.reservada:
-                    distancia = np.linalg.norm(np.array(tractor_pos_grid) - np.array([row, col]))
-                    if distancia < min_dist:
-                        min_dist = distancia
-                        objetivo = (row, col)
+        # Parcela disponible más cercana (distancia euclidiana) según el índice espacial
+        mas_cercana = self.indice.mas_cercana(*tractor_pos_grid)
+        if mas_cercana:
+            objetivo = mas_cercana[:2]
         
         if objetivo:
-            self.campo[objetivo[0]][objetivo[1]].reservada = True
+            self.reservas_parcelas.reservar(tractor.id_flota, *objetivo, self.pasos)
         return objetivo
 
+    def necesita_objetivo(self, tractor):
+        return (not tractor.descargando and tractor.carga_actual < tractor.carga_max
+                and (tractor.objetivo_actual is None or self.campo.harvested[tractor.objetivo_actual]))
+
+    def asignar_objetivos(self):
+        # Todos los tractores libres reciben parcela a la vez, minimizando la distancia total
+        libres = [tractor for tractor in self.tractores if self.necesita_objetivo(tractor)]
+        if not libres:
+            return
+        posiciones = [(int(t.position[1] // GRID_SIZE), int(t.position[0] // GRID_SIZE)) for t in libres]
+        for tractor, objetivo in zip(libres, asignar_parcelas(self.indice, posiciones)):
+            tractor.objetivo_actual = objetivo
+            if objetivo:
+                self.reservas_parcelas.reservar(tractor.id_flota, *objetivo, self.pasos)
+
+    def asignar_objetivos_cobertura(self):
+        # Cada tractor libre toma la siguiente celda de su ruta y su contenedor
+        # lo espera donde se llenará la tolva
+        for tractor in self.tractores:
+            if not self.necesita_objetivo(tractor):
+                continue
+            tractor.objetivo_actual = self.cobertura.siguiente(tractor.id_flota, self.campo)
+            if tractor.objetivo_actual:
+                self.reservas_parcelas.reservar(tractor.id_flota, *tractor.objetivo_actual, self.pasos)
+            encuentro = self.cobertura.punto_encuentro(tractor.id_flota, tractor.carga_actual)
+            if encuentro is None:
+                self.flota.encuentros[tractor.id_flota] = np.nan
+            else:
+                self.flota.encuentros[tractor.id_flota] = (encuentro[1] * GRID_SIZE + GRID_SIZE // 2,
+                                                           encuentro[0] * GRID_SIZE + GRID_SIZE // 2)
+
+    def pasos_estimados(self):
+        # Pasos hasta cosechar todo según el plan de cobertura (None en los otros modos)
+        if self.cobertura is None:
+            return None
+        # Cada parcela cuesta lo que tarda el tractor en cruzar una celda
+        cargas = [tractor.carga_actual for tractor in self.tractores]
+        return self.cobertura.estimar_pasos(cargas, int(-(-GRID_SIZE // self.velocidad)), DESCARGA_DURACION)
+
+    def dormir(self, tractor):
+        # Hasta que el contador llegue a 0 la descarga solo lo descontaría
+        self.dormidos.add(tractor.id_flota)
+        self.agenda.programar(self.pasos + tractor.contador_descarga, tractor.id_flota)
+
+    def despertar(self):
+        for i in self.agenda.vencidos(self.pasos):
+            tractor = self.tractores[i]
+            self.dormidos.discard(i)
+            tractor.contador_descarga = 1  # Este paso lo lleva a 0 y termina la descarga
+
+    def esperando_quietos(self):
+        # Si en este paso ningún tractor haría más que dormir, esperar a su contenedor
+        # o quedarse sin parcela, devuelve los id_flota de los que esperan; si no, None
+        esperando = []
+        for tractor in self.tractores:
+            i = tractor.id_flota
+            if i in self.dormidos:
+                continue
+            if tractor.descargando:
+                return None
+            if tractor.carga_actual >= tractor.carga_max:
+                if not tractor.contenedor.ir_al_silo_flag:
+                    return None
+                esperando.append(i)
+            elif tractor.objetivo_actual is not None:
+                return None
+            elif self.cobertura is not None:
+                if self.cobertura.siguiente(i, self.campo) is not None:
+                    return None
+                self.flota.encuentros[i] = np.nan  # Lo que haría asignar_objetivos_cobertura
+            elif self.indice.total > 0:
+                return None
+        return np.array(esperando, dtype=int)
+
+    def saltar_pasos_quietos(self):
+        # Avanza de una vez los pasos en que solo se moverían los contenedores, hasta el
+        # próximo evento de la agenda o hasta que un tractor que espera deba actuar
+        esperando = self.esperando_quietos()
+        if esperando is None:
+            return
+        flota = self.flota
+        # Los vencimientos de reservas también cortan el salto: liberan parcelas
+        proximo = min((tiempo for tiempo in (self.agenda.proximo(), self.reservas_parcelas.proximo_vencimiento())
+                       if tiempo is not None), default=None)
+        while proximo is None or self.pasos < proximo:
+            # Los mismos chequeos que step() hace con los tractores que esperan
+            if len(esperando):
+                cerca = np.linalg.norm(flota.posiciones[esperando] - flota.contenedores[esperando], axis=1) < GRID_SIZE
+                if not flota.al_silo[esperando].all() or cerca.any():
+                    break
+                flota.velocidades[esperando] = 0
+            cambio = flota.mover_contenedores(self.silo_position)
+            self.pasos += 1
+            self.pasos_saltados += 1
+            if not cambio:
+                # Nada cambia hasta el próximo evento: el reloj salta directo a él
+                if proximo is None:
+                    break
+                self.pasos_saltados += proximo - self.pasos
+                self.pasos = proximo
+
     def step(self):
-        self.font = pygame.font.Font(None, 24)  # Define la fuente una vez
-        screen.fill(COLOR_EMPTY)
-        self.dibujar_campo()
-        
+        perfil = self.perfil
+        inicio = t = perfil.marca()
+        if self.eventos:
+            self.saltar_pasos_quietos()
+            self.despertar()
+            t = perfil.fase('eventos', t)
+        self.reservas_parcelas.expirar(self.pasos)
+        if self.asignacion == 'lote':
+            self.asignar_objetivos()
+            t = perfil.fase('asignacion', t)
+        elif self.asignacion == 'cobertura':
+            self.asignar_objetivos_cobertura()
+            t = perfil.fase('asignacion', t)
+
+        # 1. Decisiones por tractor; los movimientos quedan pedidos en la flota
+        hacia_contenedor = []
+        hacia_parcela = []
         for idx, tractor in enumerate(self.tractores):
+            if tractor.id_flota in self.dormidos:
+                continue
             if tractor.descargando:
                 tractor.contador_descarga -= 1
                 tractor.contenedor.color = COLOR_UNLOADING
                 if tractor.contador_descarga <= 0:
                     tractor.descargando = False
                     tractor.contenedor.color = COLOR_CONTAINER
+                elif self.eventos:
+                    self.dormir(tractor)
             else:
                 if tractor.carga_actual >= tractor.carga_max:
                     tractor.mover_a_contenedor()
-                    if np.linalg.norm(tractor.position - tractor.contenedor.position) < GRID_SIZE:
-                        tractor.descargar()
+                    hacia_contenedor.append(tractor)
                 else:
-                    if tractor.objetivo_actual is None or self.campo[tractor.objetivo_actual[0]][tractor.objetivo_actual[1]].harvested:
+                    if self.asignacion == 'voraz' and self.necesita_objetivo(tractor):
+                        t_asignacion = perfil.marca()
                         tractor.objetivo_actual = self.obtener_parcela_prioritaria(tractor)
+                        perfil.fase('asignacion', t_asignacion, tractor=idx)
                     
                     if tractor.objetivo_actual:
                         destino = np.array([
@@ -175,79 +350,114 @@ class HarvestSimulation(ap.Model):
                             tractor.objetivo_actual[0] * GRID_SIZE + GRID_SIZE // 2
                         ])
                         tractor.mover(destino)
-                        
-                        if np.linalg.norm(destino - tractor.position) < tractor.speed:
-                            if tractor.cargar():
-                                self.campo[tractor.objetivo_actual[0]][tractor.objetivo_actual[1]].harvest()
-                            tractor.objetivo_actual = None
-                
-            if tractor.contenedor.ir_al_silo_flag:
-                tractor.contenedor.ir_al_silo(self.silo_position)
-            else:
-                tractor.contenedor.seguir_tractor(tractor.position)
+                        hacia_parcela.append((tractor, destino))
+            t = perfil.fase('decisiones', t, tractor=idx)
+
+        # 2. Movimiento de toda la flota en una sola actualización
+        self.flota.avanzar()
+        t = perfil.fase('movimiento', t)
+
+        # 3. Llegadas: descarga en el contenedor o cosecha de la parcela
+        for tractor in hacia_contenedor:
+            if np.linalg.norm(tractor.position - tractor.contenedor.position) < GRID_SIZE:
+                tractor.descargar()
+        for tractor, destino in hacia_parcela:
+            if np.linalg.norm(destino - tractor.position) < tractor.speed:
+                # Con reservas que vencen, otro tractor pudo cosecharla antes
+                if self.campo.ready_to_harvest[tractor.objetivo_actual] and tractor.cargar():
+                    self.campo.harvest(*tractor.objetivo_actual)
+                tractor.objetivo_actual = None
+        t = perfil.fase('llegadas', t)
+
+        # 4. Contenedores: al silo o siguiendo a su tractor
+        self.flota.mover_contenedores(self.silo_position)
+        self.pasos += 1
+        self.progreso.muestrear(self.pasos)
+        t = perfil.fase('contenedores', t)
         
-        self.dibujar_tractores()
-        self.dibujar_graficas()
-        self.dibujar_silo()
-        pygame.display.flip()
-
-    def dibujar_campo(self):
-        for row in range(ROWS):
-            for col in range(COLS):
-                x, y = col * GRID_SIZE, row * GRID_SIZE
-                parcela = self.campo[row][col]
-                color = COLOR_HARVESTED if parcela.harvested else COLOR_READY if parcela.ready_to_harvest else COLOR_EMPTY
-                pygame.draw.rect(screen, color, (x, y, GRID_SIZE, GRID_SIZE))
-    
-    def dibujar_tractores(self):
-        for idx, tractor in enumerate(self.tractores):
-            # Dibujar el contenedor y el tractor
-            pygame.draw.circle(screen, tractor.contenedor.color, tractor.contenedor.position.astype(int), GRID_SIZE // 3)
-            pygame.draw.circle(screen, COLOR_TRACTOR, tractor.position.astype(int), GRID_SIZE // 3)
-            
-            # Etiqueta del tractor
-            label = self.font.render(f"Tractor {idx + 1}", True, (0, 0, 0))
-            screen.blit(label, (tractor.position[0] - 15, tractor.position[1] - 30))  # Ajusta la posición del label si es necesario
-    
-    def dibujar_graficas(self):
-        bar_width = 150
-        bar_height = 20
-        margin_top = 20
-        for idx, tractor in enumerate(self.tractores):
-            # Dibujar barra de combustible
-            fuel_ratio = tractor.combustible / tractor.combustible_max
-            pygame.draw.rect(screen, COLOR_FUEL, (WIDTH - 180, margin_top + idx * 70, int(bar_width * fuel_ratio), bar_height))
-            pygame.draw.rect(screen, (0, 0, 0), (WIDTH - 180, margin_top + idx * 70, bar_width, bar_height), 2)
-
-            # Dibujar barra de carga
-            cargo_ratio = tractor.carga_actual / tractor.carga_max
-            pygame.draw.rect(screen, COLOR_CARGO, (WIDTH - 180, margin_top + idx * 70 + 30, int(bar_width * cargo_ratio), bar_height))
-            pygame.draw.rect(screen, (0, 0, 0), (WIDTH - 180, margin_top + idx * 70 + 30, bar_width, bar_height), 2)
-
-            # Etiqueta del tractor
-            font = pygame.font.Font(None, 24)
-            text = font.render(f"Tractor {idx + 1}", True, (0, 0, 0))
-            screen.blit(text, (WIDTH - 180, margin_top + idx * 70 - 20))
-
-    def dibujar_silo(self):
-        silo_width = 150
-        silo_height = 150
-        font = pygame.font.Font(None, 24)
-        pygame.draw.rect(screen, (105, 105, 105), (self.silo_position[0], self.silo_position[1], silo_width, silo_height))
-        label = font.render("Silo", True, (0, 0, 0))
-        label_rect = label.get_rect(center=(self.silo_position[0] + silo_width // 2, self.silo_position[1] - 20))
-        screen.blit(label, label_rect)
+        for observador in self.observadores:
+            observador.actualizar(self)
+        perfil.fase('observadores', t)
+        perfil.fase('paso', inicio)
+
+    def update(self):
+        # Model.run() termina la corrida cuando no queda nada por cosechar o cuando los pasos
+        # simulados llegan a 'steps' (con avance por eventos, t cuenta llamadas a step())
+        if self.campo.todo_cosechado() or self.pasos >= self.p.get('steps', np.nan):
+            self.stop()
+
+    def end(self):
+        # Resumen de la corrida que agrega experimentos.py (pasos_cosecha es NaN si no terminó)
+        self.report('pasos_cosecha', self.pasos if self.campo.todo_cosechado() else np.nan)
+        self.report('cosechadas', self.campo.total_cosechadas)
+        self.report('combustible_usado', float(self.flota.consumido.sum()))
+        self.report('distancia_recorrida', float(self.flota.recorrido.sum()))
 
 # Ejecutar simulación
-model = HarvestSimulation()
-model.setup()
-
-running = True
-while running:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-    model.step()
-    pygame.time.delay(50)
-
-pygame.quit()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulación de cosecha")
+    parser.add_argument("--headless", action="store_true", help="Simular sin ventana ni pygame")
+    parser.add_argument("--pasos", type=int, default=None, help="Número de pasos (por defecto, sin límite)")
+    parser.add_argument("--filas", type=int, default=ROWS, help="Filas del campo (independiente de la ventana)")
+    parser.add_argument("--columnas", type=int, default=COLS, help="Columnas del campo")
+    parser.add_argument("--tractores", type=int, default=TRACTOR_COUNT, help="Cantidad de tractores")
+    parser.add_argument("--asignacion", choices=["lote", "voraz", "cobertura"], default="lote",
+                        help="Asignar parcelas a todos los tractores libres a la vez, uno por uno "
+                             "o con rutas de cobertura precalculadas")
+    parser.add_argument("--velocidad", type=float, default=1.0,
+                        help="Multiplicador de pasos por segundo en pantalla (0: sin límite)")
+    parser.add_argument("--fps", type=int, default=30, help="Cuadros por segundo máximos")
+    parser.add_argument("--render-proceso", action="store_true",
+                        help="Dibujar en otro proceso sin frenar la simulación")
+    parser.add_argument("--perfil", action="store_true", help="Medir el tiempo de cada fase del paso")
+    parser.add_argument("--eventos", action="store_true",
+                        help="Saltar los pasos en que los tractores solo descargan o esperan")
+    parser.add_argument("--reserva-duracion", type=int,
+                        help="Pasos tras los que vence la reserva de una parcela (por defecto, no vence)")
+    parser.add_argument("--retomar", help="Punto de control desde el que seguir (con su campo y tractores)")
+    parser.add_argument("--guardar", help="Punto de control a escribir al terminar")
+    parser.add_argument("--guardar-cada", type=int, help="Escribir también el punto de control cada N pasos")
+    parser.add_argument("--registro", help="Directorio donde registrar las métricas de cada paso (registro.py)")
+    args = parser.parse_args()
+
+    parametros = {'asignacion': args.asignacion, 'filas': args.filas, 'columnas': args.columnas,
+                  'tractores': args.tractores, 'reserva_duracion': args.reserva_duracion}
+    if args.retomar:
+        guardado = leer(args.retomar)
+        parametros = dict(guardado['parametros'], punto_control=guardado)
+    model = HarvestSimulation(dict(parametros, perfil=args.perfil, eventos=args.eventos))
+    model.setup()
+    if args.guardar and args.guardar_cada:
+        model.agregar_observador(GuardadoPeriodico(args.guardar, args.guardar_cada))
+    registro = None
+    if args.registro:
+        registro = Registrador(args.registro, model)
+        model.agregar_observador(registro)
+    if model.cobertura is not None:
+        print(f"Pasos estimados para cosechar todo el campo: {model.pasos_estimados()}")
+
+    renderizador = None
+    if args.headless:
+        ejecutar(model, pasos=args.pasos)
+    elif args.render_proceso:
+        # Cada cuadro del bucle publica una instantánea; el otro proceso la dibuja
+        from render_proceso import RenderizadorEnProceso
+        renderizador = RenderizadorEnProceso("Simulación de Cosecha con Gráficas en Tiempo Real",
+                                             WIDTH, HEIGHT, GRID_SIZE, model, fps_max=args.fps)
+        ejecutar(model, renderizador, args.pasos, PASOS_POR_SEGUNDO, args.velocidad, args.fps)
+    else:
+        from renderizado import RenderizadorPygame
+        renderizador = RenderizadorPygame("Simulación de Cosecha con Gráficas en Tiempo Real",
+                                          WIDTH, HEIGHT, GRID_SIZE)
+        ejecutar(model, renderizador, args.pasos, PASOS_POR_SEGUNDO, args.velocidad, args.fps)
+
+    if renderizador:
+        renderizador.cerrar()
+    if registro:
+        registro.cerrar()
+    if args.guardar:
+        guardar(model, args.guardar)
+    if args.eventos:
+        print(f"Pasos simulados: {model.pasos} ({model.pasos_saltados} saltados por eventos)")
+    if args.perfil:
+        print(model.perfil.informe())
@@ -0,0 +1,28 @@
+import heapq
+
+
+# Agenda de eventos futuros para avanzar el tiempo por eventos.
+# Guarda (tiempo, orden, evento) en un min-heap: el próximo evento sale en O(log n)
+# y los de un mismo tiempo salen en el orden en que se programaron.
+class Agenda:
+    def __init__(self):
+        self.cola = []
+        self.programados = 0
+
+    def __len__(self):
+        return len(self.cola)
+
+    def programar(self, tiempo, evento):
+        heapq.heappush(self.cola, (tiempo, self.programados, evento))
+        self.programados += 1
+
+    def proximo(self):
+        # Tiempo del próximo evento, o None si no hay ninguno
+        return self.cola[0][0] if self.cola else None
+
+    def vencidos(self, tiempo):
+        # Saca los eventos con tiempo <= tiempo, en orden
+        eventos = []
+        while self.cola and self.cola[0][0] <= tiempo:
+            eventos.append(heapq.heappop(self.cola)[2])
+        return eventos
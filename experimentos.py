@@ -0,0 +1,123 @@
+import argparse
+import importlib
+import itertools
+import agentpy as ap
+import numpy as np
+import pandas as pd
+from punto_control import leer
+
+# Experimentos Monte Carlo: corre en paralelo (ap.Experiment sobre joblib) un
+# simulador sin ventana por cada combinación de tractores, tamaño de campo,
+# velocidad, carga máxima y semilla, y junta los resultados en una tabla.
+# Cada corrida termina al cosechar todo el campo o al llegar a --max-pasos.
+# Con --punto-control todas las corridas parten de esa corrida guardada (su campo
+# y su flota) y cada semilla sigue con su propio azar: variantes desde mitad de cosecha.
+
+# Módulo de cada simulador y parámetros fijos para correrlo en lote
+SIMULADORES = {
+    'etapa1': ('etapa1', {}),
+    'astar': ('simulacion_astar', {'telemetria': False}),
+    'qlearning': ('simulacionqlearning.etapa2', {'telemetria': False, 'guardar_q': False}),
+}
+# Lo que reporta HarvestSimulation.end() en cada corrida
+METRICAS = ['pasos_cosecha', 'cosechadas', 'combustible_usado', 'distancia_recorrida']
+# Parámetros de la rejilla (las filas de la tabla resumen)
+EJES = ['tractores', 'filas', 'columnas', 'velocidad', 'carga_max']
+
+
+def leer_campo(texto):
+    # "FILASxCOLUMNAS" -> (filas, columnas)
+    filas, _, columnas = texto.lower().partition('x')
+    return int(filas), int(columnas or filas)
+
+
+def muestra(tractores, campos, velocidades, cargas, semillas, max_pasos, fijos):
+    # Un diccionario de parámetros por corrida; la semilla va en los parámetros para
+    # que cada combinación se repita con las mismas semillas en cualquier proceso
+    corridas = []
+    for n, (filas, columnas), velocidad, carga, semilla in itertools.product(
+            tractores, campos, velocidades, cargas, semillas):
+        corridas.append(dict(fijos, tractores=n, filas=filas, columnas=columnas, velocidad=velocidad,
+                             carga_max=carga, seed=semilla, steps=max_pasos))
+    return corridas
+
+
+def correr(modelo, corridas, procesos=-1):
+    # Devuelve una fila por corrida con sus parámetros y métricas
+    experimento = ap.Experiment(modelo, corridas, randomize=False)
+    resultados = experimento.run(n_jobs=procesos, display=False)
+    # Los reportes vienen en el orden de las corridas (la semilla ya está en los parámetros)
+    reportes = resultados.reporters.drop(columns='seed').reset_index(drop=True)
+    return pd.DataFrame(corridas).join(reportes)
+
+
+def resumir(tabla):
+    # Media y desvío de cada métrica sobre las semillas de cada combinación.
+    # terminadas: fracción de corridas que cosecharon todo antes de --max-pasos
+    grupos = tabla.groupby(EJES)
+    resumen = grupos[METRICAS].agg(['mean', 'std'])
+    resumen.columns = [f"{metrica}_{estadistico}" for metrica, estadistico in resumen.columns]
+    resumen['terminadas'] = grupos['pasos_cosecha'].apply(lambda pasos: np.isfinite(pasos).mean())
+    resumen['corridas'] = grupos.size()
+    return resumen.reset_index()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Experimentos Monte Carlo de la simulación de cosecha")
+    parser.add_argument("--simulador", choices=list(SIMULADORES), default="astar")
+    parser.add_argument("--tractores", type=int, nargs="+", help="Cantidades de tractores (por defecto, la del simulador)")
+    parser.add_argument("--campos", type=leer_campo, nargs="+", help="Tamaños FILASxCOLUMNAS (por defecto, el del simulador)")
+    parser.add_argument("--velocidades", type=float, nargs="+", help="Velocidades de los tractores")
+    parser.add_argument("--cargas", type=int, nargs="+", help="Cargas máximas de la tolva (por defecto, 50)")
+    parser.add_argument("--repeticiones", type=int, default=5, help="Semillas por combinación")
+    parser.add_argument("--semilla", type=int, default=0, help="Primera semilla")
+    parser.add_argument("--max-pasos", type=int, default=5000, help="Pasos máximos por corrida")
+    parser.add_argument("--planificacion", choices=["astar", "incremental", "cooperativa"],
+                        help="Planificación de caminos (solo simulador astar)")
+    parser.add_argument("--asignacion", choices=["lote", "voraz", "cobertura"],
+                        help="Asignación de parcelas (simuladores etapa1 y astar)")
+    parser.add_argument("--eventos", action="store_true",
+                        help="Avance por eventos: saltar pasos de descarga y espera (simuladores etapa1 y astar)")
+    parser.add_argument("--reserva-duracion", type=int,
+                        help="Pasos tras los que vence la reserva de una parcela (simuladores etapa1 y astar)")
+    parser.add_argument("--punto-control", help="Corrida guardada (punto_control.py) desde la que parten todas")
+    parser.add_argument("--procesos", type=int, default=-1, help="Procesos en paralelo (-1: todos los CPU)")
+    parser.add_argument("--corridas", help="CSV con una fila por corrida")
+    parser.add_argument("--salida", help="CSV con la tabla resumen")
+    args = parser.parse_args()
+
+    nombre_modulo, fijos = SIMULADORES[args.simulador]
+    modulo = importlib.import_module(nombre_modulo)
+    fijos = dict(fijos)
+    if args.planificacion:
+        fijos['planificacion'] = args.planificacion
+    if args.asignacion:
+        fijos['asignacion'] = args.asignacion
+    if args.eventos:
+        fijos['eventos'] = True
+    if args.reserva_duracion is not None:
+        fijos['reserva_duracion'] = args.reserva_duracion
+    # Por defecto, la rejilla es el campo y la flota del simulador o los del punto de control
+    base = {}
+    if args.punto_control:
+        base = leer(args.punto_control)['parametros']
+        fijos['punto_control'] = args.punto_control
+
+    corridas = muestra(
+        args.tractores or [base.get('tractores', modulo.TRACTOR_COUNT)],
+        args.campos or [(base.get('filas', modulo.ROWS), base.get('columnas', modulo.COLS))],
+        args.velocidades or [base.get('velocidad', modulo.TRACTOR_SPEED)],
+        args.cargas or [base.get('carga_max', 50)],
+        range(args.semilla, args.semilla + args.repeticiones),
+        args.max_pasos,
+        fijos,
+    )
+    print(f"{len(corridas)} corridas de {args.simulador}")
+    tabla = correr(modulo.HarvestSimulation, corridas, args.procesos)
+    resumen = resumir(tabla)
+    print(resumen.to_string(index=False))
+
+    if args.corridas:
+        tabla.to_csv(args.corridas, index=False)
+    if args.salida:
+        resumen.to_csv(args.salida, index=False)
@@ -0,0 +1,100 @@
+import numpy as np
+
+
+# Motor de cinemática de la flota en estructura de arreglos.
+# Guarda posición, destino, velocidad, combustible y carga de todos los tractores
+# (y la posición de sus contenedores) en arreglos contiguos, y mueve a toda la
+# flota con una sola actualización vectorizada por paso. Tractor y Container
+# leen y escriben sus atributos directamente sobre estos arreglos.
+class Flota:
+    def __init__(self, n, velocidad, combustible_max, carga_max, velocidad_contenedor,
+                 distancia_seguimiento, factor_combustible=0.05, limites=None, distancia_silo=10):
+        self.n = n
+        self.registrados = 0
+        self.factor_combustible = factor_combustible
+        self.distancia_seguimiento = distancia_seguimiento
+        self.distancia_silo = distancia_silo
+        # (x_max, y_max) para mantener a los tractores dentro del campo, o None
+        self.limites = limites
+
+        # Tractores
+        self.posiciones = np.zeros((n, 2))
+        self.destinos = np.zeros((n, 2))
+        self.en_movimiento = np.zeros(n, dtype=bool)
+        self.distancias = np.zeros(n)  # Distancia al destino antes del último avance
+        # Dirección unitaria del último avance y la del anterior (NaN si aún no se movió)
+        self.direcciones = np.full((n, 2), np.nan)
+        self.direcciones_anteriores = np.full((n, 2), np.nan)
+        self.velocidades = np.full(n, float(velocidad))
+        self.combustible = np.full(n, float(combustible_max))
+        self.tasa_combustible = np.ones(n)  # Multiplicador de consumo, vuelve a 1 tras moverse
+        self.carga = np.zeros(n, dtype=np.int32)
+        self.carga_max = np.full(n, carga_max, dtype=np.int32)
+        # Acumulados de la corrida: combustible gastado (aunque luego se recargue) y distancia
+        self.consumido = np.zeros(n)
+        self.recorrido = np.zeros(n)
+
+        # Contenedores
+        self.contenedores = np.zeros((n, 2))
+        self.velocidad_contenedor = float(velocidad_contenedor)
+        self.al_silo = np.zeros(n, dtype=bool)
+        # Punto donde el contenedor espera a su tractor en vez de seguirlo (NaN: seguirlo)
+        self.encuentros = np.full((n, 2), np.nan)
+
+    def agregar(self, posicion):
+        # Reserva la siguiente fila para un tractor y su contenedor
+        i = self.registrados
+        self.posiciones[i] = posicion
+        self.contenedores[i] = posicion
+        self.registrados += 1
+        return i
+
+    def solicitar_movimiento(self, i, destino):
+        # El tractor i avanzará hacia destino en el próximo avanzar()
+        self.destinos[i] = destino
+        self.en_movimiento[i] = True
+
+    def avanzar(self):
+        # Mueve a la vez a todos los tractores que pidieron moverse y tienen combustible
+        indices = np.nonzero(self.en_movimiento & (self.combustible > 0))[0]
+        self.en_movimiento[:] = False
+        if len(indices) == 0:
+            return indices
+
+        direccion = self.destinos[indices] - self.posiciones[indices]
+        distancia = np.hypot(direccion[:, 0], direccion[:, 1])
+        self.distancias[indices] = distancia
+
+        indices = indices[distancia > 0]
+        direccion = direccion[distancia > 0] / distancia[distancia > 0, None]
+        self.direcciones_anteriores[indices] = self.direcciones[indices]
+        self.direcciones[indices] = direccion
+        paso = direccion * self.velocidades[indices, None]
+        anteriores = self.posiciones[indices]
+        self.posiciones[indices] += paso
+        if self.limites is not None:
+            self.posiciones[indices] = np.clip(self.posiciones[indices], 0, self.limites)
+        movido = self.posiciones[indices] - anteriores
+        self.recorrido[indices] += np.hypot(movido[:, 0], movido[:, 1])
+        consumo = self.factor_combustible * np.hypot(paso[:, 0], paso[:, 1]) * self.tasa_combustible[indices]
+        self.combustible[indices] -= consumo
+        self.consumido[indices] += consumo
+        self.tasa_combustible[indices] = 1
+        return indices
+
+    def mover_contenedores(self, silo_pos):
+        # Los contenedores con al_silo van al silo; el resto sigue a su tractor a distancia
+        # o va a su punto de encuentro y lo espera ahí. Devuelve si alguno se movió o llegó al silo
+        con_encuentro = ~np.isnan(self.encuentros[:, 0])
+        direccion = np.where(con_encuentro[:, None], self.encuentros, self.posiciones) - self.contenedores
+        destino_silo = self.al_silo.copy()
+        direccion[destino_silo] = np.asarray(silo_pos, dtype=float) - self.contenedores[destino_silo]
+        distancia = np.hypot(direccion[:, 0], direccion[:, 1])
+
+        # Al silo y al punto de encuentro tienen que llegar; a su tractor lo siguen a distancia
+        umbral = np.where(destino_silo | con_encuentro, self.distancia_silo, self.distancia_seguimiento)
+        mover = distancia > umbral
+        self.contenedores[mover] += direccion[mover] / distancia[mover, None] * self.velocidad_contenedor
+        llegados = destino_silo & (distancia < self.distancia_silo)
+        self.al_silo[llegados] = False
+        return bool(mover.any() or llegados.any())
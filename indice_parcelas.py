@@ -0,0 +1,91 @@
+import numpy as np
+
+
+# Índice espacial de parcelas disponibles (listas y sin reservar).
+# Divide el campo en cubetas de tam_bucket x tam_bucket celdas y guarda cuántas
+# parcelas disponibles hay en cada una. Campo lo actualiza en harvest() y en los
+# cambios de reserva, así que las consultas no recorren todo el campo: se revisan
+# anillos de cubetas alrededor del tractor hasta que ninguna cubeta más lejana
+# pueda mejorar el resultado.
+class IndiceParcelas:
+    def __init__(self, campo, tam_bucket=8):
+        self.campo = campo
+        self.tam = tam_bucket
+        self.brows = -(-campo.rows // tam_bucket)
+        self.bcols = -(-campo.cols // tam_bucket)
+        self.conteo = np.zeros((self.brows, self.bcols), dtype=np.int32)
+        self.total = 0
+        campo.indice = self
+        self.reconstruir()
+
+    def reconstruir(self):
+        # Recalcula los conteos desde cero (solo al crear el índice o tras cambios masivos)
+        disponibles = self.campo.disponibles()
+        relleno = np.zeros((self.brows * self.tam, self.bcols * self.tam), dtype=np.int32)
+        relleno[:self.campo.rows, :self.campo.cols] = disponibles
+        self.conteo = relleno.reshape(self.brows, self.tam, self.bcols, self.tam).sum(axis=(1, 3))
+        self.total = int(self.conteo.sum())
+
+    def actualizar(self, row, col, delta):
+        self.conteo[row // self.tam, col // self.tam] += delta
+        self.total += delta
+
+    def actualizar_varias(self, rows, cols, delta):
+        np.add.at(self.conteo, (rows // self.tam, cols // self.tam), delta)
+        self.total += delta * len(rows)
+
+    def _anillo(self, br, bc, d):
+        # Cubetas no vacías a distancia de Chebyshev exactamente d de (br, bc)
+        i0, i1 = max(br - d, 0), min(br + d, self.brows - 1)
+        j0, j1 = max(bc - d, 0), min(bc + d, self.bcols - 1)
+        ventana = self.conteo[i0:i1 + 1, j0:j1 + 1] > 0
+        if d > 0:
+            ii0, ii1 = max(br - d + 1, 0), min(br + d - 1, self.brows - 1)
+            jj0, jj1 = max(bc - d + 1, 0), min(bc + d - 1, self.bcols - 1)
+            ventana[ii0 - i0:ii1 - i0 + 1, jj0 - j0:jj1 - j0 + 1] = False
+        ii, jj = np.nonzero(ventana)
+        return ii + i0, jj + j0
+
+    def k_mas_cercanas(self, row, col, k=1, costo=None, factor_minimo=1.0):
+        # Devuelve hasta k tuplas (row, col, costo) ordenadas por costo y, en caso
+        # de empate, en orden de filas (igual que el recorrido completo original).
+        # costo(rows, cols) recibe arreglos y debe cumplir
+        # costo >= factor_minimo * max(|drow|, |dcol|); por defecto, distancia euclidiana.
+        if self.total <= 0 or k <= 0:
+            return []
+        if costo is None:
+            costo = lambda rows, cols: np.sqrt((rows - row) ** 2 + (cols - col) ** 2)
+
+        br = min(max(int(row), 0), self.campo.rows - 1) // self.tam
+        bc = min(max(int(col), 0), self.campo.cols - 1) // self.tam
+        max_d = max(br, self.brows - 1 - br, bc, self.bcols - 1 - bc)
+
+        cand_rows, cand_cols, cand_costos = [], [], []
+        encontrados = 0
+        for d in range(max_d + 1):
+            for i, j in zip(*self._anillo(br, bc, d)):
+                r0, c0 = i * self.tam, j * self.tam
+                bloque = self.campo.disponibles(r0, r0 + self.tam, c0, c0 + self.tam)
+                rr, cc = np.nonzero(bloque)
+                rr += r0
+                cc += c0
+                cand_rows.append(rr)
+                cand_cols.append(cc)
+                cand_costos.append(costo(rr, cc))
+                encontrados += len(rr)
+
+            if encontrados >= k:
+                # Las cubetas del anillo d + 1 están al menos a d * tam celdas
+                k_esimo = np.partition(np.concatenate(cand_costos), k - 1)[k - 1]
+                if k_esimo < factor_minimo * d * self.tam:
+                    break
+
+        rows = np.concatenate(cand_rows)
+        cols = np.concatenate(cand_cols)
+        costos = np.concatenate(cand_costos)
+        orden = np.lexsort((rows * self.campo.cols + cols, costos))[:k]
+        return [(int(rows[n]), int(cols[n]), costos[n]) for n in orden]
+
+    def mas_cercana(self, row, col, costo=None, factor_minimo=1.0):
+        resultado = self.k_mas_cercanas(row, col, 1, costo, factor_minimo)
+        return resultado[0] if resultado else None
@@ -0,0 +1,97 @@
+import math
+import time
+
+# Cubetas del histograma de duraciones: la cubeta e cuenta las de [2^(e-1), 2^e) µs
+CUBETAS = 32
+
+
+# Medición por fases de HarvestSimulation.step().
+# El paso marca el reloj entre fases (marca/fase) y aquí se acumulan llamadas,
+# tiempo total, máximo y un histograma logarítmico por fase, y el total por tractor
+# en las fases que se miden tractor a tractor. Desactivado, marca() y fase() solo
+# devuelven None, así que puede quedar siempre en el código; se activa y desactiva
+# en cualquier momento, incluso a mitad de una corrida.
+# Las fases pueden anidarse (p.ej. planificacion dentro de decisiones): los
+# porcentajes del informe son siempre sobre el paso completo.
+class Perfilador:
+    def __init__(self, activo=False):
+        self.activo = activo
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.fases = {}  # nombre -> [llamadas, total, máximo, histograma]
+        self.por_tractor = {}  # (nombre, tractor) -> [llamadas, total]
+
+    def activar(self):
+        self.activo = True
+
+    def desactivar(self):
+        self.activo = False
+
+    def marca(self):
+        return time.perf_counter() if self.activo else None
+
+    def fase(self, nombre, desde, tractor=None):
+        # Registra lo que pasó desde la marca 'desde' y devuelve la marca para la siguiente fase
+        if desde is None or not self.activo:
+            return self.marca()
+        ahora = time.perf_counter()
+        duracion = ahora - desde
+        estado = self.fases.get(nombre)
+        if estado is None:
+            estado = self.fases[nombre] = [0, 0.0, 0.0, [0] * CUBETAS]
+        estado[0] += 1
+        estado[1] += duracion
+        if duracion > estado[2]:
+            estado[2] = duracion
+        estado[3][min(max(math.frexp(duracion * 1e6)[1], 0), CUBETAS - 1)] += 1
+        if tractor is not None:
+            acumulado = self.por_tractor.get((nombre, tractor))
+            if acumulado is None:
+                acumulado = self.por_tractor[(nombre, tractor)] = [0, 0.0]
+            acumulado[0] += 1
+            acumulado[1] += duracion
+        return ahora
+
+    def percentil(self, nombre, p):
+        # Cota superior (en segundos) de la cubeta donde cae el percentil p
+        llamadas, _, maximo, histograma = self.fases[nombre]
+        objetivo = llamadas * p / 100
+        acumuladas = 0
+        for e, cantidad in enumerate(histograma):
+            acumuladas += cantidad
+            if cantidad and acumuladas >= objetivo:
+                return min(2.0 ** e * 1e-6, maximo)
+        return maximo
+
+    def resumen(self):
+        # Diccionario por fase (tiempos en segundos), p.ej. para guardarlo como JSON
+        return {
+            nombre: {
+                'llamadas': llamadas,
+                'total': total,
+                'media': total / llamadas,
+                'p50': self.percentil(nombre, 50),
+                'p99': self.percentil(nombre, 99),
+                'max': maximo,
+                'por_tractor': {tractor: total_tractor for (fase, tractor), (_, total_tractor)
+                                in sorted(self.por_tractor.items()) if fase == nombre},
+            }
+            for nombre, (llamadas, total, maximo, _) in self.fases.items()
+        }
+
+    def informe(self):
+        # Tabla legible ordenada por tiempo total
+        if not self.fases:
+            return "Sin mediciones (el perfilador está desactivado)"
+        paso = self.fases.get('paso', [0, 0.0])[1] or sum(estado[1] for estado in self.fases.values())
+        lineas = [f"{'fase':<14} {'llamadas':>9} {'total s':>9} {'% paso':>7} {'media µs':>10} "
+                  f"{'p50≤ µs':>9} {'p99≤ µs':>9} {'máx µs':>10}"]
+        for nombre, datos in sorted(self.resumen().items(), key=lambda item: -item[1]['total']):
+            lineas.append(f"{nombre:<14} {datos['llamadas']:>9} {datos['total']:>9.3f} "
+                          f"{100 * datos['total'] / paso:>6.1f}% {datos['media'] * 1e6:>10.1f} "
+                          f"{datos['p50'] * 1e6:>9.0f} {datos['p99'] * 1e6:>9.0f} {datos['max'] * 1e6:>10.0f}")
+            if datos['por_tractor']:
+                lineas.append("    por tractor (s): " + " ".join(
+                    f"{tractor}={total:.3f}" for tractor, total in datos['por_tractor'].items()))
+        return "\n".join(lineas)
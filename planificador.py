@@ -0,0 +1,436 @@
+from array import array
+from heapq import heappush, heappop
+
+import numpy as np
+
+INF = float('inf')
+
+
+# Celdas (índice plano y * cols + x) cuyo centro queda a menos de radio de alguna posición.
+# Equivale a llamar hay_colision() para cada celda, pero se calcula una vez por búsqueda.
+def celdas_bloqueadas(posiciones, cols, rows, grid_size, radio):
+    bloqueadas = []
+    alcance = int(radio // grid_size) + 1
+    for pos in posiciones:
+        cx, cy = int(pos[0] // grid_size), int(pos[1] // grid_size)
+        xs = np.arange(max(cx - alcance, 0), min(cx + alcance, cols - 1) + 1)
+        ys = np.arange(max(cy - alcance, 0), min(cy + alcance, rows - 1) + 1)
+        gx, gy = np.meshgrid(xs, ys)
+        centros_x = gx * grid_size + grid_size // 2
+        centros_y = gy * grid_size + grid_size // 2
+        cerca = np.hypot(centros_x - pos[0], centros_y - pos[1]) < radio
+        bloqueadas.extend((gy[cerca] * cols + gx[cerca]).tolist())
+    return bloqueadas
+
+
+# A* sobre estados (celda, rumbo) con costo de giro.
+# El costo de un paso es 1 + costo_giro[rumbo_actual][rumbo_nuevo]. La heurística es
+# la distancia Manhattan, multiplicada por factor_preferido cuando el rumbo del
+# estado es rumbo_preferido (favorece seguir recto, como la versión original).
+# g, padre y marcas viven en arreglos planos que se reutilizan entre búsquedas:
+# una marca con el número de búsqueda indica si la entrada es válida, así que no
+# hay que limpiarlos en cada llamada.
+class PlanificadorAEstrella:
+    def __init__(self, cols, rows, movimientos, costo_giro):
+        self.cols = cols
+        self.rows = rows
+        self.movimientos = movimientos  # (dx, dy) por rumbo
+        self.n_rumbos = len(movimientos)
+        self.costo_giro = costo_giro  # costo_giro[rumbo_actual][rumbo_nuevo]
+
+        n_estados = cols * rows * self.n_rumbos
+        self.g = array('d', bytes(8 * n_estados))
+        self.padre = array('l', bytes(array('l').itemsize * n_estados))
+        # 2 * busqueda: visto en esta búsqueda; 2 * busqueda + 1: además cerrado
+        self.marca = array('l', bytes(array('l').itemsize * n_estados))
+        self.bloqueadas = bytearray(cols * rows)
+        self.busqueda = 0
+        self.expansiones = 0  # Estados expandidos en la última búsqueda
+
+    def buscar(self, inicio, meta, rumbo_inicial, bloqueadas=(), rumbo_preferido=None, factor_preferido=0.8):
+        # inicio y meta son (x, y); devuelve la lista de celdas desde inicio hasta meta o None
+        celda_meta = meta[1] * self.cols + meta[0]
+        for celda in bloqueadas:
+            self.bloqueadas[celda] = 1
+        try:
+            if self.bloqueadas[celda_meta] and meta != inicio:
+                self.expansiones = 0
+                return None
+            return self._buscar(inicio, meta, rumbo_inicial, rumbo_preferido, factor_preferido)
+        finally:
+            for celda in bloqueadas:
+                self.bloqueadas[celda] = 0
+
+    def _buscar(self, inicio, meta, rumbo_inicial, rumbo_preferido, factor_preferido):
+        cols, rows, n_rumbos = self.cols, self.rows, self.n_rumbos
+        g, padre, marca, bloqueadas = self.g, self.padre, self.marca, self.bloqueadas
+        movimientos, costo_giro = self.movimientos, self.costo_giro
+        self.busqueda += 1
+        visto = 2 * self.busqueda
+        cerrado = visto + 1
+        gx, gy = meta
+
+        # Probar primero el rumbo preferido, igual que la versión original
+        orden = list(range(n_rumbos))
+        if rumbo_preferido is not None:
+            orden.remove(rumbo_preferido)
+            orden.insert(0, rumbo_preferido)
+        vecinos = [(r, movimientos[r][0], movimientos[r][1], factor_preferido if r == rumbo_preferido else 1)
+                   for r in orden]
+
+        contador = 0
+        expansiones = 0
+        self.inicio_fuera = not (0 <= inicio[0] < cols and 0 <= inicio[1] < rows)
+        if not self.inicio_fuera:
+            inicial = (inicio[1] * cols + inicio[0]) * n_rumbos + rumbo_inicial
+            g[inicial] = 0
+            padre[inicial] = -1
+            marca[inicial] = visto
+            abiertos = [(0, 0, 0, inicial)]
+        else:
+            # El tractor puede empezar fuera de la rejilla: se siembran sus vecinos válidos
+            abiertos = []
+            for nuevo_rumbo, dx, dy, factor in vecinos:
+                nx, ny = inicio[0] + dx, inicio[1] + dy
+                if not (0 <= nx < cols and 0 <= ny < rows) or bloqueadas[ny * cols + nx]:
+                    continue
+                vecino = (ny * cols + nx) * n_rumbos + nuevo_rumbo
+                g[vecino] = 1 + costo_giro[rumbo_inicial][nuevo_rumbo]
+                padre[vecino] = -1
+                marca[vecino] = visto
+                contador += 1
+                h = (abs(nx - gx) + abs(ny - gy)) * factor
+                heappush(abiertos, (g[vecino] + h, h, contador, vecino))
+
+        while abiertos:
+            _, _, _, estado = heappop(abiertos)
+            if marca[estado] == cerrado:
+                continue  # Entrada vieja: el estado ya se cerró con un g menor
+            marca[estado] = cerrado
+            expansiones += 1
+
+            celda, rumbo = divmod(estado, n_rumbos)
+            y, x = divmod(celda, cols)
+            if x == gx and y == gy:
+                self.expansiones = expansiones
+                return self._reconstruir(estado, inicio)
+
+            g_actual = g[estado]
+            giros = costo_giro[rumbo]
+            for nuevo_rumbo, dx, dy, factor in vecinos:
+                nx, ny = x + dx, y + dy
+                if not (0 <= nx < cols and 0 <= ny < rows):
+                    continue
+                nueva_celda = ny * cols + nx
+                if bloqueadas[nueva_celda]:
+                    continue
+
+                nuevo_g = g_actual + 1 + giros[nuevo_rumbo]
+                vecino = nueva_celda * n_rumbos + nuevo_rumbo
+                # Decrease-key: solo se encola si mejora el g conocido (reabre estados cerrados)
+                if marca[vecino] >= visto and nuevo_g >= g[vecino]:
+                    continue
+                g[vecino] = nuevo_g
+                padre[vecino] = estado
+                marca[vecino] = visto
+                h = (abs(nx - gx) + abs(ny - gy)) * factor
+                contador += 1
+                heappush(abiertos, (nuevo_g + h, h, contador, vecino))
+
+        self.expansiones = expansiones
+        return None
+
+    def _reconstruir(self, estado, inicio):
+        path = []
+        while estado != -1:
+            y, x = divmod(estado // self.n_rumbos, self.cols)
+            path.append((x, y))
+            estado = self.padre[estado]
+        if self.inicio_fuera:
+            path.append(tuple(inicio))
+        return path[::-1]  # Invertir el camino para ir desde el inicio
+
+
+# D* Lite sobre estados (celda, rumbo) con los mismos costos que PlanificadorAEstrella.
+# Busca hacia atrás desde la meta y conserva g/rhs entre llamadas: cuando cambian las
+# celdas bloqueadas solo se reparan los estados afectados, y cuando el tractor avanza
+# basta con ajustar km. El trabajo de cada replanificación depende del tamaño del
+# cambio, no del tamaño del campo. La heurística es Manhattan (consistente porque
+# cada paso cuesta al menos 1).
+class PlanificadorIncremental:
+    def __init__(self, cols, rows, movimientos, costo_giro):
+        self.cols = cols
+        self.rows = rows
+        self.movimientos = movimientos
+        self.n_rumbos = len(movimientos)
+        self.costo_giro = costo_giro
+        self.meta = None
+        self.expansiones = 0  # Estados expandidos en la última replanificación
+
+    def dentro(self, celda):
+        return 0 <= celda[0] < self.cols and 0 <= celda[1] < self.rows
+
+    def reiniciar(self, meta):
+        # Nueva búsqueda hacia meta (x, y); se descarta el estado anterior
+        self.meta = tuple(meta)
+        self.g = {}
+        self.rhs = {}
+        self.cola = []
+        self.claves = {}  # Clave vigente de cada estado en la cola (las demás son viejas)
+        self.km = 0
+        self.ultimo_inicio = None
+        self.bloqueadas = set()
+        self.celda_meta = meta[1] * self.cols + meta[0]
+        for rumbo in range(self.n_rumbos):
+            estado = self.celda_meta * self.n_rumbos + rumbo
+            self.rhs[estado] = 0
+            self._encolar(estado, (self._h(estado), 0))
+
+    def replanificar(self, inicio, rumbo, bloqueadas):
+        # Devuelve el camino de celdas desde inicio (x, y) hasta la meta, o None
+        inicial = (inicio[1] * self.cols + inicio[0]) * self.n_rumbos + rumbo
+        if self.ultimo_inicio is not None:
+            self.km += self._distancia(self.ultimo_inicio, inicial)
+        self.ultimo_inicio = inicial
+        self.inicial = inicial
+
+        nuevas = set(bloqueadas)
+        cambiadas = nuevas ^ self.bloqueadas
+        self.bloqueadas = nuevas
+        for celda in cambiadas:
+            for rumbo_entrada in range(self.n_rumbos):
+                for anterior, _ in self._predecesores(celda * self.n_rumbos + rumbo_entrada):
+                    self._actualizar(anterior)
+
+        self._calcular()
+        if self.g.get(inicial, INF) == INF:
+            return None
+        return self._extraer(inicial)
+
+    def _h(self, estado):
+        return self._distancia(self.inicial, estado) if self.ultimo_inicio is not None else 0
+
+    def _distancia(self, a, b):
+        ya, xa = divmod(a // self.n_rumbos, self.cols)
+        yb, xb = divmod(b // self.n_rumbos, self.cols)
+        return abs(xa - xb) + abs(ya - yb)
+
+    def _clave(self, estado):
+        m = min(self.g.get(estado, INF), self.rhs.get(estado, INF))
+        return (m + self._h(estado) + self.km, m)
+
+    def _encolar(self, estado, clave):
+        self.claves[estado] = clave
+        heappush(self.cola, (clave, estado))
+
+    def _sucesores(self, estado):
+        cols, n_rumbos, bloqueadas = self.cols, self.n_rumbos, self.bloqueadas
+        celda, rumbo = divmod(estado, n_rumbos)
+        y, x = divmod(celda, cols)
+        giros = self.costo_giro[rumbo]
+        sucesores = []
+        for nuevo_rumbo, (dx, dy) in enumerate(self.movimientos):
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < cols and 0 <= ny < self.rows:
+                nueva_celda = ny * cols + nx
+                if nueva_celda not in bloqueadas:
+                    sucesores.append((nueva_celda * n_rumbos + nuevo_rumbo, 1 + giros[nuevo_rumbo]))
+        return sucesores
+
+    def _predecesores(self, estado):
+        # Estados desde los que se entra a estado (sin mirar si su celda está bloqueada)
+        celda, rumbo = divmod(estado, self.n_rumbos)
+        y, x = divmod(celda, self.cols)
+        dx, dy = self.movimientos[rumbo]
+        px, py = x - dx, y - dy
+        if 0 <= px < self.cols and 0 <= py < self.rows:
+            base = (py * self.cols + px) * self.n_rumbos
+            for rumbo_previo in range(self.n_rumbos):
+                yield base + rumbo_previo, 1 + self.costo_giro[rumbo_previo][rumbo]
+
+    def _actualizar(self, estado):
+        g = self.g
+        if estado // self.n_rumbos != self.celda_meta:
+            rhs = INF
+            for sig, costo in self._sucesores(estado):
+                valor = costo + g.get(sig, INF)
+                if valor < rhs:
+                    rhs = valor
+            self.rhs[estado] = rhs
+        else:
+            rhs = self.rhs.get(estado, INF)
+        self.claves.pop(estado, None)
+        if g.get(estado, INF) != rhs:
+            self._encolar(estado, self._clave(estado))
+
+    def _calcular(self):
+        inicial = self.inicial
+        expansiones = 0
+        while self.cola:
+            clave, estado = self.cola[0]
+            if self.claves.get(estado) != clave:
+                heappop(self.cola)  # Entrada vieja
+                continue
+            g_inicial, rhs_inicial = self.g.get(inicial, INF), self.rhs.get(inicial, INF)
+            if not (clave < self._clave(inicial) or rhs_inicial != g_inicial):
+                break
+            heappop(self.cola)
+            del self.claves[estado]
+            expansiones += 1
+
+            nueva_clave = self._clave(estado)
+            g, rhs = self.g.get(estado, INF), self.rhs.get(estado, INF)
+            if clave < nueva_clave:
+                self._encolar(estado, nueva_clave)
+            elif g > rhs:
+                self.g[estado] = rhs
+                for anterior, _ in self._predecesores(estado):
+                    self._actualizar(anterior)
+            else:
+                self.g[estado] = INF
+                self._actualizar(estado)
+                for anterior, _ in self._predecesores(estado):
+                    self._actualizar(anterior)
+        self.expansiones = expansiones
+
+    def _extraer(self, estado):
+        path = []
+        for _ in range(self.cols * self.rows * self.n_rumbos):
+            y, x = divmod(estado // self.n_rumbos, self.cols)
+            path.append((x, y))
+            if estado // self.n_rumbos == self.celda_meta:
+                return path
+            estado = min(self._sucesores(estado), key=lambda par: par[1] + self.g.get(par[0], INF))[0]
+        return None
+
+
+# Tabla de reservas espacio-tiempo compartida por todos los tractores.
+# El tiempo se mide en turnos: lo que tarda un tractor en cruzar una celda. Cada
+# entrada (turno, celda) guarda a su dueño. Un tractor en la celda c durante el turno t
+# la reserva también en t + 1, porque mientras avanza ocupa dos celdas; así dos
+# tractores tampoco pueden intercambiar celdas.
+class TablaReservas:
+    def __init__(self):
+        self.ocupacion = {}  # (turno, celda) -> dueño
+        self.por_dueno = {}  # dueño -> claves que reservó
+
+    def libre(self, celda, turno, dueno=None):
+        otro = self.ocupacion.get((turno, celda))
+        return otro is None or otro == dueno
+
+    def reservar(self, dueno, celda, turno):
+        clave = (turno, celda)
+        self.ocupacion[clave] = dueno
+        self.por_dueno.setdefault(dueno, []).append(clave)
+
+    def reservar_camino(self, dueno, celdas, turno_inicial):
+        # celdas[k] es la celda ocupada en turno_inicial + k
+        for k, celda in enumerate(celdas):
+            self.reservar(dueno, celda, turno_inicial + k)
+            self.reservar(dueno, celda, turno_inicial + k + 1)
+
+    def reservar_estacionado(self, dueno, celda, turno_inicial, turnos):
+        for turno in range(turno_inicial, turno_inicial + turnos + 1):
+            self.reservar(dueno, celda, turno)
+
+    def liberar(self, dueno):
+        # Quita todas las reservas del dueño (las pisadas por otro se respetan)
+        for clave in self.por_dueno.pop(dueno, ()):
+            if self.ocupacion.get(clave) == dueno:
+                del self.ocupacion[clave]
+
+
+# A* cooperativo con ventana (WHCA*) sobre estados (celda, rumbo, turno).
+# Durante los primeros `ventana` turnos respeta la TablaReservas y puede esperar en
+# la celda (costo_espera por turno); más allá de la ventana el turno deja de
+# importar y la búsqueda es el A* de PlanificadorAEstrella. Los tractores planifican
+# uno tras otro y cada uno escribe su camino en la tabla, así que los siguientes lo
+# esquivan sin comparar distancias contra cada otro tractor en cada expansión.
+class PlanificadorCooperativo:
+    def __init__(self, cols, rows, movimientos, costo_giro, reservas, ventana=16, costo_espera=1):
+        self.cols = cols
+        self.rows = rows
+        self.movimientos = movimientos
+        self.n_rumbos = len(movimientos)
+        self.costo_giro = costo_giro
+        self.reservas = reservas
+        self.ventana = ventana
+        self.costo_espera = costo_espera
+        self.expansiones = 0  # Estados expandidos en la última búsqueda
+
+    def buscar(self, dueno, inicio, meta, rumbo_inicial, turno, bloqueadas=(),
+               rumbo_preferido=None, factor_preferido=0.8):
+        # Devuelve la celda (x, y) que ocupará el tractor en cada turno desde `turno`
+        # hasta llegar a meta (una celda repetida es una espera), o None
+        cols, rows, n_rumbos, ventana = self.cols, self.rows, self.n_rumbos, self.ventana
+        movimientos, costo_giro, costo_espera = self.movimientos, self.costo_giro, self.costo_espera
+        libre = self.reservas.libre
+        bloqueadas = set(bloqueadas)
+        gx, gy = meta
+        if meta[1] * cols + meta[0] in bloqueadas:
+            self.expansiones = 0
+            return None
+
+        vecinos = [(r, dx, dy, factor_preferido if r == rumbo_preferido else 1)
+                   for r, (dx, dy) in enumerate(movimientos)]
+        n_turnos = ventana + 1
+        inicial = ((inicio[1] * cols + inicio[0]) * n_rumbos + rumbo_inicial) * n_turnos
+        g = {inicial: 0}
+        padre = {inicial: None}
+        abiertos = [(0, 0, 0, inicial, 0)]
+        contador = 0
+        expansiones = 0
+
+        while abiertos:
+            _, _, _, estado, g_entrada = heappop(abiertos)
+            if g_entrada > g[estado]:
+                continue  # Entrada vieja: el estado ya se encoló con un g menor
+            expansiones += 1
+
+            resto, t = divmod(estado, n_turnos)
+            celda, rumbo = divmod(resto, n_rumbos)
+            y, x = divmod(celda, cols)
+            if x == gx and y == gy:
+                self.expansiones = expansiones
+                return self._reconstruir(estado, padre)
+
+            g_actual = g[estado]
+            siguiente = min(t + 1, ventana)
+            sucesores = []
+            if t + 1 < ventana and libre(celda, turno + t + 2, dueno):
+                sucesores.append((estado + 1, costo_espera, factor_preferido if rumbo == rumbo_preferido else 1, x, y))
+            giros = costo_giro[rumbo]
+            for nuevo_rumbo, dx, dy, factor in vecinos:
+                nx, ny = x + dx, y + dy
+                if not (0 <= nx < cols and 0 <= ny < rows):
+                    continue
+                nueva_celda = ny * cols + nx
+                if nueva_celda in bloqueadas:
+                    continue
+                if t + 1 < ventana and not (libre(nueva_celda, turno + t + 1, dueno)
+                                            and libre(nueva_celda, turno + t + 2, dueno)):
+                    continue
+                vecino = (nueva_celda * n_rumbos + nuevo_rumbo) * n_turnos + siguiente
+                sucesores.append((vecino, 1 + giros[nuevo_rumbo], factor, nx, ny))
+
+            for vecino, costo, factor, nx, ny in sucesores:
+                nuevo_g = g_actual + costo
+                if nuevo_g >= g.get(vecino, INF):
+                    continue
+                g[vecino] = nuevo_g
+                padre[vecino] = estado
+                h = (abs(nx - gx) + abs(ny - gy)) * factor
+                contador += 1
+                heappush(abiertos, (nuevo_g + h, h, contador, vecino, nuevo_g))
+
+        self.expansiones = expansiones
+        return None
+
+    def _reconstruir(self, estado, padre):
+        path = []
+        n_turnos = self.ventana + 1
+        while estado is not None:
+            y, x = divmod(estado // n_turnos // self.n_rumbos, self.cols)
+            path.append((x, y))
+            estado = padre[estado]
+        return path[::-1]
@@ -0,0 +1,92 @@
+from collections import deque
+
+import numpy as np
+
+# Avance de la cosecha por regiones y estimación del tiempo restante.
+# Los totales del campo (Campo.total_listas, total_reservadas, total_cosechadas) los
+# mantiene el propio Campo; Progreso lleva además los mismos conteos por región de
+# tam_region x tam_region parcelas (Campo le avisa en harvest() y en los cambios de
+# reserva) y una ventana con los últimos pasos muestreados para estimar la tasa de
+# cosecha reciente. Ninguna consulta recorre el campo:
+#
+#   progreso = Progreso(campo)
+#   progreso.muestrear(paso)      # una vez por paso
+#   progreso.fraccion(), progreso.terminado(), progreso.eta()
+#   progreso.fraccion_regiones()  # arreglo (filas de regiones, columnas de regiones)
+
+TAM_REGION = 10  # Parcelas por lado de cada región
+VENTANA = 200  # Muestras (pasos) que entran en la tasa de cosecha reciente
+
+
+class Progreso:
+    def __init__(self, campo, tam_region=TAM_REGION, ventana=VENTANA):
+        self.campo = campo
+        self.tam = tam_region
+        self.rrows = -(-campo.rows // tam_region)
+        self.rcols = -(-campo.cols // tam_region)
+        self.historial = deque(maxlen=ventana)  # (paso, parcelas cosechadas)
+        campo.progreso = self
+        self.reconstruir()
+
+    def _por_region(self, mascara):
+        relleno = np.zeros((self.rrows * self.tam, self.rcols * self.tam), dtype=np.int32)
+        relleno[:self.campo.rows, :self.campo.cols] = mascara
+        return relleno.reshape(self.rrows, self.tam, self.rcols, self.tam).sum(axis=(1, 3), dtype=np.int32)
+
+    def reconstruir(self):
+        # Recalcula los conteos por región desde cero (al crearlo o tras restaurar el campo)
+        campo = self.campo
+        self.parcelas = self._por_region(np.ones(campo.shape, dtype=bool))
+        self.listas = self._por_region(campo.ready_to_harvest)
+        self.reservadas = self._por_region(campo.reservada)
+        self.cosechadas = self._por_region(campo.harvested)
+
+    def cosechar(self, row, col, soltar_reserva):
+        i, j = row // self.tam, col // self.tam
+        self.listas[i, j] -= 1
+        self.cosechadas[i, j] += 1
+        if soltar_reserva:
+            self.reservadas[i, j] -= 1
+
+    def reservar(self, row, col, delta):
+        self.reservadas[row // self.tam, col // self.tam] += delta
+
+    def terminado(self):
+        return self.campo.total_listas == 0
+
+    def fraccion(self):
+        # Parte del campo ya cosechada, entre 0 y 1
+        return self.campo.total_cosechadas / (self.campo.rows * self.campo.cols)
+
+    def fraccion_regiones(self):
+        return self.cosechadas / self.parcelas
+
+    def regiones_terminadas(self):
+        # Máscara de las regiones sin parcelas por cosechar
+        return self.listas == 0
+
+    def muestrear(self, paso):
+        # Con avance por eventos los pasos muestreados no son consecutivos; la tasa lo tiene en cuenta
+        self.historial.append((paso, self.campo.total_cosechadas))
+
+    def tasa(self):
+        # Parcelas cosechadas por paso en la ventana reciente, o None sin muestras suficientes
+        if len(self.historial) < 2:
+            return None
+        (paso0, cosechadas0), (paso1, cosechadas1) = self.historial[0], self.historial[-1]
+        if paso1 <= paso0:
+            return None
+        return (cosechadas1 - cosechadas0) / (paso1 - paso0)
+
+    def eta(self):
+        # Pasos que faltan para cosechar todo al ritmo reciente: 0 si ya terminó, None si
+        # no hay tasa (sin muestras o sin cosechas en la ventana)
+        if self.terminado():
+            return 0
+        tasa = self.tasa()
+        if not tasa:
+            return None
+        return self.campo.total_listas / tasa
+
+    def nbytes(self):
+        return self.parcelas.nbytes + self.listas.nbytes + self.reservadas.nbytes + self.cosechadas.nbytes
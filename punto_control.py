@@ -0,0 +1,145 @@
+import copy
+import os
+import pickle
+import random
+import zlib
+from enum import Enum
+
+import numpy as np
+
+# Puntos de control de una corrida: todo el estado de HarvestSimulation en un
+# archivo binario (pickle comprimido con zlib) para retomarla tras un corte o
+# bifurcar variantes desde mitad de cosecha sin repetir los pasos ya hechos.
+#
+# Cada simulador declara qué guardar:
+#   HarvestSimulation.ESTADO_ARREGLOS  objetos cuyos arreglos se guardan todos (campo, flota)
+#   HarvestSimulation.ESTADO           atributos del modelo
+#   Tractor.ESTADO                     atributos de cada tractor
+# Los nombres pueden tener puntos ('contenedor.color'). Al restaurar, los arreglos
+# se copian sobre los existentes (así siguen valiendo las vistas como
+# tractor.position) y el resto se reasigna. Los conteos del campo y el índice de
+# parcelas se recalculan.
+# Los Enum se guardan por nombre, así el archivo no depende de si el simulador
+# corrió como script (__main__) o importado.
+#
+#   guardar(modelo, "corrida.ckpt")
+#   HarvestSimulation({'punto_control': "corrida.ckpt", ...}).setup()  # o Model.run()
+#
+# Con una semilla distinta de la guardada, la corrida retomada sigue con su propio
+# azar: así se bifurcan variantes Monte Carlo desde el mismo punto.
+
+MAGIA = b"COSECHA\x00"
+FORMATO = 1
+NIVEL_COMPRESION = 1  # Rápido: los arreglos booleanos del campo se comprimen bien igual
+
+
+def _leer_atributo(objeto, nombre):
+    for parte in nombre.split('.'):
+        objeto = getattr(objeto, parte)
+    return objeto.name if isinstance(objeto, Enum) else objeto
+
+
+def _escribir_atributo(objeto, nombre, valor):
+    *camino, final = nombre.split('.')
+    for parte in camino:
+        objeto = getattr(objeto, parte)
+    actual = getattr(objeto, final, None)
+    if isinstance(actual, Enum) and isinstance(valor, str):
+        valor = type(actual)[valor]
+    if isinstance(actual, np.ndarray) and isinstance(valor, np.ndarray):
+        if actual.shape != valor.shape:
+            raise ValueError(f"El punto de control no corresponde a este modelo: {nombre} "
+                             f"tiene forma {valor.shape} y no {actual.shape}")
+        actual[...] = valor
+    else:
+        setattr(objeto, final, valor)
+
+
+def estado(modelo):
+    # Diccionario con todo el estado de la corrida (referencias, no copias)
+    return {
+        'formato': FORMATO,
+        'parametros': {clave: valor for clave, valor in modelo.p.items() if clave != 'punto_control'},
+        't': modelo.t,
+        'arreglos': {
+            nombre: {clave: valor for clave, valor in vars(getattr(modelo, nombre)).items()
+                     if isinstance(valor, np.ndarray)}
+            for nombre in modelo.ESTADO_ARREGLOS
+        },
+        'modelo': {nombre: _leer_atributo(modelo, nombre) for nombre in modelo.ESTADO},
+        'tractores': [{nombre: _leer_atributo(tractor, nombre) for nombre in tractor.ESTADO}
+                      for tractor in modelo.tractores],
+        'azar': (random.getstate(), np.random.get_state(),
+                 modelo.random.getstate(), modelo.nprandom.bit_generator.state),
+    }
+
+
+def restaurar(modelo, datos):
+    # Lleva un modelo recién preparado con setup() (mismo campo y tractores) al estado guardado
+    if datos.get('formato') != FORMATO:
+        raise ValueError(f"Formato de punto de control desconocido: {datos.get('formato')}")
+    if len(datos['tractores']) != len(modelo.tractores):
+        raise ValueError(f"El punto de control tiene {len(datos['tractores'])} tractores "
+                         f"y el modelo {len(modelo.tractores)}")
+    for nombre, arreglos in datos['arreglos'].items():
+        objeto = getattr(modelo, nombre)
+        for clave, valor in arreglos.items():
+            _escribir_atributo(objeto, clave, valor)
+    for nombre, valor in datos['modelo'].items():
+        _escribir_atributo(modelo, nombre, valor)
+    for tractor, atributos in zip(modelo.tractores, datos['tractores']):
+        for nombre, valor in atributos.items():
+            _escribir_atributo(tractor, nombre, valor)
+    modelo.campo.recontar()
+    modelo.indice.reconstruir()
+    modelo.t = datos['t']
+    if modelo.p.get('seed') != datos['parametros'].get('seed'):
+        return
+    estado_random, estado_np, estado_modelo, estado_generador = datos['azar']
+    random.setstate(estado_random)
+    np.random.set_state(estado_np)
+    modelo.random.setstate(estado_modelo)
+    modelo.nprandom.bit_generator.state = estado_generador
+
+
+def guardar(modelo, ruta):
+    # Escribe en un archivo temporal y lo renombra: un corte a mitad de la escritura
+    # deja intacto el punto de control anterior
+    datos = zlib.compress(pickle.dumps(estado(modelo), protocol=pickle.HIGHEST_PROTOCOL), NIVEL_COMPRESION)
+    temporal = f"{ruta}.tmp"
+    with open(temporal, "wb") as archivo:
+        archivo.write(MAGIA)
+        archivo.write(datos)
+        archivo.flush()
+        os.fsync(archivo.fileno())
+    os.replace(temporal, ruta)
+
+
+def leer(ruta):
+    with open(ruta, "rb") as archivo:
+        if archivo.read(len(MAGIA)) != MAGIA:
+            raise ValueError(f"{ruta} no es un punto de control de la simulación")
+        return pickle.loads(zlib.decompress(archivo.read()))
+
+
+def cargar(modelo, punto_control):
+    # punto_control: ruta de un archivo o el diccionario que devuelve leer()/estado().
+    # El diccionario se copia para que varias corridas puedan partir del mismo
+    if isinstance(punto_control, (str, os.PathLike)):
+        punto_control = leer(punto_control)
+    else:
+        punto_control = copy.deepcopy(punto_control)
+    restaurar(modelo, punto_control)
+
+
+# Observador que guarda un punto de control cada 'cada' pasos (llamadas a step())
+class GuardadoPeriodico:
+    def __init__(self, ruta, cada):
+        self.ruta = ruta
+        self.cada = cada
+        self.pasos = 0
+
+    def actualizar(self, modelo):
+        self.pasos += 1
+        if self.pasos % self.cada == 0:
+            guardar(modelo, self.ruta)
@@ -0,0 +1,99 @@
+import glob
+import os
+
+import numpy as np
+
+# Registro de métricas por paso en columnas de NumPy.
+# Es un observador (modelo.agregar_observador): en cada paso copia posición,
+# combustible, carga y estado de cada tractor y los conteos del campo a buffers
+# preasignados de 'bloque' pasos. Cuando un bloque se llena se escribe como un
+# archivo .npz en el directorio del registro y los buffers se reutilizan, así que
+# la memoria no crece con la corrida. leer() junta los bloques en un arreglo por
+# columna:
+#
+#   registro = Registrador("corrida/", modelo)
+#   modelo.agregar_observador(registro)
+#   ...
+#   registro.cerrar()
+#   columnas = leer("corrida/")  # columnas['combustible'][paso, tractor]
+
+BLOQUE = 4096  # Pasos por archivo
+# Estado de cada tractor (columna 'estado'): índice en esta lista
+ESTADOS = ['libre', 'hacia_parcela', 'lleno', 'descargando', 'sin_combustible']
+
+
+class Registrador:
+    def __init__(self, directorio, modelo, bloque=BLOQUE, comprimir=False):
+        self.directorio = directorio
+        self.bloque = bloque
+        self.comprimir = comprimir
+        os.makedirs(directorio, exist_ok=True)
+        # Un registro nuevo reemplaza los bloques que hubiera de una corrida anterior
+        for ruta in glob.glob(os.path.join(directorio, "bloque-*.npz")):
+            os.remove(ruta)
+        n = len(modelo.tractores)
+        self.columnas = {
+            'paso': np.zeros(bloque, dtype=np.int64),
+            'cosechadas': np.zeros(bloque, dtype=np.int32),
+            'reservadas': np.zeros(bloque, dtype=np.int32),
+            'disponibles': np.zeros(bloque, dtype=np.int32),
+            'posicion': np.zeros((bloque, n, 2), dtype=np.float32),
+            'combustible': np.zeros((bloque, n), dtype=np.float32),
+            'carga': np.zeros((bloque, n), dtype=np.int32),
+            'estado': np.zeros((bloque, n), dtype=np.uint8),
+        }
+        self.fila = 0  # Siguiente fila libre del bloque actual
+        self.bloques = 0  # Bloques ya escritos
+        self.llamadas = 0
+
+    def actualizar(self, modelo):
+        self.llamadas += 1
+        fila = self.fila
+        columnas = self.columnas
+        flota = modelo.flota
+        campo = modelo.campo
+        # Los simuladores sin contador de pasos (etapa2) se registran por llamada
+        columnas['paso'][fila] = getattr(modelo, 'pasos', self.llamadas)
+        columnas['cosechadas'][fila] = campo.total_cosechadas
+        columnas['reservadas'][fila] = campo.total_reservadas
+        columnas['disponibles'][fila] = modelo.indice.total
+        columnas['posicion'][fila] = flota.posiciones
+        columnas['combustible'][fila] = flota.combustible
+        columnas['carga'][fila] = flota.carga
+
+        # El estado más urgente gana: descargando, sin combustible, lleno, con parcela, libre
+        estado = columnas['estado'][fila]
+        estado[:] = 0
+        estado[np.fromiter((t.objetivo_actual is not None for t in modelo.tractores), bool, len(estado))] = 1
+        estado[flota.carga >= flota.carga_max] = 2
+        estado[flota.combustible <= 0] = 4
+        estado[np.fromiter((t.descargando for t in modelo.tractores), bool, len(estado))] = 3
+
+        self.fila += 1
+        if self.fila == self.bloque:
+            self.escribir()
+
+    def escribir(self):
+        # Vuelca las filas ocupadas del bloque actual a un .npz y lo deja vacío
+        if self.fila == 0:
+            return
+        ruta = os.path.join(self.directorio, f"bloque-{self.bloques:05d}.npz")
+        guardar = np.savez_compressed if self.comprimir else np.savez
+        guardar(ruta, **{nombre: columna[:self.fila] for nombre, columna in self.columnas.items()})
+        self.bloques += 1
+        self.fila = 0
+
+    def cerrar(self):
+        self.escribir()
+
+
+def leer(directorio):
+    # Columnas de todos los bloques del registro, en orden
+    rutas = sorted(glob.glob(os.path.join(directorio, "bloque-*.npz")))
+    if not rutas:
+        raise FileNotFoundError(f"No hay bloques de registro en {directorio}")
+    bloques = []
+    for ruta in rutas:
+        with np.load(ruta) as datos:
+            bloques.append({nombre: datos[nombre] for nombre in datos.files})
+    return {nombre: np.concatenate([bloque[nombre] for bloque in bloques]) for nombre in bloques[0]}
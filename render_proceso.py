@@ -0,0 +1,202 @@
+import multiprocessing as mp
+import queue
+from collections import namedtuple
+
+import numpy as np
+
+# Estado de un paso tal como lo necesita el renderizador. Son copias: el modelo
+# puede seguir avanzando mientras otro proceso las dibuja.
+# El campo viaja como delta: índices planos de las celdas que cambiaron desde la
+# última instantánea aceptada y sus nuevos valores. Las celdas las anota Campo al
+# cosechar, reservar y liberar (CeldasCambiadas), así que armar una instantánea no
+# recorre el campo.
+Instantanea = namedtuple("Instantanea", [
+    "celdas", "harvested", "ready_to_harvest", "reservada",
+    "posiciones", "contenedores", "colores_contenedor", "combustible", "combustible_max",
+    "carga", "carga_max", "direcciones", "caminos",
+])
+
+# Dirección como la lee el renderizador (nombre y vector)
+Direccion = namedtuple("Direccion", ["name", "value"])
+
+
+# Campo y tractores reconstruidos a partir de instantáneas, con los mismos atributos
+# que usa RenderizadorPygame, para dibujar con él sin tener el modelo.
+class CampoVista:
+    def __init__(self, rows, cols):
+        self.rows = rows
+        self.cols = cols
+        self.harvested = np.zeros((rows, cols), dtype=bool)
+        self.ready_to_harvest = np.zeros((rows, cols), dtype=bool)
+        self.reservada = np.zeros((rows, cols), dtype=bool)
+
+
+class ContenedorVista:
+    def __init__(self, position, color):
+        self.position = position
+        self.color = color
+
+
+class TractorVista:
+    def __init__(self, instantanea, i):
+        self.position = instantanea.posiciones[i]
+        self.contenedor = ContenedorVista(instantanea.contenedores[i], tuple(instantanea.colores_contenedor[i]))
+        self.combustible = instantanea.combustible[i]
+        self.combustible_max = instantanea.combustible_max[i]
+        self.carga_actual = instantanea.carga[i]
+        self.carga_max = instantanea.carga_max[i]
+        direccion = instantanea.direcciones[i]
+        self.current_direction = Direccion(*direccion) if direccion else None
+        self.path = instantanea.caminos[i]
+
+
+class ModeloVista:
+    def __init__(self, rows, cols, silo_position):
+        self.campo = CampoVista(rows, cols)
+        self.silo_position = silo_position
+        self.tractores = []
+
+    def aplicar(self, instantanea):
+        for nombre in ("harvested", "ready_to_harvest", "reservada"):
+            getattr(self.campo, nombre).flat[instantanea.celdas] = getattr(instantanea, nombre)
+        self.tractores = [TractorVista(instantanea, i) for i in range(len(instantanea.posiciones))]
+
+
+# Celdas del campo que cambiaron desde la última instantánea enviada; Campo llama a
+# marcar() en harvest/reservar/liberar y a marcar_todas() al recontar (tras restaurar)
+class CeldasCambiadas:
+    def __init__(self, campo):
+        self.cols = campo.cols
+        self.celdas = set()
+        self.todas = True  # La primera instantánea lleva el campo entero
+        campo.cambios = self
+
+    def marcar(self, row, col):
+        self.celdas.add(row * self.cols + col)
+
+    def marcar_todas(self):
+        self.todas = True
+
+    def devolver(self, celdas):
+        # Celdas de una instantánea que no se pudo enviar: van en la próxima
+        self.celdas.update(celdas.tolist())
+
+    def tomar(self):
+        # Índices planos a enviar (None: todo el campo) y vacía el registro
+        celdas = None if self.todas else np.fromiter(self.celdas, dtype=np.int32, count=len(self.celdas))
+        self.celdas = set()
+        self.todas = False
+        return celdas
+
+
+def tomar_instantanea(modelo, celdas=None):
+    # celdas: índices planos del campo a enviar, o None para enviarlo entero
+    campo = modelo.campo
+    if celdas is None:
+        celdas = np.arange(campo.rows * campo.cols, dtype=np.int32)
+
+    flota = modelo.flota
+    n = len(modelo.tractores)
+    direcciones, caminos = [], []
+    for tractor in modelo.tractores:
+        direccion = getattr(tractor, "current_direction", None)
+        direcciones.append((direccion.name, direccion.value) if direccion else None)
+        caminos.append(list(getattr(tractor, "path", None) or []))
+    return Instantanea(
+        celdas=celdas,
+        harvested=campo.harvested.flat[celdas],
+        ready_to_harvest=campo.ready_to_harvest.flat[celdas],
+        reservada=campo.reservada.flat[celdas],
+        posiciones=flota.posiciones[:n].copy(),
+        contenedores=flota.contenedores[:n].copy(),
+        colores_contenedor=np.array([tractor.contenedor.color for tractor in modelo.tractores], dtype=np.uint8),
+        combustible=flota.combustible[:n].copy(),
+        combustible_max=np.array([tractor.combustible_max for tractor in modelo.tractores], dtype=float),
+        carga=flota.carga[:n].copy(),
+        carga_max=flota.carga_max[:n].copy(),
+        direcciones=direcciones,
+        caminos=caminos,
+    )
+
+
+def _bucle_render(cola, titulo, ancho, alto, grid_size, color_reservada, rows, cols, silo_position, fps_max):
+    # Proceso de dibujo: aplica todas las instantáneas pendientes y dibuja solo la última
+    import pygame
+    from renderizado import RenderizadorPygame
+
+    renderizador = RenderizadorPygame(titulo, ancho, alto, grid_size, color_reservada=color_reservada)
+    vista = ModeloVista(rows, cols, silo_position)
+    reloj = pygame.time.Clock()
+    terminar = False
+    while not terminar and renderizador.procesar_eventos():
+        try:
+            pendientes = [cola.get(timeout=0.1)]
+        except queue.Empty:
+            continue
+        while True:
+            try:
+                pendientes.append(cola.get_nowait())
+            except queue.Empty:
+                break
+        for instantanea in pendientes:
+            if instantanea is None:
+                terminar = True
+                break
+            vista.aplicar(instantanea)
+        renderizador.actualizar(vista)
+        reloj.tick(fps_max)
+    renderizador.cerrar()
+
+
+# Renderizador que publica instantáneas para que otro proceso las dibuje. Tiene la
+# misma interfaz que RenderizadorPygame (actualizar, procesar_eventos, cerrar), así que
+# bucle.ejecutar lo usa igual: mismo paso fijo, velocidad y cuadros por segundo.
+# Si el proceso de dibujo se atrasa la cola se llena y las instantáneas se descartan
+# (las celdas cambiadas se acumulan para la siguiente), así que nunca se espera a pygame.
+class RenderizadorEnProceso:
+    def __init__(self, titulo, ancho, alto, grid_size, modelo, color_reservada=None, fps_max=30,
+                 max_pendientes=4):
+        contexto = mp.get_context("spawn")
+        self.cola = contexto.Queue(max_pendientes)
+        self.proceso = contexto.Process(
+            target=_bucle_render,
+            args=(self.cola, titulo, ancho, alto, grid_size, color_reservada,
+                  modelo.campo.rows, modelo.campo.cols, modelo.silo_position, fps_max),
+            daemon=True,
+        )
+        self.proceso.start()
+        self.cambios = CeldasCambiadas(modelo.campo)
+        self.publicadas = 0
+        self.descartadas = 0
+
+    def actualizar(self, modelo):
+        if self.cola.full():
+            # Ni siquiera se arma la instantánea: las celdas cambiadas quedan para la próxima
+            self.descartadas += 1
+            return
+        instantanea = tomar_instantanea(modelo, self.cambios.tomar())
+        try:
+            self.cola.put_nowait(instantanea)
+        except queue.Full:
+            self.descartadas += 1
+            if len(instantanea.celdas) == modelo.campo.rows * modelo.campo.cols:
+                self.cambios.marcar_todas()
+            else:
+                self.cambios.devolver(instantanea.celdas)
+            return
+        self.publicadas += 1
+
+    def procesar_eventos(self):
+        # False cuando se cerró la ventana (el proceso de dibujo terminó)
+        return self.proceso.is_alive()
+
+    def cerrar(self, espera=10):
+        # Deja que el proceso dibuje lo pendiente y cierre la ventana (arrancar lleva unos segundos)
+        if self.proceso.is_alive():
+            try:
+                self.cola.put(None, timeout=espera)
+            except queue.Full:
+                pass
+            self.proceso.join(timeout=espera)
+        if self.proceso.is_alive():
+            self.proceso.terminate()
@@ -0,0 +1,326 @@
+import math
+
+import numpy as np
+import pygame
+
+# Colores
+COLOR_EMPTY = (255, 255, 255)
+COLOR_HARVESTED = (200, 200, 200)
+COLOR_READY = (100, 255, 100)
+COLOR_TRACTOR = (255, 100, 100)
+COLOR_FUEL = (100, 100, 255)
+COLOR_CARGO = (255, 165, 0)
+
+# Cuando cambian más celdas que esta fracción de las visibles se rehace el campo entero con surfarray
+FRACCION_REDIBUJO_COMPLETO = 0.25
+
+# Ancho del panel de gráficas, a la derecha de la ventana y por encima del campo
+ANCHO_PANEL = 200
+# Zoom en píxeles de pantalla por unidad de simulación (la celda mide grid_size unidades)
+ZOOM_MIN, ZOOM_MAX = 0.002, 4.0
+FACTOR_ZOOM = 1.25
+# Con celdas más chicas que esto (en píxeles) no se dibujan caminos, direcciones ni etiquetas
+CELDA_MIN_DETALLE = 6
+
+
+# Cámara sobre el mundo de la simulación: pantalla = (mundo - origen) * zoom.
+# El campo y el silo viven en unidades de simulación y la ventana solo muestra una
+# parte; cambio avisa al renderizador que el fondo en caché ya no sirve.
+class Camara:
+    def __init__(self, zoom=1.0, x=0.0, y=0.0):
+        self.zoom = zoom
+        self.x = x
+        self.y = y
+        self.cambio = True
+
+    def a_pantalla(self, x, y):
+        return (x - self.x) * self.zoom, (y - self.y) * self.zoom
+
+    def a_mundo(self, x, y):
+        return x / self.zoom + self.x, y / self.zoom + self.y
+
+    def desplazar(self, dx, dy):
+        # dx, dy en píxeles de pantalla
+        self.x += dx / self.zoom
+        self.y += dy / self.zoom
+        self.cambio = True
+
+    def acercar(self, factor, x, y):
+        # Zoom manteniendo quieto el punto del mundo que está en (x, y) de la pantalla
+        mundo_x, mundo_y = self.a_mundo(x, y)
+        self.zoom = min(max(self.zoom * factor, ZOOM_MIN), ZOOM_MAX)
+        self.x = mundo_x - x / self.zoom
+        self.y = mundo_y - y / self.zoom
+        self.cambio = True
+
+    def encuadrar(self, ancho_mundo, alto_mundo, ancho_vista, alto_vista):
+        # Todo el mundo a la vista sin agrandarlo más allá de 1:1
+        self.zoom = min(1.0, ancho_vista / ancho_mundo, alto_vista / alto_mundo)
+        self.x = self.y = 0.0
+        self.cambio = True
+
+
+def agregar_colores(colores, k):
+    # Promedia bloques de k x k celdas (los del borde pueden ser más chicos): con el
+    # campo lejos cada píxel muestra la mezcla de cosechadas y listas de su bloque
+    filas = np.arange(0, colores.shape[0], k)
+    columnas = np.arange(0, colores.shape[1], k)
+    suma = np.add.reduceat(np.add.reduceat(colores.astype(np.uint32), filas, axis=0), columnas, axis=1)
+    cuenta = np.outer(np.diff(np.append(filas, colores.shape[0])), np.diff(np.append(columnas, colores.shape[1])))
+    return (suma // cuenta[:, :, None]).astype(np.uint8)
+
+
+# Observador que dibuja el estado del modelo con pygame al final de cada paso.
+# Los simuladores solo lo importan cuando no corren en modo headless.
+# El campo se ve a través de una Camara (flechas o arrastrar con el mouse para
+# desplazar, rueda o +/- para el zoom, 0 para ver todo el campo), así que su tamaño
+# no depende de la ventana. Con el campo lejos se dibujan bloques agregados en vez de
+# celdas y se omiten los detalles de los tractores.
+# Dibujo incremental: el campo y el silo viven en una superficie de fondo en caché
+# donde solo se repintan las celdas que cambiaron; tractores, caminos y gráficas se
+# dibujan encima y en el cuadro siguiente se borran reponiendo el fondo. A la pantalla
+# solo se envían esos rectángulos con pygame.display.update(rects). Si la cámara se
+# mueve el fondo se rehace entero.
+class RenderizadorPygame:
+    def __init__(self, titulo, ancho, alto, grid_size, color_reservada=None):
+        self.ancho = ancho
+        self.alto = alto
+        self.grid_size = grid_size
+        self.color_reservada = color_reservada  # None: las reservas no se pintan
+        # Color de cada código de celda: 0 vacía, 1 cosechada, 2 lista, 3 reservada
+        self.colores = np.array([COLOR_EMPTY, COLOR_HARVESTED, COLOR_READY, color_reservada or COLOR_EMPTY],
+                                dtype=np.uint8)
+
+        pygame.init()
+        self.screen = pygame.display.set_mode((ancho, alto))
+        pygame.display.set_caption(titulo)
+
+        # La fuente y los textos renderizados se crean una sola vez
+        self.font = pygame.font.Font(None, 24)
+        self.etiquetas = {}
+
+        self.camara = None  # Se encuadra el campo en el primer cuadro
+        self.mundo = None  # Ancho y alto del campo en unidades de simulación
+        self.fondo = None  # Campo y silo vistos por la cámara
+        self.codigos = None  # Código de cada celda visible en el último cuadro dibujado
+        self.rects_dinamicos = []  # Lo dibujado encima del fondo en el cuadro anterior
+        self.rects_silo = []
+        self.redibujar_todo = True
+
+    def procesar_eventos(self):
+        # Devuelve False cuando se cierra la ventana
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return False
+            if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                self.redibujar_todo = True
+            elif self.camara is None:
+                continue
+            elif event.type == pygame.KEYDOWN:
+                self.tecla(event.key)
+            elif event.type == pygame.MOUSEWHEEL:
+                self.camara.acercar(FACTOR_ZOOM ** event.y, *pygame.mouse.get_pos())
+            elif event.type == pygame.MOUSEMOTION and event.buttons[0]:
+                self.camara.desplazar(-event.rel[0], -event.rel[1])
+        return True
+
+    def tecla(self, tecla):
+        # Flechas: desplazar; +/-: zoom al centro de la vista; 0: ver todo el campo
+        paso = 0.1 * (self.ancho - ANCHO_PANEL)
+        desplazamientos = {pygame.K_LEFT: (-paso, 0), pygame.K_RIGHT: (paso, 0),
+                           pygame.K_UP: (0, -paso), pygame.K_DOWN: (0, paso)}
+        centro = ((self.ancho - ANCHO_PANEL) / 2, self.alto / 2)
+        if tecla in desplazamientos:
+            self.camara.desplazar(*desplazamientos[tecla])
+        elif tecla in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+            self.camara.acercar(FACTOR_ZOOM, *centro)
+        elif tecla in (pygame.K_MINUS, pygame.K_KP_MINUS):
+            self.camara.acercar(1 / FACTOR_ZOOM, *centro)
+        elif tecla in (pygame.K_0, pygame.K_KP0):
+            self.encuadrar()
+
+    def encuadrar(self):
+        # El campo entero en la zona a la izquierda del panel
+        self.camara.encuadrar(*self.mundo, self.ancho - ANCHO_PANEL, self.alto)
+
+    def etiqueta(self, texto):
+        superficie = self.etiquetas.get(texto)
+        if superficie is None:
+            superficie = self.etiquetas[texto] = self.font.render(texto, True, (0, 0, 0))
+        return superficie
+
+    def actualizar(self, modelo):
+        if self.camara is None:
+            self.mundo = (modelo.campo.cols * self.grid_size, modelo.campo.rows * self.grid_size)
+            self.camara = Camara()
+            self.encuadrar()
+        if self.camara.cambio:
+            self.rehacer_fondo(modelo)
+
+        # Borrar lo dinámico del cuadro anterior reponiendo el fondo
+        for rect in self.rects_dinamicos:
+            self.screen.blit(self.fondo, rect, rect)
+        sucias = self.rects_dinamicos + self.dibujar_campo(modelo)
+        self.rects_dinamicos = self.dibujar_tractores(modelo)
+        # El silo queda por encima de los contenedores que llegan a él. La etiqueta no se
+        # repinta: su borde suavizado se oscurecería al mezclarse sobre sí misma
+        if any(rect.colliderect(self.rects_silo[0]) for rect in self.rects_dinamicos):
+            self.dibujar_silo(modelo, self.screen, etiqueta=False)
+        # El panel va por encima de todo lo que la cámara muestre debajo
+        self.rects_dinamicos += self.dibujar_graficas(modelo)
+
+        if self.redibujar_todo:
+            pygame.display.flip()
+            self.redibujar_todo = False
+        else:
+            pygame.display.update(sucias + self.rects_dinamicos)
+
+    def cerrar(self):
+        pygame.quit()
+
+    def rehacer_fondo(self, modelo):
+        # La cámara se movió: fondo nuevo con el silo y, en el próximo dibujar_campo, todo el campo
+        self.fondo = pygame.Surface((self.ancho, self.alto))
+        self.fondo.fill(COLOR_EMPTY)
+        self.rects_silo = self.dibujar_silo(modelo, self.fondo)
+        self.screen.blit(self.fondo, (0, 0))
+        self.codigos = None
+        self.rects_dinamicos = []
+        self.redibujar_todo = True
+        self.camara.cambio = False
+
+    def celdas_visibles(self, campo):
+        # (r0, r1, c0, c1) de las celdas que caen en la ventana
+        g = self.grid_size
+        x0, y0 = self.camara.a_mundo(0, 0)
+        x1, y1 = self.camara.a_mundo(self.ancho, self.alto)
+        return (max(int(y0 // g), 0), min(math.ceil(y1 / g), campo.rows),
+                max(int(x0 // g), 0), min(math.ceil(x1 / g), campo.cols))
+
+    def rect_pantalla(self, x0, y0, x1, y1):
+        # Rectángulo de pantalla de la zona del mundo [x0, x1) x [y0, y1), con bordes enteros
+        sx0, sy0 = self.camara.a_pantalla(x0, y0)
+        sx1, sy1 = self.camara.a_pantalla(x1, y1)
+        sx0, sy0, sx1, sy1 = round(sx0), round(sy0), round(sx1), round(sy1)
+        return pygame.Rect(sx0, sy0, sx1 - sx0, sy1 - sy0)
+
+    def dibujar_campo(self, modelo):
+        # Repinta en el fondo (y en pantalla) solo las celdas visibles cuyo código cambió.
+        # Solo se miran las celdas visibles: con la cámara quieta son siempre las mismas
+        campo = modelo.campo
+        r0, r1, c0, c1 = self.celdas_visibles(campo)
+        if r0 >= r1 or c0 >= c1:
+            return []
+        vista = np.s_[r0:r1, c0:c1]
+        codigos = np.where(campo.harvested[vista], 1, np.where(campo.ready_to_harvest[vista], 2, 0)).astype(np.uint8)
+        if self.color_reservada:
+            codigos[campo.reservada[vista]] = 3
+        if self.codigos is None:
+            cambiadas = np.ones(codigos.shape, dtype=bool)
+        else:
+            cambiadas = codigos != self.codigos
+        self.codigos = codigos
+
+        rows, cols = np.nonzero(cambiadas)
+        g = self.grid_size
+        tam_celda = g * self.camara.zoom
+        if len(rows) > FRACCION_REDIBUJO_COMPLETO * codigos.size or (len(rows) and tam_celda < 1):
+            # Muchos cambios o celdas de menos de un píxel: una celda (o un bloque de
+            # celdas agregadas) por píxel con surfarray y se escala a la vista
+            colores = self.colores[codigos]
+            if tam_celda < 1:
+                colores = agregar_colores(colores, math.ceil(1 / tam_celda))
+            pixeles = pygame.surfarray.make_surface(colores.transpose(1, 0, 2))
+            rect = self.rect_pantalla(c0 * g, r0 * g, c1 * g, r1 * g)
+            rect = self.fondo.blit(pygame.transform.scale(pixeles, rect.size), rect)
+            self.screen.blit(self.fondo, rect, rect)
+            return [rect]
+
+        rects = []
+        for row, col in zip(rows.tolist(), cols.tolist()):
+            rect = self.rect_pantalla((c0 + col) * g, (r0 + row) * g, (c0 + col + 1) * g, (r0 + row + 1) * g)
+            self.fondo.fill(self.colores[codigos[row, col]], rect)
+            self.screen.blit(self.fondo, rect, rect)
+            rects.append(rect)
+        return rects
+
+    def dibujar_tractores(self, modelo):
+        camara = self.camara
+        g = self.grid_size
+        detalle = g * camara.zoom >= CELDA_MIN_DETALLE
+        radio = max(2, round(g // 3 * camara.zoom))
+        origen = np.array([camara.x, camara.y])
+        rects = []
+        for idx, tractor in enumerate(modelo.tractores):
+            posicion = (tractor.position - origen) * camara.zoom
+            # Dibujar el camino planeado (solo en la variante A*)
+            path = getattr(tractor, "path", None)
+            if path and detalle:
+                puntos = (np.array(path) * g + g // 2 - origen) * camara.zoom
+                for i in range(len(puntos) - 1):
+                    rects.append(pygame.draw.line(self.screen, (0, 0, 255), puntos[i], puntos[i + 1], 2))
+
+            # Dibujar el contenedor y el tractor
+            contenedor = (tractor.contenedor.position - origen) * camara.zoom
+            rects.append(pygame.draw.circle(self.screen, tractor.contenedor.color, contenedor.astype(int), radio))
+            rects.append(pygame.draw.circle(self.screen, COLOR_TRACTOR, posicion.astype(int), radio))
+            if not detalle:
+                continue
+
+            # Dibujar la dirección actual del tractor
+            direccion = getattr(tractor, "current_direction", None)
+            if direccion:
+                direction_point = posicion + np.array(direccion.value) * g * camara.zoom
+                rects.append(pygame.draw.line(self.screen, (255, 0, 0),
+                                              posicion.astype(int),
+                                              direction_point.astype(int), 2))
+
+            # Etiqueta del tractor
+            rects.append(self.screen.blit(self.etiqueta(f"Tractor {idx + 1}"),
+                                          (posicion[0] - 15, posicion[1] - 30)))
+        return rects
+
+    def dibujar_graficas(self, modelo):
+        bar_width = 150
+        bar_height = 20
+        margin_top = 20
+        panel_x = self.ancho - 180
+        # Solo los tractores que entran en la altura de la ventana, sobre fondo liso
+        tractores = modelo.tractores[:max(0, (self.alto - margin_top) // 70)]
+        panel = pygame.Rect(panel_x, 0, self.ancho - panel_x, min(self.alto, margin_top + len(tractores) * 70))
+        self.screen.fill(COLOR_EMPTY, panel)
+        rects = [panel]
+        for idx, tractor in enumerate(tractores):
+            # Dibujar barra de combustible
+            fuel_ratio = tractor.combustible / tractor.combustible_max
+            pygame.draw.rect(self.screen, COLOR_FUEL, (panel_x, margin_top + idx * 70, int(bar_width * fuel_ratio), bar_height))
+            rects.append(pygame.draw.rect(self.screen, (0, 0, 0), (panel_x, margin_top + idx * 70, bar_width, bar_height), 2))
+
+            # Dibujar barra de carga
+            cargo_ratio = tractor.carga_actual / tractor.carga_max
+            pygame.draw.rect(self.screen, COLOR_CARGO, (panel_x, margin_top + idx * 70 + 30, int(bar_width * cargo_ratio), bar_height))
+            rects.append(pygame.draw.rect(self.screen, (0, 0, 0), (panel_x, margin_top + idx * 70 + 30, bar_width, bar_height), 2))
+
+            # Etiqueta del tractor
+            rects.append(self.screen.blit(self.etiqueta(f"Tractor {idx + 1}"), (panel_x, margin_top + idx * 70 - 20)))
+
+            # Mostrar dirección actual
+            direccion = getattr(tractor, "current_direction", None)
+            if direccion:
+                rects.append(self.screen.blit(self.etiqueta(f"Dir: {direccion.name}"),
+                                              (self.ancho - 80, margin_top + idx * 70 + 5)))
+        return rects
+
+    def dibujar_silo(self, modelo, superficie, etiqueta=True):
+        # El silo no se mueve: va en el fondo y solo se repinta si algo pasa por encima
+        silo_width = 150
+        silo_height = 150
+        x, y = modelo.silo_position
+        rect = pygame.draw.rect(superficie, (105, 105, 105), self.rect_pantalla(x, y, x + silo_width, y + silo_height))
+        if not etiqueta:
+            return [rect]
+        label = self.etiqueta("Silo")
+        centro_x, arriba = self.camara.a_pantalla(x + silo_width // 2, y)
+        label_rect = label.get_rect(center=(round(centro_x), round(arriba) - 20))
+        superficie.blit(label, label_rect)
+        return [rect, label_rect]
@@ -0,0 +1,70 @@
+import heapq
+
+import numpy as np
+
+
+# Reservas de parcelas con dueño y vencimiento.
+# La máscara campo.reservada (la que usan el índice de parcelas y el dibujo) se
+# sigue escribiendo con Campo.reservar/liberar; aquí se lleva además qué tractor
+# reservó cada parcela y hasta qué paso. Los vencimientos van en un min-heap por
+# paso de simulación: reservar es O(log n), liberar O(1) (la entrada vieja del heap
+# se descarta cuando sale) y expirar() solo mira las reservas vencidas, así que no
+# depende del dibujo ni recorre el campo. Sin duracion las reservas no vencen.
+class ReservasParcelas:
+    def __init__(self, campo, duracion=None):
+        self.campo = campo
+        self.duracion = duracion  # Pasos que dura una reserva, o None
+        self.dueno = np.full(campo.shape, -1, dtype=np.int32)  # -1: sin dueño
+        self.vence = np.zeros(campo.shape, dtype=np.int64)  # Paso en que vence la reserva
+        self.cola = []  # (vence, row, col); puede tener entradas viejas
+        self.por_dueno = {}  # dueño -> parcelas (row, col) que tiene reservadas
+        # El campo avisa cuando una cosecha suelta la reserva
+        campo.reservas = self
+
+    def reservar(self, dueno, row, col, ahora):
+        self.campo.reservar(row, col)
+        anterior = self.dueno[row, col]
+        if anterior >= 0:
+            self.por_dueno[anterior].discard((row, col))
+        self.dueno[row, col] = dueno
+        self.por_dueno.setdefault(dueno, set()).add((row, col))
+        if self.duracion is not None:
+            # Vence al empezar el paso ahora + duracion + 1: dura 'duracion' pasos completos
+            vence = ahora + self.duracion + 1
+            self.vence[row, col] = vence
+            heapq.heappush(self.cola, (vence, row, col))
+
+    def liberar(self, row, col):
+        self.campo.liberar(row, col)
+        self.olvidar(row, col)
+
+    def olvidar(self, row, col):
+        # Quita el dueño sin tocar la máscara (Campo.harvest ya la soltó)
+        dueno = self.dueno[row, col]
+        if dueno >= 0:
+            self.por_dueno[dueno].discard((row, col))
+            self.dueno[row, col] = -1
+
+    def liberar_dueno(self, dueno):
+        # Al cambiar de objetivo: suelta las parcelas sin cosechar que reservó dueno.
+        # Las ya cosechadas (etapa2 las mantiene reservadas) siguen hasta vencer
+        celdas = self.por_dueno.get(dueno)
+        if not celdas:
+            return
+        for row, col in [celda for celda in celdas if self.campo.ready_to_harvest[celda]]:
+            self.liberar(row, col)
+
+    def proximo_vencimiento(self):
+        # Paso del próximo vencimiento (quizá de una entrada vieja), o None
+        return self.cola[0][0] if self.cola else None
+
+    def expirar(self, ahora):
+        # Libera las reservas vencidas al empezar el paso 'ahora'
+        cola = self.cola
+        while cola and cola[0][0] <= ahora:
+            vence, row, col = heapq.heappop(cola)
+            if self.vence[row, col] == vence and self.dueno[row, col] >= 0:
+                self.liberar(row, col)
+
+    def nbytes(self):
+        return self.dueno.nbytes + self.vence.nbytes
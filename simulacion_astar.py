@@ -1,8 +1,21 @@
+import argparse
 import numpy as np
-import pygame
 import random
 import agentpy as ap
-from heapq import heappush, heappop
+from campo import Campo
+from reservas import ReservasParcelas
+from progreso import Progreso
+from indice_parcelas import IndiceParcelas
+from flota import Flota
+from asignacion import asignar_parcelas
+from cobertura import PlanCobertura
+from bucle import ejecutar
+from perfil import Perfilador
+from eventos import Agenda
+from punto_control import cargar, leer, guardar, GuardadoPeriodico
+from registro import Registrador
+from planificador import (PlanificadorAEstrella, PlanificadorIncremental, PlanificadorCooperativo,
+                          TablaReservas, celdas_bloqueadas)
 from enum import Enum
 import requests_simulador as rs
 
@@ -12,16 +25,13 @@ GRID_SIZE = 20
 ROWS, COLS = HEIGHT // GRID_SIZE, (WIDTH - 200) // GRID_SIZE
 TRACTOR_COUNT = 4
 TRACTOR_SPEED = 5
+DESCARGA_DURACION = 30  # Pasos que tarda una descarga en el contenedor
+PASOS_POR_SEGUNDO = 1000 / 150  # Ritmo de la simulación en pantalla a velocidad 1
+VENTANA_COOPERATIVA = 16  # Turnos (cruces de celda) que cubren las reservas en modo cooperativo
 
-# Colores
-COLOR_EMPTY = (255, 255, 255)
-COLOR_HARVESTED = (200, 200, 200)
-COLOR_READY = (100, 255, 100)
-COLOR_TRACTOR = (255, 100, 100)
+# Colores del contenedor (el resto de colores vive en renderizado.py)
 COLOR_CONTAINER = (150, 150, 255)
 COLOR_UNLOADING = (255, 255, 0)
-COLOR_FUEL = (100, 100, 255)
-COLOR_CARGO = (255, 165, 0)
 
 # Direcciones de movimiento (arriba, derecha, abajo, izquierda)
 class Direction(Enum):
@@ -30,51 +40,71 @@ class Direction(Enum):
     DOWN = (0, 1)
     LEFT = (-1, 0)
 
-class PathNode:
-    def __init__(self, position, g_cost, h_cost, parent=None, direction=None):
-        self.position = position
-        self.g_cost = g_cost
-        self.h_cost = h_cost
-        self.f_cost = g_cost + h_cost
-        self.parent = parent
-        self.direction = direction
-
-    def __lt__(self, other):
-        return self.f_cost < other.f_cost
-
-class Parcel(ap.Agent):
-    def setup(self):
-        self.ready_to_harvest = True
-        self.harvested = False
-        self.reservada = False
-    
-    def harvest(self):
-        if self.ready_to_harvest:
-            self.ready_to_harvest = False
-            self.harvested = True
-            self.reservada = False
+DIRECCIONES = list(Direction)
 
+# Posición, velocidad, combustible y carga viven en los arreglos de model.flota
 class Tractor(ap.Agent):
+    # Atributos que guarda un punto de control (punto_control.py)
+    ESTADO = ['objetivo_actual', 'descargando', 'descarga_duracion', 'contador_descarga', 'contenedor.color',
+              'path', 'turno_plan', 'espera', 'current_direction', 'previous_direction',
+              'planificador_incremental']
+
     def setup(self, initial_position, id):
         self.id = id
-        self.speed = TRACTOR_SPEED
-        self.carga_max = 50
-        self.carga_actual = 0
+        self.flota = self.model.flota
+        self.id_flota = self.flota.agregar(initial_position)
+        self.position = self.flota.posiciones[self.id_flota]  # Vista sobre el arreglo de la flota
         self.combustible_max = 1000
-        self.combustible = self.combustible_max
-        self.position = np.array(initial_position, dtype=float)
         self.objetivo_actual = None
         self.descargando = False
         self.descarga_duracion = 0
         self.contador_descarga = 0
-        self.contenedor = Container(self.position.copy())
+        self.contenedor = Container(self.flota, self.id_flota)
         self.path = []
-        rs.send_coordinates_background(self.id, round(self.position[0]), round(self.position[1]))
+        self.turno_plan = 0  # Turno en que se calculó el camino (modo cooperativo)
+        self.espera = 0  # Pasos que quedan de una espera del plan cooperativo
+        # En modo incremental cada tractor conserva su búsqueda D* Lite entre pasos
+        self.planificador_incremental = None
+        if self.model.planificacion == 'incremental':
+            self.planificador_incremental = PlanificadorIncremental(
+                self.model.columnas, self.model.filas, self.model.movimientos, self.model.costo_giro
+            )
+        if self.model.telemetria:
+            rs.send_coordinates_background(self.id, round(self.position[0]), round(self.position[1]))
         # Inicializar con dirección hacia arriba
         self.current_direction = Direction.UP
         self.previous_direction = Direction.UP
+
+    @property
+    def speed(self):
+        return self.flota.velocidades[self.id_flota]
+
+    @speed.setter
+    def speed(self, valor):
+        self.flota.velocidades[self.id_flota] = valor
+
+    @property
+    def combustible(self):
+        return self.flota.combustible[self.id_flota]
+
+    @combustible.setter
+    def combustible(self, valor):
+        self.flota.combustible[self.id_flota] = valor
+
+    @property
+    def carga_actual(self):
+        return self.flota.carga[self.id_flota]
+
+    @carga_actual.setter
+    def carga_actual(self, valor):
+        self.flota.carga[self.id_flota] = valor
+
+    @property
+    def carga_max(self):
+        return self.flota.carga_max[self.id_flota]
     
-    def calcular_costo_giro(self, current_dir, new_dir):
+    @staticmethod
+    def calcular_costo_giro(current_dir, new_dir):
         if current_dir is None:
             return 0
         # Penalizar más severamente los giros
@@ -88,87 +118,69 @@ class Tractor(ap.Agent):
             return 5  # Penalización para giros de 90 grados
         return 0  # Sin costo para movimiento recto
     
-    def encontrar_camino(self, start_grid, goal_grid, campo, otros_tractores):
-        open_set = []
-        closed_set = set()
-        
-        # Crear nodo inicial con la dirección actual
-        start_node = PathNode(
-            start_grid,
-            0,
-            self.manhattan_distance(start_grid, goal_grid),
-            None,
-            self.current_direction
-        )
-        heappush(open_set, start_node)
-        
-        while open_set:
-            current = heappop(open_set)
-            
-            if current.position == goal_grid:
-                self.previous_direction = self.current_direction
-                return self.reconstruir_camino(current)
-            
-            if current.position in closed_set:
-                continue
-                
-            closed_set.add(current.position)
-            
-            # Priorizar la dirección actual primero
-            direcciones = list(Direction)
-            if self.current_direction in direcciones:
-                direcciones.remove(self.current_direction)
-                direcciones.insert(0, self.current_direction)
-            
-            for direction in direcciones:
-                dx, dy = direction.value
-                new_pos = (current.position[0] + dx, current.position[1] + dy)
-                
-                if not (0 <= new_pos[0] < COLS and 0 <= new_pos[1] < ROWS):
-                    continue
-                
-                if self.hay_colision(new_pos, otros_tractores):
-                    continue
-                
-                giro_costo = self.calcular_costo_giro(current.direction, direction)
-                g_cost = current.g_cost + 1 + giro_costo
-                
-                # Modificar la heurística para favorecer movimientos en la misma dirección
-                h_cost = self.manhattan_distance(new_pos, goal_grid)
-                if direction == self.current_direction:
-                    h_cost *= 0.8  # Reducir el costo para favorecer movimiento recto
-                
-                neighbor = PathNode(
-                    new_pos,
-                    g_cost,
-                    h_cost,
-                    current,
-                    direction
-                )
-                
-                heappush(open_set, neighbor)
-        
-        return None
-
-    def hay_colision(self, pos, otros_tractores):
-        grid_pos = np.array(pos) * GRID_SIZE + GRID_SIZE // 2
-        for otro in otros_tractores:
-            if otro != self:
-                dist = np.linalg.norm(otro.position - grid_pos)
-                if dist < GRID_SIZE * 2:  # Margen de seguridad
-                    return True
-        return False
+    def celdas_ocupadas(self, otros_tractores):
+        # Celdas ocupadas por otros tractores (margen de seguridad de 2 celdas)
+        otras_posiciones = [otro.position for otro in otros_tractores if otro != self]
+        return celdas_bloqueadas(otras_posiciones, self.model.columnas, self.model.filas, GRID_SIZE, GRID_SIZE * 2)
 
-    def manhattan_distance(self, pos1, pos2):
-        return abs(pos1[0] - pos2[0]) + abs(pos1[1] - pos2[1])
+    def celdas_ocupadas_en_marcha(self, otros_tractores):
+        # Como celdas_ocupadas, pero los tractores sin objetivo o sin camino (que no van a
+        # moverse) solo ocupan su celda. None si no hay ninguno así
+        estacionados = [otro for otro in otros_tractores
+                        if otro is not self and (otro.objetivo_actual is None or otro.path is None)]
+        if not estacionados:
+            return None
+        columnas, filas = self.model.columnas, self.model.filas
+        return self.celdas_ocupadas([otro for otro in otros_tractores if otro not in estacionados]) + [
+            min(max(int(otro.position[1] // GRID_SIZE), 0), filas - 1) * columnas
+            + min(max(int(otro.position[0] // GRID_SIZE), 0), columnas - 1) for otro in estacionados]
+
+    def encontrar_camino(self, start_grid, goal_grid, campo, otros_tractores, bloqueadas=None):
+        rumbo = DIRECCIONES.index(self.current_direction)
+        if self.model.planificacion == 'cooperativa':
+            return self.encontrar_camino_cooperativo(start_grid, goal_grid, rumbo)
+        if bloqueadas is None:
+            bloqueadas = self.celdas_ocupadas(otros_tractores)
+        path = self._buscar_camino(start_grid, goal_grid, rumbo, bloqueadas)
+        if path is None:
+            # Los estacionados no van a moverse: basta con no pasar por su celda. Si no, dos
+            # estacionados con una parcela dentro de ambos márgenes se la pasan de uno a otro
+            # sin que ninguno llegue (o se traban todos en una esquina)
+            en_marcha = self.celdas_ocupadas_en_marcha(otros_tractores)
+            if en_marcha is not None:
+                path = self._buscar_camino(start_grid, goal_grid, rumbo, en_marcha)
+        if path is not None:
+            self.previous_direction = self.current_direction
+        return path
+
+    def _buscar_camino(self, start_grid, goal_grid, rumbo, bloqueadas):
+        incremental = self.planificador_incremental
+        if incremental is not None and incremental.dentro(start_grid):
+            # D* Lite: reutiliza la búsqueda anterior mientras la meta no cambie
+            if incremental.meta != goal_grid:
+                incremental.reiniciar(goal_grid)
+            path = incremental.replanificar(start_grid, rumbo, bloqueadas)
+        else:
+            # La heurística se reduce (x0.8) en la dirección actual para favorecer movimiento recto
+            path = self.model.planificador.buscar(start_grid, goal_grid, rumbo, bloqueadas, rumbo_preferido=rumbo)
+        return path
 
-    def reconstruir_camino(self, node):
-        path = []
-        current = node
-        while current is not None:
-            path.append(current.position)
-            current = current.parent
-        return path[::-1]  # Invertir el camino para ir desde el inicio
+    def encontrar_camino_cooperativo(self, start_grid, goal_grid, rumbo):
+        # Los otros tractores se esquivan con la tabla de reservas, no por distancia
+        cols, rows = self.model.columnas, self.model.filas
+        inicio = (min(max(start_grid[0], 0), cols - 1), min(max(start_grid[1], 0), rows - 1))
+        reservas = self.model.reservas
+        turno = self.model.turno
+        reservas.liberar(self.id)
+        # Los tractores quietos no van a moverse: bloquean su celda también más allá de la ventana
+        quietas = [celda for dueno, celda in self.model.celdas_quietas.items() if dueno != self.id]
+        path = self.model.planificador_cooperativo.buscar(self.id, inicio, goal_grid, rumbo, turno, quietas,
+                                                          rumbo_preferido=rumbo)
+        if path is not None:
+            reservas.reservar_camino(self.id, [x + y * cols for x, y in path[:VENTANA_COOPERATIVA]], turno)
+            self.turno_plan = turno
+            self.previous_direction = self.current_direction
+        return path
 
     def mover(self, destino):
         if self.combustible > 0 and not self.descargando:
@@ -181,13 +193,38 @@ class Tractor(ap.Agent):
                 int(destino[1] // GRID_SIZE)
             )
             
+            bloqueadas = None
+            if self.path and self.planificador_incremental is not None:
+                # Replanificar solo si otro tractor se cruzó en el camino restante
+                bloqueadas = self.celdas_ocupadas(self.model.tractores)
+                ocupadas = set(bloqueadas)
+                if any(celda[1] * self.model.columnas + celda[0] in ocupadas for celda in self.path):
+                    # Se sigue si solo pasa junto a estacionados y no hay otro camino (es el
+                    # que da encontrar_camino sin sus márgenes)
+                    en_marcha = set(self.celdas_ocupadas_en_marcha(self.model.tractores) or ocupadas)
+                    if (any(celda[1] * self.model.columnas + celda[0] in en_marcha for celda in self.path)
+                            or self._buscar_camino(current_grid, goal_grid, DIRECCIONES.index(self.current_direction),
+                                                   bloqueadas) is not None):
+                        self.path = []
+            if self.path and self.model.planificacion == 'cooperativa':
+                # Replanificar a mitad de la ventana para extender las reservas
+                if self.model.turno - self.turno_plan >= VENTANA_COOPERATIVA // 2:
+                    self.path = []
+                    self.espera = 0
+                elif self.espera > 0:
+                    self.espera -= 1
+                    return False
+
             if not self.path:
+                t = self.model.perfil.marca()
                 self.path = self.encontrar_camino(
                     current_grid,
                     goal_grid,
                     self.model.campo,
-                    self.model.tractores
+                    self.model.tractores,
+                    bloqueadas
                 )
+                self.model.perfil.fase('planificacion', t, tractor=self.id)
             
             if self.path:
                 next_grid = self.path[0]
@@ -195,19 +232,21 @@ class Tractor(ap.Agent):
                     next_grid[0] * GRID_SIZE + GRID_SIZE // 2,
                     next_grid[1] * GRID_SIZE + GRID_SIZE // 2
                 ])
-                
-                direccion = next_point - self.position
-                distancia = np.linalg.norm(direccion)
-                
-                if distancia > 0:
-                    direccion = (direccion / distancia) * self.speed
-                    self.position += direccion
-                    self.combustible -= 0.05 * np.linalg.norm(direccion)
-                
-                if distancia < self.speed:
-                    self.path.pop(0)
-                    if self.path:
-                        self.actualizar_direccion()
+                # El avance se aplica junto con el del resto de la flota en Flota.avanzar()
+                self.flota.solicitar_movimiento(self.id_flota, next_point)
+                return True
+        return False
+
+    def avanzar_camino(self):
+        # Tras Flota.avanzar(): si el punto de paso estaba a menos de un paso, pasar al siguiente
+        if self.flota.distancias[self.id_flota] < self.speed:
+            alcanzada = self.path.pop(0)
+            # Una celda repetida es una espera del plan cooperativo: un turno quieto por repetición
+            while self.path and self.path[0] == alcanzada:
+                self.path.pop(0)
+                self.espera += self.model.pasos_por_celda
+            if self.path:
+                self.actualizar_direccion()
 
     def actualizar_direccion(self):
         if len(self.path) >= 2:
@@ -233,9 +272,10 @@ class Tractor(ap.Agent):
     def descargar(self):
         self.descargando = True
         self.carga_actual = 0
-        self.descarga_duracion = 30
+        self.descarga_duracion = DESCARGA_DURACION
         self.contador_descarga = self.descarga_duracion
         self.contenedor.ir_al_silo_flag = True
+        self.speed = self.model.velocidad  # Por si esperó al contenedor con velocidad 0
 
     def esperar(self):
         self.speed = 0
@@ -243,109 +283,346 @@ class Tractor(ap.Agent):
     def mover_a_contenedor(self):
         # En vez de moverse hacia el contenedor, esperar a que llegue
         if np.linalg.norm(self.position - self.contenedor.position) > GRID_SIZE * 2:
+            # Si se llenó lejos del punto de encuentro, el contenedor viene a buscarlo
+            self.flota.encuentros[self.id_flota] = np.nan
             self.esperar()
         else:
             self.descargar()
 
+# Sigue al tractor o va al silo en Flota.mover_contenedores()
 class Container:
-    def __init__(self, initial_position):
-        self.position = np.array(initial_position, dtype=float)
+    def __init__(self, flota, id_flota):
+        self.flota = flota
+        self.id_flota = id_flota
+        self.position = flota.contenedores[id_flota]  # Vista sobre el arreglo de la flota
         self.color = COLOR_CONTAINER
-        self.velocidad = TRACTOR_SPEED * 1.4
-        self.ir_al_silo_flag = False
-
-    def seguir_tractor(self, tractor_pos):
-        if not self.ir_al_silo_flag:
-            direccion = tractor_pos - self.position
-            distancia = np.linalg.norm(direccion)
-            if distancia > GRID_SIZE * 2:
-                direccion = (direccion / distancia) * self.velocidad
-                self.position += direccion
-
-    def ir_al_silo(self, silo_pos):
-        if self.ir_al_silo_flag:
-            direccion = silo_pos - self.position
-            distancia = np.linalg.norm(direccion)
-            if distancia > 10:
-                direccion = (direccion / distancia) * self.velocidad
-                self.position += direccion
-            if distancia < 10:
-                self.ir_al_silo_flag = False
+
+    @property
+    def ir_al_silo_flag(self):
+        return self.flota.al_silo[self.id_flota]
+
+    @ir_al_silo_flag.setter
+    def ir_al_silo_flag(self, valor):
+        self.flota.al_silo[self.id_flota] = valor
 
 class HarvestSimulation(ap.Model):
-    
+    # Estado que guarda un punto de control (punto_control.py)
+    ESTADO_ARREGLOS = ['campo', 'flota', 'reservas_parcelas']
+    ESTADO = ['pasos', 'pasos_saltados', 'agenda', 'dormidos', 'cobertura', 'progreso.historial',
+              'reservas.ocupacion', 'reservas.por_dueno', 'celdas_quietas',
+              'reservas_parcelas.cola', 'reservas_parcelas.por_dueno']
+
     def setup(self):
-        self.campo = [[Parcel(self) for _ in range(COLS)] for _ in range(ROWS)]
+        # Enviar coordenadas a la API (desactivable para corridas en lote)
+        self.telemetria = self.p.get('telemetria', True)
+        # 'astar': A* desde cero en cada replanificación; 'incremental': D* Lite por tractor;
+        # 'cooperativa': A* espacio-tiempo con tabla de reservas compartida (WHCA*)
+        self.planificacion = self.p.get('planificacion', 'astar')
+        # 'lote': asignación conjunta de parcelas (húngaro); 'voraz': cada tractor en orden;
+        # 'cobertura': rutas en serpentina precalculadas por franjas (PlanCobertura)
+        self.asignacion = self.p.get('asignacion', 'lote')
+        # Campo y flota parametrizables (experimentos.py); por defecto, las constantes del módulo
+        self.filas = self.p.get('filas', ROWS)
+        self.columnas = self.p.get('columnas', COLS)
+        self.velocidad = self.p.get('velocidad', TRACTOR_SPEED)
+        n_tractores = self.p.get('tractores', TRACTOR_COUNT)
+        # Las decisiones usan random y np.random globales: se siembran si hay semilla
+        if 'seed' in self.p:
+            random.seed(self.p['seed'])
+            np.random.seed(self.p['seed'] % 2**32)
+        # Un turno es lo que tarda un tractor en cruzar una celda
+        self.pasos = 0
+        self.pasos_por_celda = int(-(-GRID_SIZE // self.velocidad))
+        # Observadores (p.ej. el renderizador) notificados al final de cada paso
+        self.observadores = []
+        # Tiempos por fase de step(); se puede activar y desactivar durante la corrida
+        self.perfil = Perfilador(self.p.get('perfil', False))
+        # Avance por eventos: un tractor que descarga duerme en la agenda hasta el paso
+        # en que termina, y los pasos en que solo se moverían los contenedores se saltan
+        # de una vez. Los resultados son los mismos que paso a paso
+        self.eventos = self.p.get('eventos', False)
+        self.agenda = Agenda()
+        self.dormidos = set()  # id de los tractores que duermen en la agenda
+        self.pasos_saltados = 0
+
+        self.campo = Campo(self.filas, self.columnas)
+        self.indice = IndiceParcelas(self.campo)
+        self.progreso = Progreso(self.campo)
+        # Cada reserva lleva al tractor dueño; con reserva_duracion (pasos) además vence,
+        # así la parcela de un tractor que no llega (p.ej. sin combustible) vuelve a quedar libre
+        self.reservas_parcelas = ReservasParcelas(self.campo, self.p.get('reserva_duracion'))
+        self.flota = Flota(
+            n_tractores, velocidad=self.velocidad, combustible_max=1000, carga_max=self.p.get('carga_max', 50),
+            velocidad_contenedor=self.velocidad * 1.4, distancia_seguimiento=GRID_SIZE * 2,
+            factor_combustible=0.05
+        )
+        # Planificador A* compartido; el costo de giro sale de Tractor.calcular_costo_giro
+        self.movimientos = [direction.value for direction in DIRECCIONES]
+        self.costo_giro = [[Tractor.calcular_costo_giro(a, b) for b in DIRECCIONES] for a in DIRECCIONES]
+        self.planificador = PlanificadorAEstrella(self.columnas, self.filas, self.movimientos, self.costo_giro)
+        self.reservas = TablaReservas()
+        self.celdas_quietas = {}  # id del tractor -> celda, para los que no tienen camino
+        self.planificador_cooperativo = PlanificadorCooperativo(
+            self.columnas, self.filas, self.movimientos, self.costo_giro, self.reservas, ventana=VENTANA_COOPERATIVA
+        )
         
-        espaciado_x = (WIDTH - 180) // (TRACTOR_COUNT)
+        ancho_campo = self.columnas * GRID_SIZE
+        espaciado_x = (ancho_campo + 20) // n_tractores
         posiciones_iniciales = [
-            (WIDTH - 200 - i * espaciado_x, HEIGHT - GRID_SIZE // 2) for i in range(TRACTOR_COUNT)
+            (ancho_campo - i * espaciado_x, self.filas * GRID_SIZE - GRID_SIZE // 2) for i in range(n_tractores)
         ]
         
         self.tractores = [Tractor(self, initial_position=pos, id=i) for i, pos in enumerate(posiciones_iniciales)]
         
+        self.cobertura = None
+        if self.asignacion == 'cobertura':
+            self.cobertura = PlanCobertura(self.filas, self.columnas, [int(pos[0] // GRID_SIZE) for pos in posiciones_iniciales],
+                                           self.flota.carga_max[0])
+
         # Establecer dirección inicial para cada tractor
         for tractor in self.tractores:
             tractor.current_direction = Direction.UP
             tractor.previous_direction = Direction.UP
         
+        # El silo va a la derecha del campo, bajo las gráficas si entra y si no en la esquina
         margin_top = 20
-        self.silo_position = (WIDTH - 180, margin_top + len(self.tractores) * 70 + 30)
+        self.silo_position = (ancho_campo + 20,
+                              max(min(margin_top + len(self.tractores) * 70 + 30, self.filas * GRID_SIZE - 150), 0))
+
+        # Retomar una corrida guardada: ruta del punto de control o el estado ya leído
+        if self.p.get('punto_control') is not None:
+            cargar(self, self.p['punto_control'])
+
+    def agregar_observador(self, observador):
+        self.observadores.append(observador)
     
-    def obtener_parcela_prioritaria(self, tractor):
-        min_cost = float('inf')
+    def costo_parcelas(self, tractor, tractor_pos_grid, rows, cols):
+        # Costo vectorizado de ir desde tractor_pos_grid (x, y) a las parcelas (rows, cols)
+        # Usar Manhattan distance
+        distancia = (np.abs(tractor_pos_grid[0] - cols) + np.abs(tractor_pos_grid[1] - rows)).astype(float)
+        misma_columna = cols == tractor_pos_grid[0]
+        
+        # Factor de prioridad para movimiento vertical
+        if tractor.current_direction in [Direction.UP, Direction.DOWN]:
+            distancia[misma_columna] *= 0.5  # Reducir significativamente el costo
+        
+        # Evitar cambios bruscos de dirección
+        if tractor.previous_direction:
+            if tractor.previous_direction in [Direction.UP, Direction.DOWN]:
+                distancia[~misma_columna] *= 2  # Aumentar el costo
+        return distancia
+
+    def obtener_parcela_prioritaria(self, tractor, evitar=None):
+        # evitar: celdas (fila * columnas + columna) cuyas parcelas no se eligen
         objetivo = None
         tractor_pos_grid = (
             int(tractor.position[0] // GRID_SIZE),
             int(tractor.position[1] // GRID_SIZE)
         )
         
-        for row in range(ROWS):
-            for col in range(COLS):
-                parcela = self.campo[row][col]
-                if parcela.ready_to_harvest and not parcela.reservada:
-                    # Usar Manhattan distance
-                    distancia = abs(tractor_pos_grid[0] - col) + abs(tractor_pos_grid[1] - row)
-                    
-                    # Factor de prioridad para movimiento vertical
-                    if tractor.current_direction in [Direction.UP, Direction.DOWN]:
-                        if col == tractor_pos_grid[0]:  # Misma columna
-                            distancia *= 0.5  # Reducir significativamente el costo
-                    
-                    # Evitar cambios bruscos de dirección
-                    if tractor.previous_direction:
-                        if tractor.previous_direction in [Direction.UP, Direction.DOWN]:
-                            if col != tractor_pos_grid[0]:  # Diferente columna
-                                distancia *= 2  # Aumentar el costo
-                    
-                    if distancia < min_cost:
-                        min_cost = distancia
-                        objetivo = (row, col)
+        costo = lambda rows, cols: self.costo_parcelas(tractor, tractor_pos_grid, rows, cols)
+        if evitar:
+            costo_base = costo
+            costo = lambda rows, cols: np.where(np.isin(rows * self.columnas + cols, evitar),
+                                                np.inf, costo_base(rows, cols))
+        # El factor 0.5 es el menor que aplica costo_parcelas, así el índice sabe
+        # cuándo ya no puede haber una parcela más barata en cubetas lejanas
+        mas_cercana = self.indice.mas_cercana(tractor_pos_grid[1], tractor_pos_grid[0], costo=costo,
+                                              factor_minimo=0.5)
+        if mas_cercana and np.isfinite(mas_cercana[2]):
+            objetivo = mas_cercana[:2]
         
         if objetivo:
-            self.campo[objetivo[0]][objetivo[1]].reservada = True
+            self.reservas_parcelas.reservar(tractor.id, *objetivo, self.pasos)
         return objetivo
 
+    def necesita_objetivo(self, tractor):
+        # path es None cuando no se encontró camino a la parcela: se vuelve a asignar
+        return (not tractor.descargando and tractor.carga_actual < tractor.carga_max
+                and (tractor.objetivo_actual is None or tractor.path is None
+                     or self.campo.harvested[tractor.objetivo_actual]))
+
+    def asignar_objetivos(self):
+        # Todos los tractores libres reciben parcela a la vez, minimizando el costo total
+        # con el mismo costo (Manhattan y sesgo de dirección) que obtener_parcela_prioritaria
+        libres = [tractor for tractor in self.tractores if self.necesita_objetivo(tractor)]
+        if not libres:
+            return
+        estacionados = [tractor for tractor in self.tractores if tractor.objetivo_actual is None]
+        evitar = {}
+        for i, tractor in enumerate(libres):
+            if tractor.path is None:
+                # Sin camino a su parcela (como en voraz): en esta ronda no la vuelve a tomar ni
+                # elige otra en el margen de los tractores estacionados, que no van a moverse;
+                # esas quedan para otro tractor (p.ej. el mismo estacionado)
+                evitar[i] = tractor.celdas_ocupadas(estacionados)
+                if tractor.objetivo_actual is not None:
+                    evitar[i].append(tractor.objetivo_actual[0] * self.columnas + tractor.objetivo_actual[1])
+            self.reservas_parcelas.liberar_dueno(tractor.id)  # Suelta el objetivo al que no llegó
+        posiciones = [(int(t.position[0] // GRID_SIZE), int(t.position[1] // GRID_SIZE)) for t in libres]
+
+        def costo(i, rows, cols):
+            distancia = self.costo_parcelas(libres[i], posiciones[i], rows, cols)
+            if i in evitar:
+                distancia[np.isin(rows * self.columnas + cols, evitar[i])] = np.inf
+            return distancia
+        asignadas = asignar_parcelas(self.indice, [(y, x) for x, y in posiciones], costo, factor_minimo=0.5)
+        for tractor, objetivo in zip(libres, asignadas):
+            tractor.objetivo_actual = objetivo
+            tractor.path = []  # Resetear el camino cuando hay nuevo objetivo
+            if objetivo:
+                self.reservas_parcelas.reservar(tractor.id, *objetivo, self.pasos)
+
+    def asignar_objetivos_cobertura(self):
+        # Cada tractor libre toma la siguiente celda de su ruta y su contenedor
+        # lo espera donde se llenará la tolva
+        for tractor in self.tractores:
+            if not self.necesita_objetivo(tractor):
+                continue
+            tractor.objetivo_actual = self.cobertura.siguiente(tractor.id, self.campo)
+            tractor.path = []
+            if tractor.objetivo_actual:
+                self.reservas_parcelas.reservar(tractor.id, *tractor.objetivo_actual, self.pasos)
+            encuentro = self.cobertura.punto_encuentro(tractor.id, tractor.carga_actual)
+            if encuentro is None:
+                self.flota.encuentros[tractor.id_flota] = np.nan
+            else:
+                self.flota.encuentros[tractor.id_flota] = (encuentro[1] * GRID_SIZE + GRID_SIZE // 2,
+                                                           encuentro[0] * GRID_SIZE + GRID_SIZE // 2)
+
+    def pasos_estimados(self):
+        # Pasos hasta cosechar todo según el plan de cobertura (None en los otros modos)
+        if self.cobertura is None:
+            return None
+        # Cada parcela cuesta cruzar una celda más el paso en que se cosecha y se replanifica
+        cargas = [tractor.carga_actual for tractor in self.tractores]
+        return self.cobertura.estimar_pasos(cargas, self.pasos_por_celda + 1, DESCARGA_DURACION)
+
+    @property
+    def turno(self):
+        return self.pasos // self.pasos_por_celda
+
+    def reservar_tractores_quietos(self):
+        # Los tractores sin camino ocupan su celda durante toda la ventana
+        self.celdas_quietas = {}
+        for tractor in self.tractores:
+            if not tractor.path:
+                celda = (min(max(int(tractor.position[1] // GRID_SIZE), 0), self.filas - 1) * self.columnas
+                         + min(max(int(tractor.position[0] // GRID_SIZE), 0), self.columnas - 1))
+                self.celdas_quietas[tractor.id] = celda
+                self.reservas.liberar(tractor.id)
+                self.reservas.reservar_estacionado(tractor.id, celda, self.turno, VENTANA_COOPERATIVA)
+
+    def dormir(self, tractor):
+        # Hasta que el contador llegue a 0 la descarga solo lo descontaría
+        self.dormidos.add(tractor.id)
+        self.agenda.programar(self.pasos + tractor.contador_descarga, tractor.id)
+
+    def despertar(self):
+        for i in self.agenda.vencidos(self.pasos):
+            tractor = self.tractores[i]
+            self.dormidos.discard(i)
+            tractor.contador_descarga = 1  # Este paso lo lleva a 0 y termina la descarga
+
+    def esperando_quietos(self):
+        # Si en este paso ningún tractor haría más que dormir, esperar a su contenedor
+        # o quedarse sin parcela, devuelve los id_flota de los que esperan; si no, None
+        esperando = []
+        for tractor in self.tractores:
+            if tractor.id in self.dormidos:
+                continue
+            if tractor.descargando:
+                return None
+            if tractor.carga_actual >= tractor.carga_max:
+                esperando.append(tractor.id_flota)
+            elif tractor.objetivo_actual is not None:
+                return None
+            elif self.cobertura is not None:
+                if self.cobertura.siguiente(tractor.id, self.campo) is not None:
+                    return None
+                self.flota.encuentros[tractor.id_flota] = np.nan  # Lo que haría asignar_objetivos_cobertura
+            elif self.indice.total > 0:
+                return None
+            else:
+                tractor.path = []  # Lo que haría la asignación sin parcelas disponibles
+        return np.array(esperando, dtype=int)
+
+    def saltar_pasos_quietos(self):
+        # Avanza de una vez los pasos en que solo se moverían los contenedores, hasta el
+        # próximo evento de la agenda o hasta que un contenedor llegue a quien lo espera
+        esperando = self.esperando_quietos()
+        if esperando is None:
+            return
+        flota = self.flota
+        # Los vencimientos de reservas también cortan el salto: liberan parcelas
+        proximo = min((tiempo for tiempo in (self.agenda.proximo(), self.reservas_parcelas.proximo_vencimiento())
+                       if tiempo is not None), default=None)
+        while proximo is None or self.pasos < proximo:
+            # El mismo chequeo que mover_a_contenedor() con los tractores que esperan
+            if len(esperando):
+                distancia = np.linalg.norm(flota.posiciones[esperando] - flota.contenedores[esperando], axis=1)
+                if (distancia <= GRID_SIZE * 2).any():
+                    break
+                flota.velocidades[esperando] = 0
+            cambio = flota.mover_contenedores(self.silo_position)
+            self.pasos += 1
+            self.pasos_saltados += 1
+            if not cambio:
+                # Nada cambia hasta el próximo evento: el reloj salta directo a él
+                if proximo is None:
+                    break
+                self.pasos_saltados += proximo - self.pasos
+                self.pasos = proximo
+
     def step(self):
-        self.font = pygame.font.Font(None, 24)
-        screen.fill(COLOR_EMPTY)
-        self.dibujar_campo()
-        
+        perfil = self.perfil
+        inicio = t = perfil.marca()
+        if self.eventos:
+            self.saltar_pasos_quietos()
+            self.despertar()
+            t = perfil.fase('eventos', t)
+        self.reservas_parcelas.expirar(self.pasos)
+        if self.planificacion == 'cooperativa':
+            self.reservar_tractores_quietos()
+            t = perfil.fase('reservas', t)
+        if self.asignacion == 'lote':
+            self.asignar_objetivos()
+            t = perfil.fase('asignacion', t)
+        elif self.asignacion == 'cobertura':
+            self.asignar_objetivos_cobertura()
+            t = perfil.fase('asignacion', t)
+
+        # 1. Decisiones y planificación por tractor; los avances quedan pedidos en la flota
+        hacia_parcela = []
         for idx, tractor in enumerate(self.tractores):
+            if tractor.id in self.dormidos:
+                continue
             if tractor.descargando:
                 tractor.contador_descarga -= 1
                 tractor.contenedor.color = COLOR_UNLOADING
                 if tractor.contador_descarga <= 0:
                     tractor.descargando = False
                     tractor.contenedor.color = COLOR_CONTAINER
+                elif self.eventos:
+                    self.dormir(tractor)
             else:
                 if tractor.carga_actual >= tractor.carga_max:
                     tractor.mover_a_contenedor()
                     if np.linalg.norm(tractor.position - tractor.contenedor.position) < GRID_SIZE:
                         tractor.descargar()
                 else:
-                    if tractor.objetivo_actual is None or self.campo[tractor.objetivo_actual[0]][tractor.objetivo_actual[1]].harvested:
-                        tractor.objetivo_actual = self.obtener_parcela_prioritaria(tractor)
+                    if self.asignacion == 'voraz' and self.necesita_objetivo(tractor):
+                        t_asignacion = perfil.marca()
+                        evitar = None
+                        if tractor.path is None:
+                            # Sin camino a su parcela: la suelta (como asignar_objetivos) y elige otra
+                            # fuera del margen de los tractores estacionados, que no van a moverse;
+                            # la soltada queda para otro tractor
+                            self.reservas_parcelas.liberar_dueno(tractor.id)
+                            evitar = tractor.celdas_ocupadas(
+                                [otro for otro in self.tractores if otro.objetivo_actual is None])
+                        tractor.objetivo_actual = self.obtener_parcela_prioritaria(tractor, evitar)
+                        perfil.fase('asignacion', t_asignacion, tractor=idx)
                         tractor.path = []  # Resetear el camino cuando hay nuevo objetivo
                     
                     if tractor.objetivo_actual:
@@ -353,126 +630,127 @@ class HarvestSimulation(ap.Model):
                             tractor.objetivo_actual[1] * GRID_SIZE + GRID_SIZE // 2,
                             tractor.objetivo_actual[0] * GRID_SIZE + GRID_SIZE // 2
                         ])
-                        tractor.mover(destino)
-                        
-                        if np.linalg.norm(destino - tractor.position) < tractor.speed:
-                            if tractor.cargar():
-                                rs.send_coordinates_background(tractor.id, round(tractor.position[0]), round(tractor.position[1]))
-                                self.campo[tractor.objetivo_actual[0]][tractor.objetivo_actual[1]].harvest()
-                            tractor.objetivo_actual = None
-                            tractor.path = []
-                
-            if tractor.contenedor.ir_al_silo_flag:
-                tractor.contenedor.ir_al_silo(self.silo_position)
-            else:
-                tractor.contenedor.seguir_tractor(tractor.position)
+                        avanza = tractor.mover(destino)
+                        hacia_parcela.append((tractor, destino, avanza))
+            t = perfil.fase('decisiones', t, tractor=idx)
+
+        # 2. Movimiento de toda la flota en una sola actualización
+        self.flota.avanzar()
+        t = perfil.fase('movimiento', t)
+
+        # 3. Puntos de paso alcanzados y llegadas a la parcela objetivo
+        for tractor, destino, avanza in hacia_parcela:
+            if avanza:
+                tractor.avanzar_camino()
+            if np.linalg.norm(destino - tractor.position) < tractor.speed:
+                # Con reservas que vencen, otro tractor pudo cosecharla antes
+                if self.campo.ready_to_harvest[tractor.objetivo_actual] and tractor.cargar():
+                    if self.telemetria:
+                        t_telemetria = perfil.marca()
+                        rs.send_coordinates_background(tractor.id, round(tractor.position[0]), round(tractor.position[1]))
+                        perfil.fase('telemetria', t_telemetria)
+                    self.campo.harvest(*tractor.objetivo_actual)
+                tractor.objetivo_actual = None
+                tractor.path = []
+        t = perfil.fase('llegadas', t)
+
+        # 4. Contenedores: al silo o siguiendo a su tractor
+        self.flota.mover_contenedores(self.silo_position)
+        self.pasos += 1
+        self.progreso.muestrear(self.pasos)
+        t = perfil.fase('contenedores', t)
         
-        self.dibujar_tractores()
-        self.dibujar_graficas()
-        self.dibujar_silo()
-        pygame.display.flip()
-
-    def dibujar_campo(self):
-        for row in range(ROWS):
-            for col in range(COLS):
-                x, y = col * GRID_SIZE, row * GRID_SIZE
-                parcela = self.campo[row][col]
-                color = COLOR_HARVESTED if parcela.harvested else COLOR_READY if parcela.ready_to_harvest else COLOR_EMPTY
-                pygame.draw.rect(screen, color, (x, y, GRID_SIZE, GRID_SIZE))
-    
-    def dibujar_tractores(self):
-        for idx, tractor in enumerate(self.tractores):
-            # Dibujar el camino planeado para cada tractor
-            if tractor.path:
-                for i in range(len(tractor.path) - 1):
-                    start_pos = np.array([
-                        tractor.path[i][0] * GRID_SIZE + GRID_SIZE // 2,
-                        tractor.path[i][1] * GRID_SIZE + GRID_SIZE // 2
-                    ])
-                    end_pos = np.array([
-                        tractor.path[i + 1][0] * GRID_SIZE + GRID_SIZE // 2,
-                        tractor.path[i + 1][1] * GRID_SIZE + GRID_SIZE // 2
-                    ])
-                    pygame.draw.line(screen, (0, 0, 255), start_pos, end_pos, 2)
-
-            # Dibujar el contenedor y el tractor
-            pygame.draw.circle(screen, tractor.contenedor.color, tractor.contenedor.position.astype(int), GRID_SIZE // 3)
-            pygame.draw.circle(screen, COLOR_TRACTOR, tractor.position.astype(int), GRID_SIZE // 3)
-            
-            # Dibujar la dirección actual del tractor
-            if tractor.current_direction:
-                direction_point = tractor.position + np.array(tractor.current_direction.value) * GRID_SIZE
-                pygame.draw.line(screen, (255, 0, 0), 
-                               tractor.position.astype(int),
-                               direction_point.astype(int), 2)
-            
-            # Etiqueta del tractor
-            label = self.font.render(f"Tractor {idx + 1}", True, (0, 0, 0))
-            screen.blit(label, (tractor.position[0] - 15, tractor.position[1] - 30))
-    
-    def dibujar_graficas(self):
-        bar_width = 150
-        bar_height = 20
-        margin_top = 20
-        for idx, tractor in enumerate(self.tractores):
-            # Dibujar barra de combustible
-            fuel_ratio = tractor.combustible / tractor.combustible_max
-            pygame.draw.rect(screen, COLOR_FUEL, 
-                           (WIDTH - 180, margin_top + idx * 70, 
-                            int(bar_width * fuel_ratio), bar_height))
-            pygame.draw.rect(screen, (0, 0, 0), 
-                           (WIDTH - 180, margin_top + idx * 70, 
-                            bar_width, bar_height), 2)
-
-            # Dibujar barra de carga
-            cargo_ratio = tractor.carga_actual / tractor.carga_max
-            pygame.draw.rect(screen, COLOR_CARGO, 
-                           (WIDTH - 180, margin_top + idx * 70 + 30, 
-                            int(bar_width * cargo_ratio), bar_height))
-            pygame.draw.rect(screen, (0, 0, 0), 
-                           (WIDTH - 180, margin_top + idx * 70 + 30, 
-                            bar_width, bar_height), 2)
-
-            # Etiqueta del tractor
-            text = self.font.render(f"Tractor {idx + 1}", True, (0, 0, 0))
-            screen.blit(text, (WIDTH - 180, margin_top + idx * 70 - 20))
-
-            # Mostrar dirección actual
-            if tractor.current_direction:
-                dir_text = f"Dir: {tractor.current_direction.name}"
-                dir_label = self.font.render(dir_text, True, (0, 0, 0))
-                screen.blit(dir_label, 
-                           (WIDTH - 80, margin_top + idx * 70 + 5))
-
-    def dibujar_silo(self):
-        silo_width = 150
-        silo_height = 150
-        pygame.draw.rect(screen, (105, 105, 105), 
-                        (self.silo_position[0], self.silo_position[1], 
-                         silo_width, silo_height))
-        label = self.font.render("Silo", True, (0, 0, 0))
-        label_rect = label.get_rect(
-            center=(self.silo_position[0] + silo_width // 2, 
-                   self.silo_position[1] - 20)
-        )
-        screen.blit(label, label_rect)
+        for observador in self.observadores:
+            observador.actualizar(self)
+        perfil.fase('observadores', t)
+        perfil.fase('paso', inicio)
+
+    def update(self):
+        # Model.run() termina la corrida cuando no queda nada por cosechar o cuando los pasos
+        # simulados llegan a 'steps' (con avance por eventos, t cuenta llamadas a step())
+        if self.campo.todo_cosechado() or self.pasos >= self.p.get('steps', np.nan):
+            self.stop()
+
+    def end(self):
+        # Resumen de la corrida que agrega experimentos.py (pasos_cosecha es NaN si no terminó)
+        self.report('pasos_cosecha', self.pasos if self.campo.todo_cosechado() else np.nan)
+        self.report('cosechadas', self.campo.total_cosechadas)
+        self.report('combustible_usado', float(self.flota.consumido.sum()))
+        self.report('distancia_recorrida', float(self.flota.recorrido.sum()))
 
 # Ejecutar simulación
-rs.check_connection_background(TRACTOR_COUNT)
-pygame.init()
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Simulación de Cosecha con A* y Movimiento Realista")
-
-model = HarvestSimulation()
-model.setup()
-
-running = True
-while running:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-    
-    model.step()
-    pygame.time.delay(150)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulación de cosecha con A*")
+    parser.add_argument("--headless", action="store_true", help="Simular sin ventana ni pygame")
+    parser.add_argument("--pasos", type=int, default=None, help="Número de pasos (por defecto, sin límite)")
+    parser.add_argument("--filas", type=int, default=ROWS, help="Filas del campo (independiente de la ventana)")
+    parser.add_argument("--columnas", type=int, default=COLS, help="Columnas del campo")
+    parser.add_argument("--tractores", type=int, default=TRACTOR_COUNT, help="Cantidad de tractores")
+    parser.add_argument("--sin-telemetria", action="store_true", help="No enviar coordenadas a la API")
+    parser.add_argument("--planificacion", choices=["astar", "incremental", "cooperativa"], default="astar",
+                        help="A* desde cero, D* Lite incremental por tractor o A* cooperativo con reservas")
+    parser.add_argument("--asignacion", choices=["lote", "voraz", "cobertura"], default="lote",
+                        help="Asignar parcelas a todos los tractores libres a la vez, uno por uno "
+                             "o con rutas de cobertura precalculadas")
+    parser.add_argument("--velocidad", type=float, default=1.0,
+                        help="Multiplicador de pasos por segundo en pantalla (0: sin límite)")
+    parser.add_argument("--fps", type=int, default=30, help="Cuadros por segundo máximos")
+    parser.add_argument("--render-proceso", action="store_true",
+                        help="Dibujar en otro proceso sin frenar la simulación")
+    parser.add_argument("--perfil", action="store_true", help="Medir el tiempo de cada fase del paso")
+    parser.add_argument("--eventos", action="store_true",
+                        help="Saltar los pasos en que los tractores solo descargan o esperan")
+    parser.add_argument("--reserva-duracion", type=int,
+                        help="Pasos tras los que vence la reserva de una parcela (por defecto, no vence)")
+    parser.add_argument("--retomar", help="Punto de control desde el que seguir (con su campo y tractores)")
+    parser.add_argument("--guardar", help="Punto de control a escribir al terminar")
+    parser.add_argument("--guardar-cada", type=int, help="Escribir también el punto de control cada N pasos")
+    parser.add_argument("--registro", help="Directorio donde registrar las métricas de cada paso (registro.py)")
+    args = parser.parse_args()
+
+    if not args.sin_telemetria:
+        rs.check_connection_background(args.tractores)
+
+    parametros = {'planificacion': args.planificacion, 'asignacion': args.asignacion,
+                  'filas': args.filas, 'columnas': args.columnas, 'tractores': args.tractores,
+                  'reserva_duracion': args.reserva_duracion}
+    if args.retomar:
+        guardado = leer(args.retomar)
+        parametros = dict(guardado['parametros'], punto_control=guardado)
+    model = HarvestSimulation(dict(parametros, telemetria=not args.sin_telemetria, perfil=args.perfil,
+                                   eventos=args.eventos))
+    model.setup()
+    if args.guardar and args.guardar_cada:
+        model.agregar_observador(GuardadoPeriodico(args.guardar, args.guardar_cada))
+    registro = None
+    if args.registro:
+        registro = Registrador(args.registro, model)
+        model.agregar_observador(registro)
+    if model.cobertura is not None:
+        print(f"Pasos estimados para cosechar todo el campo: {model.pasos_estimados()}")
+
+    renderizador = None
+    if args.headless:
+        ejecutar(model, pasos=args.pasos)
+    elif args.render_proceso:
+        # Cada cuadro del bucle publica una instantánea; el otro proceso la dibuja
+        from render_proceso import RenderizadorEnProceso
+        renderizador = RenderizadorEnProceso("Simulación de Cosecha con A* y Movimiento Realista",
+                                             WIDTH, HEIGHT, GRID_SIZE, model, fps_max=args.fps)
+        ejecutar(model, renderizador, args.pasos, PASOS_POR_SEGUNDO, args.velocidad, args.fps)
+    else:
+        from renderizado import RenderizadorPygame
+        renderizador = RenderizadorPygame("Simulación de Cosecha con A* y Movimiento Realista",
+                                          WIDTH, HEIGHT, GRID_SIZE)
+        ejecutar(model, renderizador, args.pasos, PASOS_POR_SEGUNDO, args.velocidad, args.fps)
 
-pygame.quit()
\ No newline at end of file
+    if renderizador:
+        renderizador.cerrar()
+    if registro:
+        registro.cerrar()
+    if args.guardar:
+        guardar(model, args.guardar)
+    if args.eventos:
+        print(f"Pasos simulados: {model.pasos} ({model.pasos_saltados} saltados por eventos)")
+    if args.perfil:
+        print(model.perfil.informe())
@@ -0,0 +1,512 @@
+import os
+import sys
+import time
+import argparse
+import queue
+import multiprocessing as mp
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from etapa2 import ROWS, COLS, GRID_SIZE, TRACTOR_COUNT, TRACTOR_SPEED, DIRECTORIO_Q
+from tabla_q import TablaQ, NIVELES_CARGA, NIVELES_COMBUSTIBLE, NOMBRE_COMPARTIDA
+from almacen_q import AlmacenQ, EscritorQ
+
+# Entrenamiento sin ventana de las Q-tables de etapa2 con muchos campos a la vez.
+# Cada entorno es un campo independiente con sus tractores sobre la rejilla y un paso
+# es una decisión por tractor: ir a la celda vecina y cosecharla (en etapa2 eso toma
+# GRID_SIZE / TRACTOR_SPEED pasos de simulación). Todos los entornos avanzan juntos
+# con operaciones de NumPy sobre arreglos (entorno, tractor): la elección
+# epsilon-greedy, la recompensa (reglas de Tractor.recompensa) y la actualización de
+# la Q-table (reglas de Tractor.actualizar_q_valor). Las Q-tables son las de etapa2
+# (TablaQ), una por tractor (q_table_tractor_{id}) en cada versión de su AlmacenQ, así que
+# lo entrenado aquí se usa tal cual en la simulación con la misma discretización y tipo
+# de valores. Cada versión guarda los episodios y epsilon: al cargarla el decaimiento
+# de epsilon sigue donde quedó.
+#
+#   python entrenamiento.py --entornos 256 --episodios 5000
+#   python entrenamiento.py --modo evaluar --episodios 200
+
+ALPHA = 0.5  # Los de Tractor.setup
+GAMMA = 0.75
+EPSILON_INICIAL = 1.0
+EPSILON_FINAL = 0.05  # El de usar una Q-table entrenada
+EPISODIOS_DECAIMIENTO = 1000  # Episodios en que epsilon baja linealmente de EPSILON_INICIAL a EPSILON_FINAL
+EPSILON_EVALUACION = 0.05
+COMBUSTIBLE_MAX = 1000
+COMBUSTIBLE_POR_CELDA = 0.13 * GRID_SIZE  # factor_combustible de la flota de etapa2 por celda recorrida
+PASOS_DESCARGA = -(-30 * TRACTOR_SPEED // GRID_SIZE)  # Los 30 pasos de Tractor.descargar, en decisiones
+PASOS_QUIETO = 20  # Decisiones sin moverse antes de ir a la parcela más cercana
+MAX_PASOS_EPISODIO = 5000
+ESPERA_TRABAJADORES = 1.0  # Segundos entre revisiones de los procesos de correr_en_procesos mientras no terminan
+# Acciones de Tractor.seleccionar_accion: arriba, abajo, izquierda, derecha
+DFILA = np.array([-1, 1, 0, 0])
+DCOL = np.array([0, 0, -1, 1])
+
+
+# Campos independientes que avanzan juntos; el estado de los tractores va en arreglos
+# (entorno, tractor). Un entorno que termina (todo cosechado o max_pasos) se reinicia
+class EntornosCosecha:
+    def __init__(self, n, filas=ROWS, columnas=COLS, tractores=TRACTOR_COUNT, carga_max=50,
+                 max_pasos=MAX_PASOS_EPISODIO):
+        self.n = n
+        self.filas = filas
+        self.columnas = columnas
+        self.tractores = tractores
+        self.carga_max = carga_max
+        self.max_pasos = max_pasos
+        # Los tractores salen de la última fila, en las columnas de salida de etapa2
+        ancho_campo = columnas * GRID_SIZE
+        espaciado_x = (ancho_campo + 20) // tractores
+        self.columna_inicial = np.clip((ancho_campo - np.arange(tractores) * espaciado_x) // GRID_SIZE,
+                                       0, columnas - 1)
+        self.e = np.arange(n)[:, None]  # Índice de entorno para indexar arreglos (entorno, tractor)
+
+        self.listas_campo = np.ones((n, filas, columnas), dtype=bool)
+        self.listas = np.zeros(n, dtype=np.int64)  # Parcelas por cosechar de cada entorno
+        forma = (n, tractores)
+        self.fila = np.zeros(forma, dtype=np.int64)
+        self.col = np.zeros(forma, dtype=np.int64)
+        self.carga = np.zeros(forma, dtype=np.int64)
+        self.combustible = np.zeros(forma)
+        self.descarga = np.zeros(forma, dtype=np.int64)  # Decisiones que faltan para terminar de descargar
+        self.quieto = np.zeros(forma, dtype=np.int64)  # Decisiones seguidas sin moverse
+        self.direccion = np.full(forma, -1, dtype=np.int64)  # Acción del último movimiento (-1: ninguno)
+        self.direccion_anterior = np.full(forma, -1, dtype=np.int64)
+        self.cosecho = np.zeros(forma, dtype=bool)  # Cosechó desde su última decisión
+        self.pasos = np.zeros(n, dtype=np.int64)
+        self.retorno = np.zeros(n)  # Suma de recompensas del episodio en curso
+        self.reiniciar(np.ones(n, dtype=bool))
+
+    def reiniciar(self, entornos):
+        self.listas_campo[entornos] = True
+        self.listas[entornos] = self.filas * self.columnas
+        self.fila[entornos] = self.filas - 1
+        self.col[entornos] = self.columna_inicial
+        self.carga[entornos] = 0
+        self.combustible[entornos] = COMBUSTIBLE_MAX
+        self.descarga[entornos] = 0
+        self.quieto[entornos] = 0
+        self.direccion[entornos] = -1
+        self.direccion_anterior[entornos] = -1
+        self.cosecho[entornos] = False
+        self.pasos[entornos] = 0
+        self.retorno[entornos] = 0
+
+    def paso(self, acciones):
+        # Aplica una acción por tractor. Devuelve la máscara de los tractores que
+        # decidieron (los que descargan o recargan no), la celda desde la que
+        # decidieron y la recompensa de cada uno
+        e = self.e
+        activos = self.descarga == 0
+        self.descarga[~activos] -= 1
+        # Sin combustible: el contenedor lo recarga y en este paso no decide
+        sin_combustible = activos & (self.combustible <= 0)
+        self.combustible[sin_combustible] = COMBUSTIBLE_MAX
+        # Lleno: descarga como en Tractor.descargar
+        lleno = activos & ~sin_combustible & (self.carga >= self.carga_max)
+        self.carga[lleno] = 0
+        self.descarga[lleno] = PASOS_DESCARGA
+        activos &= ~(sin_combustible | lleno)
+
+        fila, col = self.fila.copy(), self.col.copy()
+        destino_fila = np.clip(fila + DFILA[acciones], 0, self.filas - 1)
+        destino_col = np.clip(col + DCOL[acciones], 0, self.columnas - 1)
+        # Objetivo solo si la celda está lista y no la reservó antes otro tractor del
+        # mismo campo (en etapa2 deciden en orden de id)
+        objetivo = activos & self.listas_campo[e, destino_fila, destino_col]
+        for k in range(1, self.tractores):
+            tomada = (objetivo[:, :k] & (destino_fila[:, :k] == destino_fila[:, k:k + 1])
+                      & (destino_col[:, :k] == destino_col[:, k:k + 1])).any(axis=1)
+            objetivo[:, k] &= ~tomada
+
+        # Recompensa con las reglas de Tractor.recompensa, en la celda desde la que decide
+        misma_celda = (fila[:, :, None] == fila[:, None, :]) & (col[:, :, None] == col[:, None, :])
+        colision = misma_celda.sum(axis=2) > 1
+        distancia = np.hypot(fila - destino_fila, col - destino_col)
+        recompensa = (0.5 * self.cosecho
+                      + 2.0 * ((self.direccion >= 0) & (self.direccion == self.direccion_anterior))
+                      - 5.0 * (self.quieto >= PASOS_QUIETO)
+                      - 3.0 * ~self.listas_campo[e, fila, col]
+                      - 3.0 * colision
+                      + np.where(objetivo, 2.0 / (distancia + 1), 0.0))
+        recompensa[~activos] = 0
+        self.cosecho[activos] = False
+
+        # Tras PASOS_QUIETO decisiones sin moverse va a la parcela lista más cercana
+        # (Tractor.forzar_mover_a_parcela_mas_cercana) en lugar de seguir la acción
+        atascados = activos & (self.quieto >= PASOS_QUIETO)
+        objetivo &= ~atascados
+
+        movio = objetivo & ((destino_fila != fila) | (destino_col != col))
+        self.fila[objetivo] = destino_fila[objetivo]
+        self.col[objetivo] = destino_col[objetivo]
+        self.combustible[movio] -= COMBUSTIBLE_POR_CELDA
+        entornos = np.broadcast_to(e, objetivo.shape)[objetivo]
+        self.listas_campo[entornos, destino_fila[objetivo], destino_col[objetivo]] = False
+        self.listas -= objetivo.sum(axis=1)
+        self.carga[objetivo] += 1
+        self.cosecho[objetivo] = True
+        self.direccion_anterior[movio] = self.direccion[movio]
+        self.direccion[movio] = acciones[movio]
+        self.quieto[activos & ~movio] += 1
+        self.quieto[movio] = 0
+        for i, k in zip(*np.nonzero(atascados)):
+            self.forzar(i, k)
+
+        self.pasos += 1
+        self.retorno += recompensa.sum(axis=1)
+        return activos, fila, col, recompensa
+
+    def forzar(self, i, k):
+        self.quieto[i, k] = 0
+        filas, cols = np.nonzero(self.listas_campo[i])
+        if not len(filas):
+            return
+        # La más cercana; en empate, la primera en orden de filas como IndiceParcelas
+        distancias = np.hypot(filas - self.fila[i, k], cols - self.col[i, k])
+        n = np.argmin(distancias)
+        self.fila[i, k], self.col[i, k] = filas[n], cols[n]
+        self.combustible[i, k] -= COMBUSTIBLE_POR_CELDA * distancias[n]
+        if self.carga[i, k] < self.carga_max:
+            self.listas_campo[i, filas[n], cols[n]] = False
+            self.listas[i] -= 1
+            self.carga[i, k] += 1
+            self.cosecho[i, k] = True
+
+    def terminados(self):
+        # Entornos que terminaron su episodio en el último paso
+        return (self.listas == 0) | (self.pasos >= self.max_pasos)
+
+
+# Elige las acciones, actualiza las Q-tables y lleva la cuenta de episodios y epsilon.
+# modo 'entrenar': epsilon decae por episodios y se aprende; 'evaluar': epsilon fijo
+# (EPSILON_EVALUACION) y las Q-tables no cambian. Con compartida todos los tractores
+# usan una sola Q-table (NOMBRE_COMPARTIDA); con memoria_compartida las tablas viven
+# en memoria compartida y correr_en_procesos() reparte los episodios entre procesos
+# que aprenden sobre ellas a la vez (ver la consistencia en tabla_q.py)
+class Entrenador:
+    def __init__(self, entornos, modo='entrenar', alpha=ALPHA, gamma=GAMMA, epsilon_inicial=EPSILON_INICIAL,
+                 epsilon_final=EPSILON_FINAL, episodios_decaimiento=EPISODIOS_DECAIMIENTO,
+                 epsilon_evaluacion=EPSILON_EVALUACION, semilla=None, niveles_carga=NIVELES_CARGA,
+                 niveles_combustible=NIVELES_COMBUSTIBLE, dtype='float32', mapear=False, compartida=False,
+                 memoria_compartida=False, tablas=None, almacen=None, guardar_cada=None):
+        self.entornos = entornos
+        self.modo = modo
+        self.alpha = alpha
+        self.gamma = gamma
+        self.epsilon_inicial = epsilon_inicial
+        self.epsilon_final = epsilon_final
+        self.episodios_decaimiento = episodios_decaimiento
+        self.epsilon_evaluacion = epsilon_evaluacion
+        self.semilla = semilla
+        self.rng = np.random.default_rng(semilla)
+        self.forma = (entornos.filas, entornos.columnas, entornos.carga_max, COMBUSTIBLE_MAX,
+                      niveles_carga, niveles_combustible, dtype)
+        self.mapear = mapear
+        self.compartida = compartida
+        # Una Q-table por tractor como Tractor.q_table, o una sola; tablas recibe las ya
+        # creadas (p.ej. las que un proceso de correr_en_procesos une a la memoria compartida)
+        if tablas is None:
+            crear = TablaQ.crear_compartida if memoria_compartida else TablaQ
+            tablas = [crear(*self.forma) for _ in range(1 if compartida else entornos.tractores)]
+        self.tablas = tablas
+        self.episodios = 0
+        self.transiciones = 0
+        # Versiones de las Q-tables; con guardar_cada, correr() guarda una cada tantos
+        # episodios en segundo plano
+        self.almacen = almacen
+        self.guardar_cada = guardar_cada
+        self.escritor = EscritorQ(almacen) if almacen is not None and guardar_cada else None
+
+    def epsilon(self):
+        if self.modo == 'evaluar':
+            return self.epsilon_evaluacion
+        avance = min(self.episodios / self.episodios_decaimiento, 1.0) if self.episodios_decaimiento else 1.0
+        return self.epsilon_inicial + (self.epsilon_final - self.epsilon_inicial) * avance
+
+    def grupos(self):
+        # (tabla, tractores que la usan) con los tractores como slice de las columnas (entorno, tractor)
+        if self.compartida:
+            return [(self.tablas[0], slice(None))]
+        return [(tabla, slice(k, k + 1)) for k, tabla in enumerate(self.tablas)]
+
+    def nombre(self, k):
+        return NOMBRE_COMPARTIDA if self.compartida else f"q_table_tractor_{k}"
+
+    def estados(self):
+        # Estado de cada tractor: tupla de índices (entorno, tractor); todas las tablas
+        # tienen la misma discretización
+        entornos = self.entornos
+        return self.tablas[0].estado(entornos.fila, entornos.col, entornos.carga, entornos.combustible)
+
+    def elegir(self, estados, epsilon):
+        forma = (self.entornos.n, self.entornos.tractores)
+        aleatorias = self.rng.integers(0, 4, forma)
+        explorar = self.rng.random(forma) < epsilon
+        codiciosas = np.empty(forma, dtype=np.int64)
+        for tabla, tractores in self.grupos():
+            codiciosas[:, tractores] = tabla.accion_codiciosa(tuple(indice[:, tractores] for indice in estados))
+        return np.where(explorar, aleatorias, codiciosas)
+
+    def actualizar(self, estados, acciones, activos, recompensa):
+        # Regla de Tractor.actualizar_q_valor con el estado al que llegó cada tractor; las
+        # transiciones del lote que tocan el mismo par (estado, acción) se promedian
+        # (TablaQ.actualizar_lote), también las de distintos tractores en una tabla compartida
+        siguientes = self.estados()
+        for tabla, tractores in self.grupos():
+            decidieron = activos[:, tractores]
+            if not decidieron.any():
+                continue
+            tabla.actualizar_lote(tuple(indice[:, tractores][decidieron] for indice in estados),
+                                  acciones[:, tractores][decidieron], recompensa[:, tractores][decidieron],
+                                  tuple(indice[:, tractores][decidieron] for indice in siguientes),
+                                  self.alpha, self.gamma)
+
+    def correr(self, episodios, informar_cada=None):
+        # Avanza hasta completar 'episodios' episodios más y devuelve el resumen
+        entornos = self.entornos
+        objetivo = self.episodios + episodios
+        retornos, pasos, completos = [], [], 0
+        transiciones_inicio = self.transiciones
+        t0 = time.perf_counter()
+        while self.episodios < objetivo:
+            epsilon = self.epsilon()
+            estados = self.estados()
+            acciones = self.elegir(estados, epsilon)
+            activos, fila, col, recompensa = entornos.paso(acciones)
+            if self.modo == 'entrenar':
+                self.actualizar(estados, acciones, activos, recompensa)
+            self.transiciones += int(activos.sum())
+
+            terminados = entornos.terminados()
+            if terminados.any():
+                retornos.extend(entornos.retorno[terminados])
+                pasos.extend(entornos.pasos[terminados])
+                completos += int((entornos.listas[terminados] == 0).sum())
+                anteriores = self.episodios
+                self.episodios += int(terminados.sum())
+                entornos.reiniciar(terminados)
+                if informar_cada and self.episodios // informar_cada > anteriores // informar_cada:
+                    print(f"episodio {self.episodios}: epsilon {epsilon:.3f}, "
+                          f"retorno medio {np.mean(retornos[-informar_cada:]):.1f}, "
+                          f"pasos medios {np.mean(pasos[-informar_cada:]):.0f}")
+                if (self.escritor is not None and self.modo == 'entrenar'
+                        and self.episodios // self.guardar_cada > anteriores // self.guardar_cada):
+                    self.guardar(fondo=True)
+        segundos = time.perf_counter() - t0
+        transiciones = self.transiciones - transiciones_inicio
+        return {
+            'modo': self.modo,
+            'procesos': 1,
+            'episodios': len(retornos),
+            'transiciones': transiciones,
+            'segundos': round(segundos, 3),
+            'transiciones_por_segundo': round(transiciones / segundos) if segundos > 0 else None,
+            'retorno_medio': _media(retornos),
+            'pasos_medios': _media(pasos),
+            'completos': completos / len(retornos) if retornos else None,
+            'epsilon': self.epsilon(),
+        }
+
+    def correr_en_procesos(self, procesos, episodios, informar_cada=None):
+        # Reparte 'episodios' entre 'procesos' procesos, cada uno con sus propios entornos
+        # (tantos como los de este entrenador) y las Q-tables compartidas. epsilon decae en
+        # cada proceso con sus episodios, en episodios_decaimiento / procesos
+        if any(tabla.memoria is None for tabla in self.tablas):
+            raise ValueError("correr_en_procesos necesita las Q-tables en memoria compartida (memoria_compartida=True)")
+        entornos = self.entornos
+        argumentos_entornos = {'n': entornos.n, 'filas': entornos.filas, 'columnas': entornos.columnas,
+                               'tractores': entornos.tractores, 'carga_max': entornos.carga_max,
+                               'max_pasos': entornos.max_pasos}
+        filas, columnas, carga_max, combustible_max, niveles_carga, niveles_combustible, dtype = self.forma
+        argumentos = {'modo': self.modo, 'alpha': self.alpha, 'gamma': self.gamma,
+                      'epsilon_inicial': self.epsilon_inicial, 'epsilon_final': self.epsilon_final,
+                      'episodios_decaimiento': -(-self.episodios_decaimiento // procesos),
+                      'epsilon_evaluacion': self.epsilon_evaluacion, 'niveles_carga': niveles_carga,
+                      'niveles_combustible': niveles_combustible, 'dtype': dtype, 'compartida': self.compartida}
+        descriptores = [tabla.descriptor() for tabla in self.tablas]
+        # 'spawn': los procesos no heredan hilos del padre (el de EscritorQ) a medio usar como con fork;
+        # las tablas compartidas las guarda solo este entrenador
+        contexto = mp.get_context("spawn")
+        resultados = contexto.Queue()
+        trabajadores = []
+        t0 = time.perf_counter()
+        for i in range(procesos):
+            semilla = None if self.semilla is None else self.semilla + 1 + i
+            parte = episodios // procesos + (i < episodios % procesos)
+            trabajador = contexto.Process(target=_trabajador, args=(
+                i, descriptores, argumentos_entornos, dict(argumentos, semilla=semilla), self.episodios // procesos,
+                parte, informar_cada if i == 0 else None, resultados))
+            trabajador.start()
+            trabajadores.append(trabajador)
+        resumenes = []
+        try:
+            while len(resumenes) < procesos:
+                try:
+                    resumenes.append(resultados.get(timeout=ESPERA_TRABAJADORES))
+                except queue.Empty:
+                    # Uno que murió antes de mandar su resumen (excepción, falta de memoria) no lo va a mandar
+                    if any(trabajador.exitcode not in (None, 0) for trabajador in trabajadores):
+                        raise RuntimeError("Un proceso de entrenamiento terminó con error")
+        finally:
+            for trabajador in trabajadores:
+                if len(resumenes) < procesos:
+                    trabajador.terminate()  # Si uno falló, los demás no se esperan
+                trabajador.join()
+        segundos = time.perf_counter() - t0
+        if any(trabajador.exitcode != 0 for trabajador in trabajadores):
+            raise RuntimeError("Un proceso de entrenamiento terminó con error")
+
+        resumenes = [resumen for _, resumen in sorted(resumenes, key=lambda par: par[0])]
+        total = sum(resumen['episodios'] for resumen in resumenes)
+        transiciones = sum(resumen['transiciones'] for resumen in resumenes)
+        self.episodios += total
+        self.transiciones += transiciones
+        # Promedios pesados por episodios; los procesos sin episodios terminados no cuentan
+        con_episodios = [resumen for resumen in resumenes if resumen['episodios']]
+        promedio = lambda clave: (sum(resumen[clave] * resumen['episodios'] for resumen in con_episodios) / total
+                                  if total else None)
+        return {
+            'modo': self.modo,
+            'procesos': procesos,
+            'episodios': total,
+            'transiciones': transiciones,
+            'segundos': round(segundos, 3),
+            'transiciones_por_segundo': round(transiciones / segundos) if segundos > 0 else None,
+            'retorno_medio': promedio('retorno_medio'),
+            'pasos_medios': promedio('pasos_medios'),
+            'completos': promedio('completos'),
+            'epsilon': resumenes[0]['epsilon'],
+        }
+
+    def cargar(self):
+        # La última versión buena con todas las Q-tables para este campo y discretización, y
+        # los episodios que lleva. Mapeadas (copia al escribir) reemplazan a las tablas de
+        # este entrenador; si no, los valores se copian a ellas
+        nombres = [self.nombre(k) for k in range(len(self.tablas))]
+        q_tables, metadatos = self.almacen.cargar(nombres, *self.forma, mapear=self.mapear)
+        if metadatos is None:
+            if self.almacen.existe(nombres):
+                print("Las Q-tables guardadas no corresponden a este campo o discretización, comenzando con nuevas")
+            else:
+                print("No se encontraron Q-tables, comenzando con nuevas")
+            return
+        for k, nombre in enumerate(nombres):
+            if nombre not in q_tables:
+                continue
+            if self.mapear:
+                self.tablas[k] = q_tables[nombre]
+            else:
+                self.tablas[k].valores[...] = q_tables[nombre].valores
+        self.episodios = metadatos.get('episodios', 0)
+        print(f"Q-tables cargadas: {', '.join(q_tables)} versión {metadatos.get('version', '(archivos únicos)')}, "
+              f"{self.episodios} episodios")
+
+    def guardar(self, fondo=False):
+        # Una versión nueva con todas las tablas. En segundo plano la escribe el escritor; si
+        # no, se espera a que termine lo pendiente (en orden) y se escribe directo, sin copias
+        metadatos = {'episodios': self.episodios, 'epsilon': self.epsilon(), 'alpha': self.alpha,
+                     'gamma': self.gamma, 'transiciones': self.transiciones, 'modo': self.modo}
+        tablas = {self.nombre(k): tabla for k, tabla in enumerate(self.tablas)}
+        if fondo:
+            self.escritor.pedir(tablas, metadatos)
+            return
+        if self.escritor is not None:
+            self.escritor.esperar()
+        self.almacen.guardar(tablas, metadatos)
+        print(f"Q-tables guardadas en {self.almacen.directorio} ({self.episodios} episodios)")
+
+    def nbytes(self):
+        return sum(tabla.nbytes() for tabla in self.tablas)
+
+    def liberar(self):
+        # Termina los guardados pendientes y borra la memoria compartida de las tablas
+        # (solo el entrenador que las creó)
+        if self.escritor is not None:
+            self.escritor.cerrar()
+        for tabla in self.tablas:
+            tabla.liberar()
+
+
+def _media(valores):
+    # None si todavía no terminó ningún episodio
+    return float(np.mean(valores)) if len(valores) else None
+
+
+def _trabajador(i, descriptores, argumentos_entornos, argumentos, inicio, episodios, informar_cada, resultados):
+    # Proceso de correr_en_procesos: entornos propios sobre las Q-tables compartidas;
+    # inicio es su parte de los episodios ya entrenados (para seguir con su epsilon)
+    tablas = [TablaQ.unirse(descriptor) for descriptor in descriptores]
+    entrenador = Entrenador(EntornosCosecha(**argumentos_entornos), tablas=tablas, **argumentos)
+    entrenador.episodios = inicio
+    resultados.put((i, entrenador.correr(episodios, informar_cada)))
+    for tabla in tablas:
+        tabla.cerrar()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Entrenamiento vectorizado de las Q-tables de etapa2")
+    parser.add_argument("--modo", choices=["entrenar", "evaluar"], default="entrenar")
+    parser.add_argument("--entornos", type=int, default=256, help="Campos que avanzan juntos (en cada proceso)")
+    parser.add_argument("--episodios", type=int, default=1000, help="Episodios a completar")
+    parser.add_argument("--procesos", type=int, default=1,
+                        help="Procesos que aprenden a la vez sobre Q-tables en memoria compartida")
+    parser.add_argument("--filas", type=int, default=ROWS, help="Filas del campo")
+    parser.add_argument("--columnas", type=int, default=COLS, help="Columnas del campo")
+    parser.add_argument("--tractores", type=int, default=TRACTOR_COUNT, help="Tractores por campo")
+    parser.add_argument("--carga-max", type=int, default=50, help="Parcelas que carga un tractor antes de descargar")
+    parser.add_argument("--max-pasos", type=int, default=MAX_PASOS_EPISODIO, help="Decisiones máximas por episodio")
+    parser.add_argument("--epsilon-inicial", type=float, default=EPSILON_INICIAL)
+    parser.add_argument("--epsilon-final", type=float, default=EPSILON_FINAL)
+    parser.add_argument("--episodios-decaimiento", type=int, default=EPISODIOS_DECAIMIENTO,
+                        help="Episodios en que epsilon baja de --epsilon-inicial a --epsilon-final")
+    parser.add_argument("--epsilon-evaluacion", type=float, default=EPSILON_EVALUACION)
+    parser.add_argument("--alpha", type=float, default=ALPHA, help="Tasa de aprendizaje")
+    parser.add_argument("--gamma", type=float, default=GAMMA, help="Factor de descuento")
+    parser.add_argument("--semilla", type=int, default=None)
+    parser.add_argument("--niveles-carga", type=int, default=NIVELES_CARGA, help="Tramos de carga en el estado")
+    parser.add_argument("--niveles-combustible", type=int, default=NIVELES_COMBUSTIBLE,
+                        help="Tramos de combustible en el estado")
+    parser.add_argument("--q-dtype", choices=["float32", "float16", "float64"], default="float32",
+                        help="Tipo de los valores de las Q-tables")
+    parser.add_argument("--q-mapeada", action="store_true",
+                        help="Mapear las Q-tables desde sus archivos (np.memmap) en vez de leerlas enteras")
+    parser.add_argument("--q-compartida", action="store_true",
+                        help=f"Una sola Q-table para todos los tractores ({NOMBRE_COMPARTIDA})")
+    parser.add_argument("--directorio", default=DIRECTORIO_Q,
+                        help="Dónde leer y escribir las versiones de las Q-tables (por defecto, las de etapa2)")
+    parser.add_argument("--nuevas", action="store_true", help="Empezar con Q-tables en cero aunque existan")
+    parser.add_argument("--no-guardar", action="store_true", help="No escribir las Q-tables")
+    parser.add_argument("--guardar-cada", type=int,
+                        help="Guardar también una versión cada N episodios, en segundo plano (sin --procesos)")
+    parser.add_argument("--informar-cada", type=int, default=100, help="Episodios entre líneas de progreso")
+    args = parser.parse_args()
+    if args.procesos > 1 and args.q_mapeada:
+        parser.error("--procesos y --q-mapeada no se combinan: con varios procesos las tablas van en memoria compartida")
+
+    entornos = EntornosCosecha(args.entornos, args.filas, args.columnas, args.tractores, args.carga_max, args.max_pasos)
+    entrenador = Entrenador(entornos, args.modo, args.alpha, args.gamma, args.epsilon_inicial, args.epsilon_final,
+                            args.episodios_decaimiento, args.epsilon_evaluacion, args.semilla,
+                            args.niveles_carga, args.niveles_combustible, args.q_dtype, args.q_mapeada,
+                            args.q_compartida, memoria_compartida=args.procesos > 1,
+                            almacen=AlmacenQ(args.directorio),
+                            guardar_cada=(args.guardar_cada if args.modo == 'entrenar' and args.procesos == 1
+                                          and not args.no_guardar else None))
+    try:
+        if not args.nuevas:
+            entrenador.cargar()
+        if args.procesos > 1:
+            resumen = entrenador.correr_en_procesos(args.procesos, args.episodios, args.informar_cada)
+        else:
+            resumen = entrenador.correr(args.episodios, args.informar_cada)
+        print(f"{resumen['episodios']} episodios, {resumen['transiciones']} transiciones en {resumen['segundos']} s "
+              f"({resumen['transiciones_por_segundo']} por segundo, {resumen['procesos']} procesos)", end="")
+        if resumen['episodios']:
+            print(f"; retorno medio {resumen['retorno_medio']:.1f}, pasos medios {resumen['pasos_medios']:.0f}, "
+                  f"campos completos {resumen['completos']:.0%}")
+        else:
+            print()
+        if args.modo == 'entrenar' and not args.no_guardar:
+            entrenador.guardar()
+    finally:
+        entrenador.liberar()
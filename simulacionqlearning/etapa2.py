@@ -1,10 +1,25 @@
 import os
-import pygame
+import sys
+import argparse
 import numpy as np
 import random
 import agentpy as ap
 import requests_simulador as rs
 
+# Permite importar los módulos compartidos de la raíz del repositorio
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from campo import Campo
+from reservas import ReservasParcelas
+from progreso import Progreso
+from indice_parcelas import IndiceParcelas
+from flota import Flota
+from bucle import ejecutar
+from perfil import Perfilador
+from punto_control import cargar, leer, guardar, GuardadoPeriodico
+from registro import Registrador
+from tabla_q import TablaQ, NIVELES_CARGA, NIVELES_COMBUSTIBLE, NOMBRE_COMPARTIDA
+from almacen_q import AlmacenQ, EscritorQ
+
 # Configuración inicial
 WIDTH, HEIGHT = 800, 600  # Ampliamos el ancho para dejar espacio a las gráficas
 GRID_SIZE = 20
@@ -12,61 +27,46 @@ ROWS, COLS = HEIGHT // GRID_SIZE, (WIDTH - 200) // GRID_SIZE  # Ajustamos las co
 print(ROWS, COLS)
 TRACTOR_COUNT = 4
 TRACTOR_SPEED = 5
+# Versiones de las Q-tables junto a este archivo, no en el directorio de trabajo
+DIRECTORIO_Q = os.path.dirname(os.path.abspath(__file__))
 
-# Colores
-COLOR_EMPTY = (255, 255, 255)
-COLOR_HARVESTED = (200, 200, 200)
-COLOR_READY = (100, 255, 100)
-COLOR_TRACTOR = (255, 100, 100)
+# Colores del contenedor (el resto de colores vive en renderizado.py)
 COLOR_CONTAINER = (150, 150, 255)
 COLOR_UNLOADING = (255, 255, 0)
-COLOR_FUEL = (100, 100, 255)
-COLOR_CARGO = (255, 165, 0)
-
-# Inicialización de pygame
-pygame.init()
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Simulación de Cosecha con Gráficas en Tiempo Real")
+COLOR_RESERVED = (255, 0, 0)
 
-# Clase para representar una parcela
-class Parcel(ap.Agent):
-    def setup(self):
-        self.ready_to_harvest = True
-        self.harvested = False
-        self.reservada = False
-        self.reservada_counter = 0
-    
-    def harvest(self):
-        if self.ready_to_harvest:
-            self.ready_to_harvest = False
-            self.harvested = True
+PASOS_POR_SEGUNDO = None  # En pantalla la simulación corre sin pausas; solo se limitan los cuadros
+# Pasos que dura una reserva antes de liberarse (reservas.ReservasParcelas)
+RESERVA_DURACION = 8
 
 # Clase para el tractor/agente
 class Tractor(ap.Agent):
+    # Atributos que guarda un punto de control (punto_control.py)
+    ESTADO = ['carga_anterior', 'previous_position', 'objetivo_actual', 'descargando', 'descarga_duracion',
+              'contador_descarga', 'contenedor.color', 'q_table', 'epsilon', 'alpha', 'gamma',
+              'cosechado_flag', 'no_move_counter', 'lost_flag', 'save_flag', 'fuel_flag', 'siguiente_estado']
+
     def setup(self, initial_position, id):
         self.id = id
-        self.speed = TRACTOR_SPEED
-        self.carga_max = 50
+        # Posición, velocidad, combustible y carga viven en los arreglos de model.flota
+        self.flota = self.model.flota
         self.carga_anterior = 0
-        self.carga_actual = 0
         self.combustible_max = 1000
-        self.combustible = self.combustible_max
-        self.combustible_rate = 1
-        self.position = np.array(initial_position, dtype=float)
-        rs.send_coordinates_background(self.id, round(self.position[0]), round(self.position[1]))
+        self.id_flota = self.flota.agregar(initial_position)
+        self.position = self.flota.posiciones[self.id_flota]  # Vista sobre el arreglo de la flota
+        if self.model.telemetria:
+            rs.send_coordinates_background(self.id, round(self.position[0]), round(self.position[1]))
         self.previous_position = self.position.copy()
         self.objetivo_actual = None
         self.descargando = False
         self.descarga_duracion = 0
         self.contador_descarga = 0
-        self.contenedor = Container(self.position.copy())
-        self.direccion = None  
-        self.direccion_anterior = None
-        self.q_table = np.zeros((ROWS, COLS))
-        self.epsilon = 0.8 # Mantener en 1 para entrenar, bajar a 0.05 para usar Q-table entrenada
+        self.contenedor = Container(self.flota, self.id_flota)
+        self.q_table = None  # TablaQ de (fila, columna, carga, combustible, acción); la abre load_q_table
+        # Mantener en 1 para entrenar, bajar a 0.05 para usar Q-table entrenada (entrenamiento.py)
+        self.epsilon = self.model.p.get('epsilon', 0.8)
         self.alpha = 0.5 # Tasa de aprendizaje
         self.gamma = 0.75 # Factor de descuento
-        self.direccion = None  
         self.cosechado_flag = False
         self.no_move_counter = 0
         self.lost_flag = False
@@ -75,22 +75,58 @@ class Tractor(ap.Agent):
         self.load_q_table()  # Cargar Q-table si existe
         self.siguiente_estado = None
 
+    @property
+    def speed(self):
+        return self.flota.velocidades[self.id_flota]
+
+    @speed.setter
+    def speed(self, valor):
+        self.flota.velocidades[self.id_flota] = valor
+
+    @property
+    def combustible(self):
+        return self.flota.combustible[self.id_flota]
+
+    @combustible.setter
+    def combustible(self, valor):
+        self.flota.combustible[self.id_flota] = valor
+
+    @property
+    def combustible_rate(self):
+        return self.flota.tasa_combustible[self.id_flota]
+
+    @combustible_rate.setter
+    def combustible_rate(self, valor):
+        self.flota.tasa_combustible[self.id_flota] = valor
+
+    @property
+    def carga_actual(self):
+        return self.flota.carga[self.id_flota]
+
+    @carga_actual.setter
+    def carga_actual(self, valor):
+        self.flota.carga[self.id_flota] = valor
+
+    @property
+    def carga_max(self):
+        return self.flota.carga_max[self.id_flota]
+
+    @property
+    def direccion(self):
+        # Dirección unitaria del último movimiento (None si aún no se movió)
+        direccion = self.flota.direcciones[self.id_flota]
+        return None if np.isnan(direccion[0]) else direccion
+
+    @property
+    def direccion_anterior(self):
+        direccion = self.flota.direcciones_anteriores[self.id_flota]
+        return None if np.isnan(direccion[0]) else direccion
+
     def mover(self, destino):
+        # El movimiento (con el recorte a los bordes del campo y el consumo 0.13 * tasa)
+        # se aplica junto con el del resto de la flota en Flota.avanzar()
         if self.combustible > 0 and not self.descargando:
-            direccion = destino - self.position
-            distancia = np.linalg.norm(direccion)
-            if distancia > 0:
-                self.direccion_anterior = self.direccion  # Guardar dirección anterior
-                self.direccion = direccion / distancia  # Actualizar dirección actual
-                direccion = (direccion / distancia) * self.speed
-                self.position += direccion
-                self.position[0] = np.clip(self.position[0], 0, (COLS - 0.5) * GRID_SIZE)
-                self.position[1] = np.clip(self.position[1], 0, (ROWS - 0.5) * GRID_SIZE)
-                self.combustible -= 0.13 * (np.linalg.norm(direccion) * self.combustible_rate)
-                self.combustible_rate = 1
-
-        if self.combustible <= 0:
-            pass
+            self.flota.solicitar_movimiento(self.id_flota, destino)
 
     def cargar(self):
         if self.carga_actual < self.carga_max:
@@ -120,18 +156,15 @@ class Tractor(ap.Agent):
     def seleccionar_accion(self, parcelas_disponibles):
         x = int(self.position[1] // GRID_SIZE)
         y = int(self.position[0] // GRID_SIZE)
-        cargo = self.carga_actual
-        combustible = int(self.combustible // 100)
-
-        x = np.clip(x, 0, ROWS - 1)
-        y = np.clip(y, 0, COLS - 1)
-        cargo = np.clip(cargo, 0, self.carga_max)
-        combustible = np.clip(combustible, 0, int(self.combustible_max / 100))
+        x = np.clip(x, 0, self.model.filas - 1)
+        y = np.clip(y, 0, self.model.columnas - 1)
 
         if np.random.rand() < self.epsilon:
             accion = random.randint(0, 3)  # Acción aleatoria
         else:
-            accion = np.argmax(self.q_table[x, y])  # Acción codiciosa
+            # Acción codiciosa con la carga y el combustible actuales
+            accion = int(self.q_table.accion_codiciosa(
+                self.q_table.estado(x, y, self.carga_actual, self.combustible)))
 
         direction_vectors = {
             0: np.array([-1, 0]),  # Arriba
@@ -144,16 +177,14 @@ class Tractor(ap.Agent):
             direction = direction_vectors[accion]
             next_x, next_y = x + direction[0], y + direction[1]
 
-            next_x = np.clip(next_x, 0, ROWS - 1)
-            next_y = np.clip(next_y, 0, COLS - 1)
-            self.siguiente_estado = (next_x, next_y, cargo, combustible)
+            next_x = np.clip(next_x, 0, self.model.filas - 1)
+            next_y = np.clip(next_y, 0, self.model.columnas - 1)
+            self.siguiente_estado = self.q_table.estado(next_x, next_y, self.carga_actual, self.combustible)
 
             if parcelas_disponibles:
-                for parcela in parcelas_disponibles:
-                    if parcela[0] == next_x and parcela[1] == next_y:
-                        self.objetivo_actual = (parcela[0], parcela[1])
-                        self.model.campo[parcela[0]][parcela[1]].reservada = True
-                        break
+                if self.model.campo.disponible(next_x, next_y):
+                    self.objetivo_actual = (next_x, next_y)
+                    self.model.reservas_parcelas.reservar(self.id, next_x, next_y, self.model.pasos)
             else:
                 self.objetivo_actual = (next_x, next_y)
 
@@ -171,8 +202,8 @@ class Tractor(ap.Agent):
         # Tomar una acción si no hay un objetivo específico
         if self.objetivo_actual is None:
             accion = self.seleccionar_accion(parcelas_disponibles)
-            estado = (int(self.position[1] // GRID_SIZE), int(self.position[0] // GRID_SIZE), 
-                      self.carga_actual, int(self.combustible // 100))
+            estado = self.q_table.estado(int(self.position[1] // GRID_SIZE), int(self.position[0] // GRID_SIZE),
+                                         self.carga_actual, self.combustible)
             recompensa = self.recompensa(accion)
             self.actualizar_q_valor(estado, accion, recompensa, self.siguiente_estado)
             
@@ -189,8 +220,8 @@ class Tractor(ap.Agent):
         y = int(self.position[0] // GRID_SIZE)
 
         # Asegurarse de que los índices estén dentro de los límites
-        x = np.clip(x, 0, ROWS - 1)
-        y = np.clip(y, 0, COLS - 1)
+        x = np.clip(x, 0, self.model.filas - 1)
+        y = np.clip(y, 0, self.model.columnas - 1)
 
         recompensa = 0
 
@@ -208,7 +239,7 @@ class Tractor(ap.Agent):
             recompensa -= 5  
 
         # Penalización por pasar por una parcela ya cosechada
-        if self.model.campo[x][y].harvested:
+        if self.model.campo.harvested[x, y]:
             recompensa -= 3  # Penalización por pasar por una parcela ya cosechada
 
         # Penalización por colisión
@@ -223,71 +254,64 @@ class Tractor(ap.Agent):
 
         return recompensa
 
-# Método para detectar colisión con otros tractores (simple ejemplo)
+# Método para detectar colisión con otros tractores: comparten celda de la rejilla.
+# (Comparar posiciones flotantes con np.array_equal casi nunca detectaba nada.)
     def detectar_colision(self):
-        for otro_tractor in self.model.tractores:
-            if otro_tractor.id != self.id and np.array_equal(self.position, otro_tractor.position):
-                return True
-        return False
+        celdas = (self.flota.posiciones[:self.flota.registrados] // GRID_SIZE).astype(int)
+        misma_celda = (celdas == celdas[self.id_flota]).all(axis=1)
+        misma_celda[self.id_flota] = False
+        return bool(misma_celda.any())
     
 
     def actualizar_q_valor(self, estado, accion, recompensa, siguiente_estado):
-        x, y, cargo, combustible = estado
-
-        # Asegurarse de que los índices estén dentro de los límites
-        x = np.clip(x, 0, ROWS - 1)
-        y = np.clip(y, 0, COLS - 1)
-        cargo = np.clip(cargo, 0, self.carga_max)
-        combustible = np.clip(combustible, 0, int(self.combustible_max / 100))
-        
-
-        # Obtener Q máximo para el siguiente estado
-        Q_max = np.max(self.q_table[x, y])
-
-        # Actualizar Q-valor
-        self.q_table[x, y] += self.alpha * (recompensa + self.gamma * Q_max - self.q_table[x, y])
+        # estado y siguiente_estado ya vienen discretizados y dentro de los límites (TablaQ.estado);
+        # Q máximo del siguiente estado sobre sus acciones
+        self.q_table.actualizar(estado, accion, recompensa, siguiente_estado, self.alpha, self.gamma)
 
     def forzar_mover_a_parcela_mas_cercana(self, parcelas_disponibles):
         if parcelas_disponibles:
-            parcelas_disponibles.sort(key=lambda parcela: parcela[2])  # Ordenar por distancia
-            parcela_mas_cercana = parcelas_disponibles[0]
+            parcela_mas_cercana = parcelas_disponibles[0]  # Ya vienen ordenadas por distancia
+            # Cambia de objetivo: suelta lo que tenía reservado sin cosechar
+            self.model.reservas_parcelas.liberar_dueno(self.id)
             self.objetivo_actual = (parcela_mas_cercana[0], parcela_mas_cercana[1])
             self.combustible_rate = 30
-            self.model.campo[parcela_mas_cercana[0]][parcela_mas_cercana[1]].reservada = True
+            self.model.reservas_parcelas.reservar(self.id, parcela_mas_cercana[0], parcela_mas_cercana[1],
+                                                  self.model.pasos)
             if not self.lost_flag:
                 self.lost_flag = True
 
-    def save_q_table(self):
-        filename = f"q_table_tractor_{self.id}.npy"
-        np.save(filename, self.q_table)
-        print(f"Q-table guardada en {filename}")
+    def nombre_q_table(self):
+        return NOMBRE_COMPARTIDA if self.model.q_compartida else f"q_table_tractor_{self.id}"
 
     def load_q_table(self):
-        filename = f"q_table_tractor_{self.id}.npy"
-        if os.path.exists(filename):
-            self.q_table = np.load(filename)
-            print(f"Q-table cargada desde {filename}")
-        else:
-            print(f"No se encontró Q-table para el tractor {self.id}, comenzando con una nueva")
-            self.save_q_table()
+        # La tabla de este tractor en el punto de control que carga el modelo; si no estaba,
+        # una nueva. Con q_compartida todos los tractores aprenden sobre la que tomó el primero
+        modelo = self.model
+        forma = (modelo.filas, modelo.columnas, int(self.carga_max), self.combustible_max,
+                 modelo.q_niveles_carga, modelo.q_niveles_combustible, modelo.q_dtype)
+        tablas = modelo.cargar_q_tables(forma)
+        nombre = self.nombre_q_table()
+        if nombre not in tablas:
+            tablas[nombre] = TablaQ(*forma)
+        self.q_table = tablas[nombre]
 
 # Clase para el contenedor
+# Sigue al tractor o va al silo en Flota.mover_contenedores()
 class Container:
-    def __init__(self, initial_position):
-        self.position = np.array(initial_position, dtype=float)
+    def __init__(self, flota, id_flota):
+        self.flota = flota
+        self.id_flota = id_flota
+        self.position = flota.contenedores[id_flota]  # Vista sobre el arreglo de la flota
         self.color = COLOR_CONTAINER
-        self.velocidad = TRACTOR_SPEED * 1.2
-        self.ir_al_silo_flag = False  # Bandera para ir al silo
+        self.velocidad = flota.velocidad_contenedor
 
-    def seguir_tractor(self, tractor_pos):
-        # Mueve el contenedor para seguir al tractor con retraso
-        if not self.ir_al_silo_flag:
-            direccion = tractor_pos - self.position
-            distancia = np.linalg.norm(direccion)
-            if distancia > GRID_SIZE * 2:  # Mantenerse a una distancia
-                direccion = (direccion / distancia) * self.velocidad
-                self.position += direccion
+    @property
+    def ir_al_silo_flag(self):  # Bandera para ir al silo
+        return self.flota.al_silo[self.id_flota]
 
+    @ir_al_silo_flag.setter
+    def ir_al_silo_flag(self, valor):
+        self.flota.al_silo[self.id_flota] = valor
 
     def acercarse_tractor(self, tractor_pos):
         # Mueve el contenedor hacia el tractor
@@ -299,58 +323,109 @@ class Container:
         if distancia < 10:
             self.ir_al_silo_flag = True
 
-    def ir_al_silo(self, silo_pos):
-        # Mueve el contenedor hacia el silo
-        if self.ir_al_silo_flag:
-            direccion = silo_pos - self.position
-            distancia = np.linalg.norm(direccion)
-            if distancia > 10:
-                direccion = (direccion / distancia) * self.velocidad
-                self.position += direccion
-            if distancia < 10:
-                self.ir_al_silo_flag = False
-
 
 # Clase para el modelo de simulación
 class HarvestSimulation(ap.Model):
+    # Estado que guarda un punto de control (punto_control.py)
+    ESTADO_ARREGLOS = ['campo', 'flota', 'reservas_parcelas']
+    ESTADO = ['pasos', 'reservas_parcelas.cola', 'reservas_parcelas.por_dueno', 'progreso.historial', 'episodios_q']
+
     def setup(self):
-        self.campo = [[Parcel(self) for _ in range(COLS)] for _ in range(ROWS)]
+        # Enviar coordenadas a la API (desactivable para corridas en lote)
+        self.telemetria = self.p.get('telemetria', True)
+        # Guardar las Q-tables en disco (las corridas en paralelo de experimentos.py no lo hacen)
+        self.guardar_q = self.p.get('guardar_q', True)
+        # Q-tables: tramos de carga y combustible del estado, tipo de los valores y si se
+        # mapean desde el archivo (np.memmap) en vez de leerse enteras
+        self.q_niveles_carga = self.p.get('q_niveles_carga', NIVELES_CARGA)
+        self.q_niveles_combustible = self.p.get('q_niveles_combustible', NIVELES_COMBUSTIBLE)
+        self.q_dtype = self.p.get('q_dtype', 'float32')
+        self.q_mapeada = self.p.get('q_mapeada', False)
+        # Una sola Q-table para todos los tractores (NOMBRE_COMPARTIDA) en vez de una por tractor
+        self.q_compartida = self.p.get('q_compartida', False)
+        self.q_tables = None  # {nombre: TablaQ} de la corrida; lo llena cargar_q_tables
+        # Versiones de las Q-tables (almacen_q.py); con q_guardar_cada se guarda también
+        # cada tantos pasos, en segundo plano
+        self.almacen_q = AlmacenQ(self.p.get('q_directorio', DIRECTORIO_Q))
+        self.q_guardar_cada = self.p.get('q_guardar_cada')
+        self.escritor_q = EscritorQ(self.almacen_q) if self.guardar_q and self.q_guardar_cada else None
+        self.episodios_q = 0  # Cosechas completas de las Q-tables, según la versión cargada
+        # Campo y flota parametrizables (experimentos.py); por defecto, las constantes del módulo
+        self.filas = self.p.get('filas', ROWS)
+        self.columnas = self.p.get('columnas', COLS)
+        self.velocidad = self.p.get('velocidad', TRACTOR_SPEED)
+        n_tractores = self.n_tractores = self.p.get('tractores', TRACTOR_COUNT)
+        # La exploración usa random y np.random globales: se siembran si hay semilla
+        if 'seed' in self.p:
+            random.seed(self.p['seed'])
+            np.random.seed(self.p['seed'] % 2**32)
+        # Observadores (p.ej. el renderizador) notificados al final de cada paso
+        self.observadores = []
+        # Tiempos por fase de step(); se puede activar y desactivar durante la corrida
+        self.perfil = Perfilador(self.p.get('perfil', False))
+
+        # En esta variante la reserva se mantiene tras cosechar hasta que expira
+        self.campo = Campo(self.filas, self.columnas, liberar_al_cosechar=False)
+        self.indice = IndiceParcelas(self.campo)
+        self.progreso = Progreso(self.campo)
+        self.reservas_parcelas = ReservasParcelas(self.campo, RESERVA_DURACION)
+        self.pasos = 0
+        self.flota = Flota(
+            n_tractores, velocidad=self.velocidad, combustible_max=1000, carga_max=self.p.get('carga_max', 50),
+            velocidad_contenedor=self.velocidad * 1.2, distancia_seguimiento=GRID_SIZE * 2,
+            factor_combustible=0.13,
+            limites=((self.columnas - 0.5) * GRID_SIZE, (self.filas - 0.5) * GRID_SIZE)
+        )
         
-        espaciado_x = (WIDTH - 180) // (TRACTOR_COUNT)
+        ancho_campo = self.columnas * GRID_SIZE
+        espaciado_x = (ancho_campo + 20) // n_tractores
         posiciones_iniciales = [
-            (WIDTH - 200 - i * espaciado_x, HEIGHT + GRID_SIZE) for i in range(TRACTOR_COUNT)
+            (ancho_campo - i * espaciado_x, (self.filas + 1) * GRID_SIZE) for i in range(n_tractores)
         ]
         
         self.tractores = [Tractor(self, initial_position=pos, id=i) for i, pos in enumerate(posiciones_iniciales)]
         
+        # El silo va a la derecha del campo, bajo las gráficas si entra y si no en la esquina
         margin_top = 20
-        self.silo_position = (WIDTH - 180, margin_top + len(self.tractores) * 70 + 30)
+        self.silo_position = (ancho_campo + 20,
+                              max(min(margin_top + len(self.tractores) * 70 + 30, self.filas * GRID_SIZE - 150), 0))
+
+        # Retomar una corrida guardada: ruta del punto de control o el estado ya leído
+        if self.p.get('punto_control') is not None:
+            cargar(self, self.p['punto_control'])
+            # Las Q-tables restauradas reemplazan a las que abrió cargar_q_tables: se guardan esas
+            self.q_tables = {tractor.nombre_q_table(): tractor.q_table for tractor in self.tractores}
+
+    def agregar_observador(self, observador):
+        self.observadores.append(observador)
+
+    def notificar_observadores(self):
+        for observador in self.observadores:
+            observador.actualizar(self)
+
+    def actualizar_reservas(self):
+        # Las reservas expiran tras RESERVA_DURACION pasos de simulación, con o sin dibujo
+        self.reservas_parcelas.expirar(self.pasos)
     
-    def obtener_parcelas_disponibles(self, tractor):
-        parcelas_disponibles = []
+    def obtener_parcelas_disponibles(self, tractor, k=1):
+        # Las k parcelas disponibles más cercanas (row, col, distancia), ordenadas por distancia
         tractor_pos_grid = (int(tractor.position[1] // GRID_SIZE), int(tractor.position[0] // GRID_SIZE))
-        
-        for row in range(ROWS):
-            for col in range(COLS):
-                parcela = self.campo[row][col]
-                if parcela.ready_to_harvest and not parcela.reservada:
-                    distancia = np.linalg.norm(np.array(tractor_pos_grid) - np.array([row, col]))
-                    parcelas_disponibles.append((row, col, distancia))
-        
-        return parcelas_disponibles
+        return self.indice.k_mas_cercanas(*tractor_pos_grid, k=k)
 
     def step(self):
-        self.font = pygame.font.Font(None, 24)  # Define la fuente una vez
-        screen.fill(COLOR_EMPTY)
-        self.dibujar_campo()
+        perfil = self.perfil
+        inicio = t = perfil.marca()
+        self.pasos += 1
+        self.actualizar_reservas()
+        t = perfil.fase('reservas', t)
         
+        # Con el campo cosechado los pasos que sigan pidiendo (p.ej. con la ventana abierta) no hacen nada
         if self.all_parcels_harvested():
-            print("All parcels have been harvested. Stopping simulation.")
-            for tractor in self.tractores:
-                tractor.save_q_table()
-            #model.setup()
+            self.notificar_observadores()
             return
         
+        # 1. Decisiones por tractor; los movimientos quedan pedidos en la flota
+        hacia_parcela = []
         for idx, tractor in enumerate(self.tractores):
             if tractor.descargando:
                 tractor.contador_descarga -= 1
@@ -370,7 +445,6 @@ class HarvestSimulation(ap.Model):
                         tractor.descargar()
                 else:
                     if tractor.objetivo_actual is None:
-                        self.parcelas_disponibles = self.obtener_parcelas_disponibles(tractor)
                         tractor.step()
                     
                     elif tractor.objetivo_actual:
@@ -379,94 +453,175 @@ class HarvestSimulation(ap.Model):
                             tractor.objetivo_actual[0] * GRID_SIZE + GRID_SIZE // 2
                         ])
                         tractor.mover(destino)
-                        
-                        if np.linalg.norm(destino - tractor.position) < tractor.speed:
-                            if tractor.cargar():
-                                self.campo[tractor.objetivo_actual[0]][tractor.objetivo_actual[1]].harvest()
-                                rs.send_coordinates_background(tractor.id, round(tractor.position[0]), round(tractor.position[1]))
-                            tractor.objetivo_actual = None
-                
-            if tractor.contenedor.ir_al_silo_flag:
-                tractor.contenedor.ir_al_silo(self.silo_position)
-            else:
-                tractor.contenedor.seguir_tractor(tractor.position)
+                        hacia_parcela.append((tractor, destino))
+            t = perfil.fase('decisiones', t, tractor=idx)
+
+        # 2. Movimiento de toda la flota en una sola actualización
+        self.flota.avanzar()
+        t = perfil.fase('movimiento', t)
+
+        # 3. Llegadas a la parcela objetivo
+        for tractor, destino in hacia_parcela:
+            if np.linalg.norm(destino - tractor.position) < tractor.speed:
+                if tractor.cargar():
+                    self.campo.harvest(*tractor.objetivo_actual)
+                    if self.telemetria:
+                        t_telemetria = perfil.marca()
+                        rs.send_coordinates_background(tractor.id, round(tractor.position[0]), round(tractor.position[1]))
+                        perfil.fase('telemetria', t_telemetria)
+                tractor.objetivo_actual = None
+        t = perfil.fase('llegadas', t)
+        self.progreso.muestrear(self.pasos)
+
+        # La versión de la cosecha completa se guarda una sola vez, en el paso que cosecha
+        # la última parcela; antes, con q_guardar_cada, las periódicas en segundo plano
+        if self.all_parcels_harvested():
+            print("All parcels have been harvested. Stopping simulation.")
+            self.episodios_q += 1
+            self.guardar_q_tables()
+        elif self.escritor_q is not None and self.pasos % self.q_guardar_cada == 0:
+            self.guardar_q_tables(fondo=True)
+
+        # 4. Contenedores: al silo o siguiendo a su tractor
+        self.flota.mover_contenedores(self.silo_position)
+        t = perfil.fase('contenedores', t)
         
-        self.dibujar_tractores()
-        self.dibujar_graficas()
-        self.dibujar_silo()
-        pygame.display.flip()
-
-    def dibujar_campo(self):
-        for row in range(ROWS):
-            for col in range(COLS):
-                x, y = col * GRID_SIZE, row * GRID_SIZE
-                parcela = self.campo[row][col]
-                color = COLOR_HARVESTED if parcela.harvested else COLOR_READY if parcela.ready_to_harvest else COLOR_EMPTY
-                if parcela.reservada:
-                    parcela.reservada_counter += 1
-                    color = (255, 0, 0)
-                if parcela.reservada_counter > 8:
-                    parcela.reservada = False
-                    parcela.reservada_counter = 0
-                pygame.draw.rect(screen, color, (x, y, GRID_SIZE, GRID_SIZE))
-    
-    def dibujar_tractores(self):
-        for idx, tractor in enumerate(self.tractores):
-            # Dibujar el contenedor y el tractor
-            pygame.draw.circle(screen, tractor.contenedor.color, tractor.contenedor.position.astype(int), GRID_SIZE // 3)
-            pygame.draw.circle(screen, COLOR_TRACTOR, tractor.position.astype(int), GRID_SIZE // 3)
-            
-            # Etiqueta del tractor
-            label = self.font.render(f"Tractor {idx + 1}", True, (0, 0, 0))
-            screen.blit(label, (tractor.position[0] - 15, tractor.position[1] - 30))  # Ajusta la posición del label si es necesario
-    
-    def dibujar_graficas(self):
-        bar_width = 150
-        bar_height = 20
-        margin_top = 20
-        for idx, tractor in enumerate(self.tractores):
-            # Dibujar barra de combustible
-            fuel_ratio = tractor.combustible / tractor.combustible_max
-            pygame.draw.rect(screen, COLOR_FUEL, (WIDTH - 180, margin_top + idx * 70, int(bar_width * fuel_ratio), bar_height))
-            pygame.draw.rect(screen, (0, 0, 0), (WIDTH - 180, margin_top + idx * 70, bar_width, bar_height), 2)
-
-            # Dibujar barra de carga
-            cargo_ratio = tractor.carga_actual / tractor.carga_max
-            pygame.draw.rect(screen, COLOR_CARGO, (WIDTH - 180, margin_top + idx * 70 + 30, int(bar_width * cargo_ratio), bar_height))
-            pygame.draw.rect(screen, (0, 0, 0), (WIDTH - 180, margin_top + idx * 70 + 30, bar_width, bar_height), 2)
-
-            # Etiqueta del tractor
-            font = pygame.font.Font(None, 24)
-            text = font.render(f"Tractor {idx + 1}", True, (0, 0, 0))
-            screen.blit(text, (WIDTH - 180, margin_top + idx * 70 - 20))
-
-    def dibujar_silo(self):
-        silo_width = 150
-        silo_height = 150
-        font = pygame.font.Font(None, 24)
-        pygame.draw.rect(screen, (105, 105, 105), (self.silo_position[0], self.silo_position[1], silo_width, silo_height))
-        label = font.render("Silo", True, (0, 0, 0))
-        label_rect = label.get_rect(center=(self.silo_position[0] + silo_width // 2, self.silo_position[1] - 20))
-        screen.blit(label, label_rect)
+        self.notificar_observadores()
+        perfil.fase('observadores', t)
+        perfil.fase('paso', inicio)
+
+    def nombres_q_tables(self):
+        return [NOMBRE_COMPARTIDA] if self.q_compartida else [f"q_table_tractor_{i}" for i in range(self.n_tractores)]
+
+    def cargar_q_tables(self, forma):
+        # La primera vez, todas las tablas de la corrida de la última versión buena para este
+        # campo y discretización; mapeadas, los cambios quedan en memoria (copia al escribir)
+        # y los guarda la próxima versión
+        if self.q_tables is None:
+            nombres = self.nombres_q_tables()
+            self.q_tables, metadatos = self.almacen_q.cargar(nombres, *forma, mapear=self.q_mapeada)
+            if metadatos is None:
+                if self.almacen_q.existe(nombres):
+                    print(f"Las Q-tables de {self.almacen_q.directorio} no corresponden a este campo "
+                          f"o discretización, comenzando con nuevas")
+                else:
+                    print(f"No se encontraron Q-tables en {self.almacen_q.directorio}, comenzando con nuevas")
+                metadatos = {}
+            else:
+                print(f"Q-tables cargadas: {', '.join(self.q_tables)} versión "
+                      f"{metadatos.get('version', '(archivos únicos)')}, {metadatos.get('episodios', 0)} episodios")
+            self.episodios_q = metadatos.get('episodios', 0)
+        return self.q_tables
+
+    def guardar_q_tables(self, fondo=False):
+        # Un punto de control con todas las tablas (con q_compartida, la única). En segundo
+        # plano lo escribe el escritor; si no, se espera a que termine lo que tenga pendiente
+        # (así las versiones quedan en orden) y se escribe directo, sin copiar las tablas
+        if not self.guardar_q:
+            return
+        tractor = self.tractores[0]
+        metadatos = {'episodios': self.episodios_q, 'pasos': self.pasos, 'completa': self.all_parcels_harvested(),
+                     'epsilon': tractor.epsilon, 'alpha': tractor.alpha, 'gamma': tractor.gamma}
+        if fondo:
+            self.escritor_q.pedir(self.q_tables, metadatos)
+            return
+        if self.escritor_q is not None:
+            self.escritor_q.esperar()
+        version = self.almacen_q.guardar(self.q_tables, metadatos)
+        print(f"Q-tables guardadas en {self.almacen_q.carpeta(version)}")
 
     def all_parcels_harvested(self):
-        for row in range(ROWS):
-            for col in range(COLS):
-                if self.campo[row][col].ready_to_harvest:
-                    return False
-        return True
+        # O(1): Campo mantiene el conteo de parcelas por cosechar
+        return self.progreso.terminado()
+
+    def update(self):
+        # Model.run() termina la corrida cuando no queda nada por cosechar
+        if self.all_parcels_harvested():
+            self.stop()
+
+    def end(self):
+        # Resumen de la corrida que agrega experimentos.py (pasos_cosecha es NaN si no terminó)
+        self.report('pasos_cosecha', self.pasos if self.all_parcels_harvested() else np.nan)
+        self.report('cosechadas', self.campo.total_cosechadas)
+        self.report('combustible_usado', float(self.flota.consumido.sum()))
+        self.report('distancia_recorrida', float(self.flota.recorrido.sum()))
 
-rs.check_connection_background(TRACTOR_COUNT)
 # Ejecutar simulación
-model = HarvestSimulation()
-model.setup()
-
-running = True
-while running:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-    model.step()
-    #pygame.time.delay(5)
-
-pygame.quit()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulación de cosecha con Q-learning")
+    parser.add_argument("--headless", action="store_true", help="Simular sin ventana ni pygame")
+    parser.add_argument("--pasos", type=int, default=None, help="Número de pasos (por defecto, sin límite)")
+    parser.add_argument("--filas", type=int, default=ROWS, help="Filas del campo (independiente de la ventana)")
+    parser.add_argument("--columnas", type=int, default=COLS, help="Columnas del campo")
+    parser.add_argument("--tractores", type=int, default=TRACTOR_COUNT, help="Cantidad de tractores")
+    parser.add_argument("--sin-telemetria", action="store_true", help="No enviar coordenadas a la API")
+    parser.add_argument("--epsilon", type=float, default=0.8,
+                        help="Probabilidad de explorar (0.05 para usar Q-tables ya entrenadas)")
+    parser.add_argument("--niveles-carga", type=int, default=NIVELES_CARGA, help="Tramos de carga en el estado")
+    parser.add_argument("--niveles-combustible", type=int, default=NIVELES_COMBUSTIBLE,
+                        help="Tramos de combustible en el estado")
+    parser.add_argument("--q-dtype", choices=["float32", "float16", "float64"], default="float32",
+                        help="Tipo de los valores de las Q-tables")
+    parser.add_argument("--q-mapeada", action="store_true",
+                        help="Mapear las Q-tables desde sus archivos (np.memmap) en vez de leerlas enteras")
+    parser.add_argument("--q-compartida", action="store_true",
+                        help=f"Una sola Q-table para todos los tractores ({NOMBRE_COMPARTIDA})")
+    parser.add_argument("--q-directorio", default=DIRECTORIO_Q, help="Dónde guardar las versiones de las Q-tables")
+    parser.add_argument("--q-guardar-cada", type=int,
+                        help="Guardar también una versión de las Q-tables cada N pasos, en segundo plano")
+    parser.add_argument("--fps", type=int, default=30, help="Cuadros por segundo máximos")
+    parser.add_argument("--render-proceso", action="store_true",
+                        help="Dibujar en otro proceso sin frenar la simulación")
+    parser.add_argument("--perfil", action="store_true", help="Medir el tiempo de cada fase del paso")
+    parser.add_argument("--retomar", help="Punto de control desde el que seguir (con su campo y tractores)")
+    parser.add_argument("--guardar", help="Punto de control a escribir al terminar")
+    parser.add_argument("--guardar-cada", type=int, help="Escribir también el punto de control cada N pasos")
+    parser.add_argument("--registro", help="Directorio donde registrar las métricas de cada paso (registro.py)")
+    args = parser.parse_args()
+
+    if not args.sin_telemetria:
+        rs.check_connection_background(args.tractores)
+
+    parametros = {'filas': args.filas, 'columnas': args.columnas, 'tractores': args.tractores,
+                  'epsilon': args.epsilon, 'q_niveles_carga': args.niveles_carga,
+                  'q_niveles_combustible': args.niveles_combustible, 'q_dtype': args.q_dtype,
+                  'q_mapeada': args.q_mapeada, 'q_compartida': args.q_compartida,
+                  'q_directorio': os.path.abspath(args.q_directorio), 'q_guardar_cada': args.q_guardar_cada}
+    if args.retomar:
+        guardado = leer(args.retomar)
+        parametros = dict(guardado['parametros'], punto_control=guardado)
+    model = HarvestSimulation(dict(parametros, telemetria=not args.sin_telemetria, perfil=args.perfil))
+    model.setup()
+    if args.guardar and args.guardar_cada:
+        model.agregar_observador(GuardadoPeriodico(args.guardar, args.guardar_cada))
+    registro = None
+    if args.registro:
+        registro = Registrador(args.registro, model)
+        model.agregar_observador(registro)
+
+    renderizador = None
+    if args.headless:
+        ejecutar(model, pasos=args.pasos)
+    elif args.render_proceso:
+        # Cada cuadro del bucle publica una instantánea; el otro proceso la dibuja
+        from render_proceso import RenderizadorEnProceso
+        renderizador = RenderizadorEnProceso("Simulación de Cosecha con Gráficas en Tiempo Real",
+                                             WIDTH, HEIGHT, GRID_SIZE, model,
+                                             color_reservada=COLOR_RESERVED, fps_max=args.fps)
+        ejecutar(model, renderizador, args.pasos, PASOS_POR_SEGUNDO, fps_max=args.fps)
+    else:
+        from renderizado import RenderizadorPygame
+        renderizador = RenderizadorPygame("Simulación de Cosecha con Gráficas en Tiempo Real",
+                                          WIDTH, HEIGHT, GRID_SIZE, color_reservada=COLOR_RESERVED)
+        ejecutar(model, renderizador, args.pasos, PASOS_POR_SEGUNDO, fps_max=args.fps)
+
+    if renderizador:
+        renderizador.cerrar()
+    if registro:
+        registro.cerrar()
+    if model.escritor_q:
+        model.escritor_q.cerrar()
+    if args.guardar:
+        guardar(model, args.guardar)
+    if args.perfil:
+        print(model.perfil.informe())
@@ -0,0 +1,186 @@
+import contextlib
+import multiprocessing as mp
+import os
+import zlib
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Q-table completa de estado y acción para los tractores de Q-learning.
+# El estado es (fila, columna, nivel de carga, nivel de combustible): la carga y el
+# combustible se discretizan en niveles_carga y niveles_combustible tramos iguales,
+# y la tabla guarda un valor por acción: forma (filas, columnas, niveles_carga,
+# niveles_combustible, ACCIONES). Los valores pueden ir en float32 o float16 (la
+# cuenta de cada actualización se hace en float32 y se redondea al guardarla) y el
+# arreglo puede ser un np.memmap sobre un archivo .npy (copia al escribir: el archivo no
+# cambia): abrirlo no lee nada y solo las páginas que se tocan pasan a memoria, y
+# volcar() la escribe de a partes, así que tablas de campos grandes no tienen que
+# caber enteras en RAM.
+#
+#   tabla = TablaQ.abrir("q.npy", filas, columnas, carga_max=50, combustible_max=1000, mapear=True)
+#   estado = tabla.estado(fila, col, carga, combustible)
+#   accion = tabla.accion_codiciosa(estado)
+#   tabla.actualizar(estado, accion, recompensa, siguiente, alpha, gamma)
+#
+# estado() y los demás métodos aceptan escalares o arreglos del mismo largo.
+#
+# Una tabla puede compartirse entre procesos (crear_compartida / unirse): los valores
+# viven en un bloque de multiprocessing.shared_memory y todas las copias usan el mismo
+# cerrojo. Consistencia: cada actualizar() o actualizar_lote() se aplica entera con el
+# cerrojo tomado, así que los lotes de distintos procesos quedan en algún orden y
+# ninguna actualización se pierde; elegir acciones lee sin cerrojo y puede ver la
+# tabla sin los lotes que se están aplicando en ese momento.
+
+ACCIONES = 4  # Arriba, abajo, izquierda, derecha (Tractor.seleccionar_accion)
+NIVELES_CARGA = 5
+NIVELES_COMBUSTIBLE = 5
+DTYPE = np.float32
+NOMBRE_COMPARTIDA = "q_table_compartida"  # Tabla única de todos los tractores (en AlmacenQ)
+
+
+class TablaQ:
+    def __init__(self, filas, columnas, carga_max, combustible_max, niveles_carga=NIVELES_CARGA,
+                 niveles_combustible=NIVELES_COMBUSTIBLE, dtype=DTYPE, valores=None, cerrojo=None):
+        self.carga_max = carga_max
+        self.combustible_max = combustible_max
+        self.niveles_carga = niveles_carga
+        self.niveles_combustible = niveles_combustible
+        self.forma = (filas, columnas, niveles_carga, niveles_combustible, ACCIONES)
+        if valores is None:
+            valores = np.zeros(self.forma, dtype=dtype)
+        elif valores.shape != self.forma:
+            raise ValueError(f"La Q-table tiene forma {valores.shape} y no {self.forma}")
+        self.valores = valores
+        self.cerrojo = cerrojo  # Serializa las actualizaciones entre procesos (None: sin cerrojo)
+        self.memoria = None  # SharedMemory de los valores si la tabla es compartida
+
+    def __getstate__(self):
+        # Al copiarla (p.ej. en un punto de control) una tabla mapeada o compartida se
+        # guarda como arreglo común; otro proceso se une con unirse(descriptor())
+        estado = dict(vars(self))
+        if isinstance(self.valores, np.memmap) or self.memoria is not None:
+            estado['valores'] = np.array(self.valores)
+        estado['memoria'] = None
+        estado['cerrojo'] = None
+        return estado
+
+    @classmethod
+    def abrir(cls, ruta, filas, columnas, carga_max, combustible_max, niveles_carga=NIVELES_CARGA,
+              niveles_combustible=NIVELES_COMBUSTIBLE, dtype=DTYPE, mapear=False):
+        # La tabla guardada en ruta, o None si no existe o es de otra forma (otro campo u
+        # otra discretización). Con mapear queda como np.memmap y los cambios quedan solo
+        # en memoria (copia al escribir). Si el archivo
+        # tiene otro dtype se lee entero y se convierte. Una tabla del formato anterior,
+        # (filas, columnas) con un valor por celda, se migra: ese valor pasa a todos los
+        # niveles y acciones de la celda (la acción codiciosa sigue siendo la 0, como antes)
+        forma = (filas, columnas, niveles_carga, niveles_combustible, ACCIONES)
+        if not os.path.exists(ruta):
+            return None
+        valores = np.load(ruta, mmap_mode='c' if mapear else None)
+        if valores.shape == forma[:2]:
+            valores = np.array(np.broadcast_to(valores[:, :, None, None, None], forma), dtype=dtype)
+        if valores.shape != forma:
+            return None
+        if valores.dtype != np.dtype(dtype):
+            valores = np.array(valores, dtype=dtype)
+        return cls(filas, columnas, carga_max, combustible_max, niveles_carga, niveles_combustible, dtype, valores)
+
+    @classmethod
+    def crear_compartida(cls, filas, columnas, carga_max, combustible_max, niveles_carga=NIVELES_CARGA,
+                         niveles_combustible=NIVELES_COMBUSTIBLE, dtype=DTYPE):
+        # Tabla en cero en memoria compartida, con su cerrojo. Quien la crea la libera con liberar().
+        # El cerrojo es del contexto 'spawn' para que también puedan unirse procesos arrancados así
+        forma = (filas, columnas, niveles_carga, niveles_combustible, ACCIONES)
+        memoria = shared_memory.SharedMemory(create=True, size=max(int(np.prod(forma)) * np.dtype(dtype).itemsize, 1))
+        valores = np.ndarray(forma, dtype=dtype, buffer=memoria.buf)
+        valores[...] = 0
+        tabla = cls(filas, columnas, carga_max, combustible_max, niveles_carga, niveles_combustible, dtype,
+                    valores, mp.get_context("spawn").Lock())
+        tabla.memoria = memoria
+        return tabla
+
+    def descriptor(self):
+        # Lo que otro proceso necesita para unirse a esta tabla compartida (se pasa al crear el proceso)
+        filas, columnas, niveles_carga, niveles_combustible, _ = self.forma
+        return {'nombre': self.memoria.name, 'filas': filas, 'columnas': columnas, 'carga_max': self.carga_max,
+                'combustible_max': self.combustible_max, 'niveles_carga': niveles_carga,
+                'niveles_combustible': niveles_combustible, 'dtype': self.valores.dtype.str, 'cerrojo': self.cerrojo}
+
+    @classmethod
+    def unirse(cls, descriptor):
+        memoria = shared_memory.SharedMemory(name=descriptor['nombre'])
+        forma = (descriptor['filas'], descriptor['columnas'], descriptor['niveles_carga'],
+                 descriptor['niveles_combustible'], ACCIONES)
+        valores = np.ndarray(forma, dtype=descriptor['dtype'], buffer=memoria.buf)
+        tabla = cls(descriptor['filas'], descriptor['columnas'], descriptor['carga_max'], descriptor['combustible_max'],
+                    descriptor['niveles_carga'], descriptor['niveles_combustible'], descriptor['dtype'], valores,
+                    descriptor['cerrojo'])
+        tabla.memoria = memoria
+        return tabla
+
+    def cerrar(self):
+        # Suelta la memoria compartida en este proceso (la tabla deja de poder usarse)
+        if self.memoria is not None:
+            self.valores = None
+            self.memoria.close()
+            self.memoria = None
+
+    def liberar(self):
+        # Cierra y borra el bloque compartido; solo lo hace el proceso que lo creó, al final
+        if self.memoria is not None:
+            memoria = self.memoria
+            self.cerrar()
+            memoria.unlink()
+
+    def _bloqueo(self):
+        return self.cerrojo if self.cerrojo is not None else contextlib.nullcontext()
+
+    def estado(self, fila, col, carga, combustible):
+        # Índice de la tabla para una posición en celdas y la carga y combustible sin discretizar
+        filas, columnas = self.forma[:2]
+        fila = np.clip(fila, 0, filas - 1)
+        col = np.clip(col, 0, columnas - 1)
+        nivel_carga = np.clip(np.asarray(carga) * self.niveles_carga // (self.carga_max + 1),
+                              0, self.niveles_carga - 1).astype(np.int64)
+        nivel_combustible = np.clip(np.asarray(combustible) * self.niveles_combustible // self.combustible_max,
+                                    0, self.niveles_combustible - 1).astype(np.int64)
+        return fila, col, nivel_carga, nivel_combustible
+
+    def accion_codiciosa(self, estado):
+        return np.argmax(self.valores[estado], axis=-1)
+
+    def actualizar(self, estado, accion, recompensa, siguiente, alpha, gamma):
+        # Q(s, a) += alpha * (r + gamma * max_a' Q(s', a') - Q(s, a)) para una transición
+        with self._bloqueo():
+            q_max = np.max(self.valores[siguiente].astype(np.float32))
+            actual = np.float32(self.valores[estado + (accion,)])
+            self.valores[estado + (accion,)] = actual + alpha * (recompensa + gamma * q_max - actual)
+
+    def actualizar_lote(self, estados, acciones, recompensas, siguientes, alpha, gamma):
+        # La misma regla para muchas transiciones (arreglos). Un par (estado, acción) que
+        # aparece varias veces recibe el promedio de sus correcciones: sumarlas haría que
+        # el paso efectivo creciera con el tamaño del lote
+        indices = np.ravel_multi_index(estados + (acciones,), self.forma)
+        pares, inversa = np.unique(indices, return_inverse=True)
+        cuentas = np.bincount(inversa)
+        q = self.valores.reshape(-1)
+        with self._bloqueo():
+            q_max = self.valores[siguientes].astype(np.float32).max(axis=-1)
+            actual = q[indices].astype(np.float32)
+            correcciones = alpha * (recompensas + gamma * q_max - actual)
+            q[pares] = q[pares] + np.bincount(inversa, correcciones) / cuentas
+
+    def instantanea(self):
+        # Copia de los valores sin lotes a medio aplicar (para guardarla mientras se sigue aprendiendo)
+        with self._bloqueo():
+            return np.array(self.valores)
+
+    def volcar(self, archivo):
+        # Escribe los valores como .npy en archivo sin copiarlos enteros a memoria (np.save
+        # va de a partes) y devuelve su crc32; como instantanea(), sin lotes a medio aplicar
+        with self._bloqueo():
+            np.save(archivo, self.valores)
+            return zlib.crc32(self.valores)
+
+    def nbytes(self):
+        return self.valores.nbytes